@@ -1,16 +1,85 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+import asyncio
+import os
+import threading
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from batch import DEFAULT_CONCURRENCY, MAX_CONCURRENCY, BatchSummary, read_questions, run_batch
+from pipeline import VALIDATOR_DB_URI, GenerateValidatePipeline, PipelineError, ValidatorUnavailable, load_validator
+import sql_agent
 from sql_agent import generate_sql
+from sql_stream import format_sse, stream_sql
+from utils.llm_client import close_http_client
+from utils.single_flight import SingleFlight, normalize_query
+import json
 import logging
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Identical in-flight questions share one crew kickoff
+generation_flight = SingleFlight()
+
+# Optional in-process generate-and-validate pipeline (enabled by VALIDATOR_DB_URI)
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def get_pipeline():
+    """Build the pipeline on first use; schema reflection needs the database."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = GenerateValidatePipeline(load_validator(VALIDATOR_DB_URI))
+        return _pipeline
+
+# Build the crew off the request path so the port opens immediately
+SQL_AGENT_WARMUP = os.getenv("SQL_AGENT_WARMUP", "1") == "1"
+# Failed builds (e.g. Ollama not up yet) are retried, backing off up to this many seconds
+SQL_AGENT_WARMUP_MAX_BACKOFF = float(os.getenv("SQL_AGENT_WARMUP_MAX_BACKOFF", "30"))
+warmup_error = None
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+
+def _warm_up():
+    global warmup_error
+    delay = 1.0
+    while True:
+        started = time.perf_counter()
+        try:
+            sql_agent.warm_up()
+            warmup_error = None
+            logger.info(f"SQL agent ready in {time.perf_counter() - started:.2f}s")
+            return
+        except Exception as e:
+            warmup_error = str(e)
+            logger.error(f"SQL agent warm-up failed: {warmup_error}; retrying in {delay:.0f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, SQL_AGENT_WARMUP_MAX_BACKOFF)
+
+def start_warm_up():
+    """Build the crew in the background unless it is built or already being built."""
+    global _warmup_thread
+    with _warmup_lock:
+        if sql_agent.is_ready() or (_warmup_thread is not None and _warmup_thread.is_alive()):
+            return
+        _warmup_thread = threading.Thread(target=_warm_up, name="sql-agent-warmup", daemon=True)
+        _warmup_thread.start()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if SQL_AGENT_WARMUP:
+        start_warm_up()
+    yield
+    close_http_client()
+
 app = FastAPI(
     title="SQL Query Generator API",
     description="API to convert natural language to SQL queries using AI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 class QueryRequest(BaseModel):
@@ -27,6 +96,12 @@ class QueryResponse(BaseModel):
     sql: str
     input_query: str
 
+class ValidatedQueryResponse(QueryResponse):
+    attempts: int
+    retries: int
+    latency_ms: float
+    checks: list
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -38,9 +113,25 @@ async def root():
 
 @app.get("/health")
 async def health():
-    """Health check endpoint for Kubernetes"""
+    """Liveness probe: the process is up and serving requests"""
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the SQL agent crew has been built"""
+    if sql_agent.is_ready():
+        return {"status": "ready"}
+    # An unready pod gets no traffic, so the probe itself starts the build
+    # when startup warm-up is disabled
+    start_warm_up()
+    status = "failed" if warmup_error else "starting"
+    return JSONResponse(status_code=503, content={"status": status, "error": warmup_error})
+
+@app.get("/metrics")
+async def metrics():
+    """Request coalescing counters for /generate-sql"""
+    return {"generate_sql": generation_flight.stats()}
+
 @app.post("/generate-sql", response_model=QueryResponse)
 async def generate_sql_endpoint(request: QueryRequest):
     """
@@ -54,7 +145,9 @@ async def generate_sql_endpoint(request: QueryRequest):
     """
     try:
         logger.info(f"Received query: {request.query}")
-        sql = generate_sql(request.query)
+        sql = await generation_flight.do(
+            normalize_query(request.query), generate_sql, request.query
+        )
         logger.info(f"Generated SQL: {sql}")
 
         return QueryResponse(
@@ -68,6 +161,96 @@ async def generate_sql_endpoint(request: QueryRequest):
             detail=f"Failed to generate SQL: {str(e)}"
         )
 
+@app.post("/generate-sql/validated", response_model=ValidatedQueryResponse)
+async def generate_validated_sql_endpoint(request: QueryRequest):
+    """
+    Generate SQL and validate it in-process with SQLValidator
+
+    Rejected candidates are regenerated with the validation error as
+    feedback. Only SQL that passed every check is returned; otherwise 422
+    with the per-attempt history.
+    """
+    if not VALIDATOR_DB_URI:
+        raise HTTPException(status_code=503, detail="Pipeline mode disabled: set VALIDATOR_DB_URI")
+    try:
+        logger.info(f"Received validated query: {request.query}")
+        pipeline = await asyncio.to_thread(get_pipeline)
+        result = await generation_flight.do(
+            "validated:" + normalize_query(request.query), pipeline.run, request.query
+        )
+        logger.info(
+            f"Validated SQL: {result['sql']} "
+            f"(attempts={result['attempts']}, latency_ms={result['latency_ms']})"
+        )
+        return ValidatedQueryResponse(**result)
+    except ValidatorUnavailable as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=501, detail=str(e))
+    except PipelineError as e:
+        logger.warning(f"{e} (latency_ms={e.latency_ms})")
+        raise HTTPException(
+            status_code=422,
+            detail={"message": str(e), "attempts": e.attempts, "latency_ms": e.latency_ms}
+        )
+    except Exception as e:
+        logger.error(f"Error generating validated SQL: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate SQL: {str(e)}"
+        )
+
+@app.post("/generate-sql/stream")
+async def generate_sql_stream_endpoint(request: QueryRequest):
+    """
+    Stream SQL generation as server-sent events
+
+    Emits a `token` event per LLM chunk, then a `final` event with the
+    complete SQL, guardrail verdict and first-token / total timings.
+    """
+    started = time.perf_counter()
+    logger.info(f"Received streaming query: {request.query}")
+
+    def events():
+        for event, data in stream_sql(request.query, started=started):
+            if event == "final":
+                logger.info(
+                    f"Streamed SQL: {data['sql']} "
+                    f"(first_token_ms={data['first_token_ms']}, total_ms={data['total_ms']})"
+                )
+            elif event == "error":
+                logger.error(data["detail"])
+            yield format_sse(event, data)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/generate-sql/batch")
+async def generate_sql_batch_endpoint(
+    request: Request,
+    concurrency: int = Query(DEFAULT_CONCURRENCY, ge=1, le=MAX_CONCURRENCY)
+):
+    """
+    Generate SQL for a JSONL body of questions
+
+    Streams one JSON result per line (sql, guardrail verdict, elapsed_ms)
+    in input order, followed by a final {"summary": ...} line.
+    """
+    body = (await request.body()).decode("utf-8")
+    logger.info(f"Received batch with concurrency={concurrency}")
+
+    def lines():
+        summary = BatchSummary()
+        for result in run_batch(read_questions(body.splitlines()), generate_sql, concurrency):
+            summary.add(result)
+            yield json.dumps(result) + "\n"
+        logger.info(f"Batch finished: {summary.as_dict()}")
+        yield json.dumps({"summary": summary.as_dict()}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
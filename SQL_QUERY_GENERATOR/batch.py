@@ -0,0 +1,186 @@
+"""
+Bulk NL-to-SQL generation over JSONL.
+
+Each input line is either a JSON string or an object with a `query` (or
+`question`) field and an optional `id`; lines without an id are keyed by
+their line number. Results are written as JSONL in input order.
+
+    python batch.py questions.jsonl --output results.jsonl --concurrency 8
+
+When --output already exists the run resumes: ids already present in it
+are skipped and new results are appended.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.guardrails import validate_sql
+
+
+DEFAULT_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+
+
+def _default_generate(query: str):
+    from sql_agent import generate_sql
+    return generate_sql(query)
+
+
+def id_key(item_id):
+    """Hashable form of an item id; ids may be any JSON value, including lists and objects."""
+    return json.dumps(item_id, sort_keys=True)
+
+
+def read_questions(lines):
+    """Yield {"id", "query"} items from JSONL lines, skipping blank ones."""
+    for index, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            yield {"id": index, "query": None, "error": "Invalid JSON line"}
+            continue
+        if isinstance(record, str):
+            record = {"query": record}
+        if not isinstance(record, dict):
+            yield {"id": index, "query": None, "error": "Expected an object or string"}
+            continue
+        yield {"id": record.get("id", index), "query": record.get("query") or record.get("question")}
+
+
+def generate_one(item, generate):
+    """Generate and guardrail-check SQL for one item, timing the whole step."""
+    started = time.perf_counter()
+    result = {"id": item["id"], "query": item["query"], "sql": None, "safe": False, "message": None, "error": None}
+    try:
+        if item.get("error") or not item["query"]:
+            raise ValueError(item.get("error") or "Missing query")
+        sql = str(generate(item["query"])).strip()
+        safe, message = validate_sql(sql)
+        result.update(sql=sql, safe=safe, message=message)
+    except Exception as e:
+        result["error"] = str(e)
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def run_batch(items, generate=None, concurrency: int = DEFAULT_CONCURRENCY, skip_ids=()):
+    """
+    Run `generate` over `items` on a bounded thread pool, yielding results
+    in input order as soon as each head-of-line item completes.
+
+    At most 2 x concurrency items are read ahead, so the input is consumed
+    lazily and memory stays flat for arbitrarily long files. `skip_ids`
+    holds id_key() values, as returned by load_checkpoint.
+    """
+    generate = generate or _default_generate
+    concurrency = max(1, concurrency)
+    skip = set(skip_ids)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="sql-batch") as pool:
+        for item in items:
+            if id_key(item["id"]) in skip:
+                continue
+            pending.append(pool.submit(generate_one, item, generate))
+            if len(pending) >= 2 * concurrency:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class BatchSummary:
+    """Running totals for a batch job."""
+
+    def __init__(self, skipped: int = 0):
+        self.started = time.perf_counter()
+        self.skipped = skipped
+        self.processed = 0
+        self.generated = 0
+        self.rejected = 0
+        self.errors = 0
+        self.item_ms = 0.0
+
+    def add(self, result):
+        self.processed += 1
+        self.item_ms += result["elapsed_ms"]
+        if result["error"]:
+            self.errors += 1
+        else:
+            self.generated += 1
+            if not result["safe"]:
+                self.rejected += 1
+
+    def as_dict(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "processed": self.processed,
+            "skipped": self.skipped,
+            "generated": self.generated,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "rejection_rate": round(self.rejected / self.generated, 4) if self.generated else 0.0,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+            "avg_item_ms": round(self.item_ms / self.processed, 2) if self.processed else 0.0,
+        }
+
+
+def load_checkpoint(path: str):
+    """
+    Return the ids already written to an output file, as id_key() values.
+
+    A trailing partial line (left by a crash mid-write) is truncated so
+    appended results start on a fresh line.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[: data.rfind(b"\n") + 1]
+    done = set()
+    for line in data.decode("utf-8").splitlines():
+        try:
+            done.add(id_key(json.loads(line)["id"]))
+        except (json.JSONDecodeError, KeyError, TypeError):
+            continue
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk NL-to-SQL generation over JSONL")
+    parser.add_argument("input", help="JSONL file of questions ('-' for stdin)")
+    parser.add_argument("--output", "-o", help="JSONL results file; resumed if it already exists. Defaults to stdout")
+    parser.add_argument("--concurrency", "-c", type=int, default=DEFAULT_CONCURRENCY, help="Parallel generations")
+    parser.add_argument("--no-resume", action="store_true", help="Overwrite --output instead of resuming it")
+    args = parser.parse_args(argv)
+
+    done = set()
+    if args.output and not args.no_resume:
+        done = load_checkpoint(args.output)
+    out = open(args.output, "w" if args.no_resume else "a", encoding="utf-8") if args.output else sys.stdout
+    src = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+
+    summary = BatchSummary(skipped=len(done))
+    try:
+        for result in run_batch(read_questions(src), concurrency=args.concurrency, skip_ids=done):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            summary.add(result)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if out is not sys.stdout:
+            out.close()
+        print(json.dumps({"summary": summary.as_dict()}), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
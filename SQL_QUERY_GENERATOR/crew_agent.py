@@ -1,6 +1,6 @@
 import json
-from crewai import Agent, Task, Crew
-from crewai.tools import tool
+import threading
+from pathlib import Path
 
 from utils.prompt_template import build_prompt
 from utils.table_mapping import map_tables
@@ -8,11 +8,14 @@ from utils.llm_client import call_llm
 from utils.guardrails import validate_sql
 
 
-with open("schema.json", "r") as f:
+# Resolved next to this file so the service works from any working directory
+with open(Path(__file__).with_name("schema.json"), "r") as f:
     schema = json.load(f)
 
+_crew = None
+_crew_lock = threading.Lock()
+
 
-@tool
 def generate_sql_tool(query: str):
     """Internal tool to generate SQL without external LLM."""
     tables = map_tables(query)
@@ -22,34 +25,45 @@ def generate_sql_tool(query: str):
     return {"query": query, "tables": tables, "sql": sql, "safe": safe, "message": msg}
 
 
-sql_agent = Agent(
-    name="SQL Generator Agent",
-    role="SQL expert",
-    goal="Generate SQL using internal logic",
-    backstory="A tool-driven agent that does NOT call any external LLM.",
-    llm=None,                       # THIS WILL NOW WORK AFTER UPDATE
-    tools=[generate_sql_tool],      # Agent uses ONLY this tool
-    allow_delegation=False,
-    verbose=True
-)
+def build_crew():
+    from crewai import Agent, Task, Crew
+    from crewai.tools import tool
 
+    sql_tool = tool(generate_sql_tool)
 
-sql_task = Task(
-    description="Use internal tools to generate SQL.",
-    agent=sql_agent,
-    expected_output="JSON containing SQL.",
-    tools=[generate_sql_tool]       # force tool execution
-)
+    sql_agent = Agent(
+        name="SQL Generator Agent",
+        role="SQL expert",
+        goal="Generate SQL using internal logic",
+        backstory="A tool-driven agent that does NOT call any external LLM.",
+        llm=None,                       # THIS WILL NOW WORK AFTER UPDATE
+        tools=[sql_tool],               # Agent uses ONLY this tool
+        allow_delegation=False,
+        verbose=True
+    )
 
+    sql_task = Task(
+        description="Use internal tools to generate SQL.",
+        agent=sql_agent,
+        expected_output="JSON containing SQL.",
+        tools=[sql_tool]                # force tool execution
+    )
 
-sql_crew = Crew(
-    agents=[sql_agent],
-    tasks=[sql_task],
-    verbose=True
-)
+    return Crew(
+        agents=[sql_agent],
+        tasks=[sql_task],
+        verbose=True
+    )
 
 
-def run_sql_agent(query: str):
-    return sql_crew.kickoff(inputs={"query": query})
+def get_crew():
+    global _crew
+    if _crew is None:
+        with _crew_lock:
+            if _crew is None:
+                _crew = build_crew()
+    return _crew
 
 
+def run_sql_agent(query: str):
+    return get_crew().kickoff(inputs={"query": query})
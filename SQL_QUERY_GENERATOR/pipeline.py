@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+from sql_stream import extract_sql
+from utils.guardrails import validate_sql
+from utils.llm_client import generate_llm
+from utils.prompt_template import build_prompt
+from utils.table_mapping import map_tables
+
+
+VALIDATOR_DB_URI = os.getenv("VALIDATOR_DB_URI")
+VALIDATOR_DIR = os.getenv(
+    "SQL_VALIDATOR_DIR", str(Path(__file__).resolve().parent.parent / "sql_validator_agent")
+)
+PIPELINE_MAX_ATTEMPTS = int(os.getenv("PIPELINE_MAX_ATTEMPTS", "3"))
+
+
+class ValidatorUnavailable(Exception):
+    """Raised when sql_validator_agent cannot be imported (not shipped in this image)."""
+
+
+class PipelineError(Exception):
+    """Raised when no attempt produced SQL that passed validation."""
+
+    def __init__(self, message, attempts, latency_ms):
+        super().__init__(message)
+        self.attempts = attempts
+        self.latency_ms = latency_ms
+
+
+def load_validator(db_uri: str):
+    """Import sql_validator_agent's SQLValidator in-process and reflect the schema once."""
+    if VALIDATOR_DIR not in sys.path:
+        sys.path.append(VALIDATOR_DIR)
+    try:
+        from validator import SQLValidator
+    except ImportError as e:
+        raise ValidatorUnavailable(
+            f"SQL validator not importable from {VALIDATOR_DIR} ({e}); "
+            f"mount sql_validator_agent there or set SQL_VALIDATOR_DIR"
+        ) from e
+    return SQLValidator(db_uri)
+
+
+def feedback_prompt(prompt: str, sql: str, error: str):
+    return (
+        f"{prompt}\n\n"
+        f"Your previous answer was rejected.\n"
+        f"Previous SQL: {sql}\n"
+        f"Error: {error}\n"
+        f"Return a corrected single SELECT statement only."
+    )
+
+
+class GenerateValidatePipeline:
+    """
+    Generate SQL and validate it in the same process.
+
+    The validator's reflected schema is reused for prompting, so the LLM
+    sees exactly the tables it will be checked against. A rejected
+    candidate is sent back to the LLM with the failing check's message,
+    up to `max_attempts` generations in total.
+    """
+
+    def __init__(self, validator, generate=None, max_attempts: int = PIPELINE_MAX_ATTEMPTS):
+        self.validator = validator
+        self.schema = validator.schema()
+        self.generate = generate or generate_llm
+        self.max_attempts = max(1, max_attempts)
+
+    def _tables(self, text: str):
+        known = {t.lower(): t for t in self.schema}
+        tables = [known[t] for t in map_tables(text) if t in known]
+        return tables or list(self.schema)
+
+    def check(self, sql: str):
+        """Cheap guardrail first, then the full validator. Returns (valid, message, checks)."""
+        safe, message = validate_sql(sql)
+        if not safe:
+            return False, message, [{"check": "Guardrail", "valid": False, "message": message}]
+        valid, checks = self.validator.validate(sql)
+        if not valid:
+            failed = checks[-1]
+            return False, f"{failed['check']}: {failed['message']}", checks
+        return True, "Valid", checks
+
+    def run(self, text: str):
+        started = time.perf_counter()
+        base_prompt = build_prompt(text, self.schema, self._tables(text))
+        prompt = base_prompt
+        attempts = []
+        for attempt in range(1, self.max_attempts + 1):
+            # The validator rejects ';', so drop the terminator LLMs like to add
+            sql = extract_sql(self.generate(prompt)).rstrip().rstrip(";").rstrip()
+            valid, message, checks = self.check(sql)
+            attempts.append({"attempt": attempt, "sql": sql, "valid": valid, "message": message})
+            if valid:
+                return {
+                    "sql": sql,
+                    "input_query": text,
+                    "attempts": attempt,
+                    "retries": attempt - 1,
+                    "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+                    "checks": checks,
+                }
+            prompt = feedback_prompt(base_prompt, sql, message)
+        raise PipelineError(
+            f"No valid SQL after {self.max_attempts} attempts: {attempts[-1]['message']}",
+            attempts,
+            round((time.perf_counter() - started) * 1000, 2),
+        )
@@ -1,50 +1,78 @@
-from crewai import Agent, Task, Crew
-from crewai.llm import LLM
-
-# -------------------
-# OLLAMA LLM
-# -------------------
-llm = LLM(
-    model="ollama/llama3",      # IMPORTANT → use ollama/<model>
-    temperature=0.0
-)
-
-# -------------------
-# AGENT
-# -------------------
-sql_agent = Agent(
-    name="SQL Generator",
-    role="SQL Expert",
-    backstory="You are a senior SQL developer who converts natural language into SQL queries.",
-    goal="Generate correct SQL from any English text.",
-    llm=llm,
-    verbose=True
-)
-
-# -------------------
-# TASK
-# -------------------
-sql_task = Task(
-    description="Convert this natural language text into an SQL query: {input}",
-    expected_output="Return ONLY the SQL query.",
-    agent=sql_agent
-)
-
-# -------------------
-# CREW
-# -------------------
-sql_crew = Crew(
-    agents=[sql_agent],
-    tasks=[sql_task],
-    verbose=True
-)
+import threading
 
-def generate_sql(text: str):
-    """Run agent and return final SQL string."""
-    result = sql_crew.kickoff(inputs={"input": text})
-    return result
+from utils.llm_client import litellm_http_handler, ollama_base_url
+
+# crewai (and litellm behind it) takes seconds to import, so the crew is
+# built on first use or by warm_up() from a background thread at startup.
+_crew = None
+_crew_lock = threading.Lock()
+
+
+def build_crew():
+    from crewai import Agent, Task, Crew
+    from crewai.llm import LLM
+
+    # -------------------
+    # OLLAMA LLM
+    # -------------------
+    llm = LLM(
+        model="ollama/llama3",      # IMPORTANT → use ollama/<model>
+        temperature=0.0,
+        base_url=ollama_base_url(),
+        # forwarded to litellm.completion: calls go through the shared keep-alive pool
+        client=litellm_http_handler()
+    )
+
+    # -------------------
+    # AGENT
+    # -------------------
+    sql_agent = Agent(
+        name="SQL Generator",
+        role="SQL Expert",
+        backstory="You are a senior SQL developer who converts natural language into SQL queries.",
+        goal="Generate correct SQL from any English text.",
+        llm=llm,
+        verbose=True
+    )
 
+    # -------------------
+    # TASK
+    # -------------------
+    sql_task = Task(
+        description="Convert this natural language text into an SQL query: {input}",
+        expected_output="Return ONLY the SQL query.",
+        agent=sql_agent
+    )
 
+    # -------------------
+    # CREW
+    # -------------------
+    return Crew(
+        agents=[sql_agent],
+        tasks=[sql_task],
+        verbose=True
+    )
 
 
+def get_crew():
+    """Return the process-wide crew, building it on first call."""
+    global _crew
+    if _crew is None:
+        with _crew_lock:
+            if _crew is None:
+                _crew = build_crew()
+    return _crew
 
+
+def warm_up():
+    get_crew()
+
+
+def is_ready():
+    return _crew is not None
+
+
+def generate_sql(text: str):
+    """Run agent and return final SQL string."""
+    result = get_crew().kickoff(inputs={"input": text})
+    return result
@@ -0,0 +1,68 @@
+import json
+import time
+from pathlib import Path
+
+from utils.guardrails import validate_sql
+from utils.llm_client import stream_llm
+from utils.prompt_template import build_prompt
+from utils.table_mapping import map_tables
+
+
+with open(Path(__file__).with_name("schema.json"), "r") as f:
+    schema = json.load(f)
+
+
+def extract_sql(text: str):
+    """Strip markdown code fences and surrounding whitespace from LLM output."""
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        lines = cleaned.split("\n")[1:]
+        if lines and lines[-1].strip() == "```":
+            lines = lines[:-1]
+        cleaned = "\n".join(lines).strip()
+    return cleaned
+
+
+def format_sse(event: str, data: dict):
+    """Encode one server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_sql(text: str, started: float = None, token_stream=None):
+    """
+    Generate SQL for `text`, yielding events as (name, data) tuples.
+
+    `token` events carry each LLM chunk as it arrives; the closing `final`
+    event carries the complete SQL, the guardrail verdict and timings
+    (`first_token_ms` is time-to-first-token, `total_ms` the full latency).
+    A failure mid-generation yields a single `error` event instead.
+    """
+    started = started if started is not None else time.perf_counter()
+    token_stream = token_stream or stream_llm
+
+    tables = map_tables(text)
+    prompt = build_prompt(text, schema, tables)
+
+    parts = []
+    first_token_ms = None
+    try:
+        for token in token_stream(prompt):
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter() - started) * 1000
+            parts.append(token)
+            yield "token", {"token": token}
+    except Exception as e:
+        yield "error", {"detail": f"Failed to generate SQL: {str(e)}"}
+        return
+
+    sql = extract_sql("".join(parts))
+    safe, message = validate_sql(sql)
+    yield "final", {
+        "sql": sql,
+        "input_query": text,
+        "tables": tables,
+        "safe": safe,
+        "message": message,
+        "first_token_ms": round(first_token_ms, 2) if first_token_ms is not None else None,
+        "total_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
@@ -0,0 +1,113 @@
+# tests/test_batch.py
+import json
+import random
+import threading
+import time
+
+import batch
+
+
+def fake_generate(query):
+    # Out-of-order completion: later items often finish first
+    time.sleep(random.uniform(0, 0.01))
+    if "drop" in query:
+        return "DROP TABLE student;"
+    if "boom" in query:
+        raise RuntimeError("ollama down")
+    return f"SELECT * FROM student WHERE name = '{query}';"
+
+
+def write_questions(path, queries):
+    path.write_text("\n".join(json.dumps({"query": q}) for q in queries) + "\n")
+
+
+def test_read_questions_formats():
+    lines = ['{"id": "a", "query": "q1"}', '', '"q2"', '{"question": "q3"}', 'not json']
+    items = list(batch.read_questions(lines))
+    assert [i["id"] for i in items] == ["a", 2, 3, 4]
+    assert [i["query"] for i in items] == ["q1", "q2", "q3", None]
+    assert items[-1]["error"] == "Invalid JSON line"
+
+
+def test_results_stay_in_input_order():
+    items = [{"id": i, "query": f"q{i}"} for i in range(50)]
+    results = list(batch.run_batch(items, fake_generate, concurrency=8))
+    assert [r["id"] for r in results] == list(range(50))
+    assert all(r["safe"] and r["elapsed_ms"] >= 0 for r in results)
+
+
+def test_concurrency_is_bounded():
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def tracked(query):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.005)
+        with lock:
+            active[0] -= 1
+        return "SELECT 1"
+
+    items = [{"id": i, "query": "q"} for i in range(40)]
+    list(batch.run_batch(items, tracked, concurrency=3))
+    assert peak[0] <= 3
+
+
+def test_summary_counts_rejections_and_errors():
+    items = list(batch.read_questions(['"ok"', '"drop it"', '"boom"', 'nope']))
+    summary = batch.BatchSummary()
+    for result in batch.run_batch(items, fake_generate, concurrency=2):
+        summary.add(result)
+    stats = summary.as_dict()
+    assert stats["processed"] == 4
+    assert stats["generated"] == 2 and stats["rejected"] == 1 and stats["errors"] == 2
+    assert stats["rejection_rate"] == 0.5
+
+
+def test_cli_resumes_from_checkpoint(tmp_path, monkeypatch):
+    src, out = tmp_path / "q.jsonl", tmp_path / "out.jsonl"
+    write_questions(src, [f"q{i}" for i in range(10)])
+    calls = []
+    monkeypatch.setattr(batch, "_default_generate", lambda q: calls.append(q) or "SELECT 1")
+
+    # Simulate a crash after 4 results plus a half-written fifth line
+    batch.main([str(src), "-o", str(out), "-c", "2"])
+    lines = out.read_text().splitlines()
+    out.write_text("\n".join(lines[:4]) + "\n" + lines[4][:10])
+    calls.clear()
+
+    batch.main([str(src), "-o", str(out), "-c", "2"])
+    assert calls == [f"q{i}" for i in range(4, 10)]
+    assert [json.loads(l)["id"] for l in out.read_text().splitlines()] == list(range(10))
+
+
+def test_structured_ids_are_generated_and_resumed(tmp_path, monkeypatch):
+    src, out = tmp_path / "q.jsonl", tmp_path / "out.jsonl"
+    src.write_text("\n".join(json.dumps(r) for r in [
+        {"id": ["a", 1], "query": "q0"}, {"id": {"k": "b"}, "query": "q1"}, {"id": 7, "query": "q2"},
+    ]) + "\n")
+    calls = []
+    monkeypatch.setattr(batch, "_default_generate", lambda q: calls.append(q) or "SELECT 1")
+
+    batch.main([str(src), "-o", str(out)])
+    assert [json.loads(l)["id"] for l in out.read_text().splitlines()] == [["a", 1], {"k": "b"}, 7]
+    out.write_text("\n".join(out.read_text().splitlines()[:2]) + "\n")
+    calls.clear()
+
+    batch.main([str(src), "-o", str(out)])
+    assert calls == ["q2"]
+
+
+def test_batch_endpoint(monkeypatch):
+    from fastapi.testclient import TestClient
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "generate_sql", fake_generate)
+    client = TestClient(app_module.app)
+    body = "\n".join(json.dumps({"id": i, "query": q}) for i, q in enumerate(["a", "drop", "b"]))
+    resp = client.post("/generate-sql/batch?concurrency=2", content=body)
+
+    assert resp.status_code == 200
+    rows = [json.loads(l) for l in resp.text.splitlines()]
+    assert [r["id"] for r in rows[:-1]] == [0, 1, 2]
+    assert rows[-1]["summary"]["rejected"] == 1
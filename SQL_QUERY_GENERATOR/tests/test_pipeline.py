@@ -0,0 +1,102 @@
+# tests/test_pipeline.py
+import sqlite3
+import sys
+
+import pytest
+
+from pipeline import GenerateValidatePipeline, PipelineError, load_validator
+from utils.guardrails import validate_sql
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT name, updated_at FROM student",
+    "SELECT is_deleted FROM student",
+    "  select id from student",
+])
+def test_guardrail_allows_identifiers_containing_keywords(sql):
+    assert validate_sql(sql) == (True, "Safe")
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT 1; DROP TABLE student",
+    "SELECT id FROM student WHERE 1=1; delete from student",
+    "UPDATE student SET year = 1",
+])
+def test_guardrail_rejects_forbidden_statements(sql):
+    assert validate_sql(sql)[0] is False
+
+
+@pytest.fixture
+def validator(tmp_path):
+    pytest.importorskip("sqlparse")
+    pytest.importorskip("sqlalchemy")
+    db = tmp_path / "academic.db"
+    conn = sqlite3.connect(db)
+    conn.executescript(
+        "CREATE TABLE student (student_id INTEGER PRIMARY KEY, name TEXT, year INT, updated_at TEXT);"
+        "CREATE TABLE marks (student_id INT, subject TEXT, marks INT);"
+    )
+    conn.close()
+    return load_validator(f"sqlite:///{db}")
+
+
+class ScriptedLLM:
+    """Returns canned answers in order and records every prompt it saw."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.prompts = []
+
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        return self.answers.pop(0)
+
+
+def test_valid_first_attempt(validator):
+    llm = ScriptedLLM("```sql\nSELECT name, updated_at FROM student WHERE year = 2;\n```")
+    result = GenerateValidatePipeline(validator, generate=llm).run("second year students")
+
+    assert result["sql"] == "SELECT name, updated_at FROM student WHERE year = 2"
+    assert result["attempts"] == 1 and result["retries"] == 0
+    assert result["latency_ms"] >= 0
+    # Prompt was built from the validator's reflected schema
+    assert "updated_at" in llm.prompts[0]
+
+
+def test_regenerates_with_feedback(validator):
+    llm = ScriptedLLM(
+        "SELECT * FROM student WHERE year = 7",
+        "SELECT * FROM nonexistent",
+        "SELECT * FROM student WHERE year = 4",
+    )
+    result = GenerateValidatePipeline(validator, generate=llm, max_attempts=3).run("final year students")
+
+    assert result["sql"] == "SELECT * FROM student WHERE year = 4"
+    assert result["retries"] == 2
+    assert "Invalid year value" in llm.prompts[1]
+    assert "Syntax: " in llm.prompts[2]
+
+
+def test_gives_up_after_max_attempts(validator):
+    llm = ScriptedLLM("DROP TABLE student", "DELETE FROM student")
+    with pytest.raises(PipelineError) as exc:
+        GenerateValidatePipeline(validator, generate=llm, max_attempts=2).run("remove everyone")
+
+    assert [a["valid"] for a in exc.value.attempts] == [False, False]
+    assert exc.value.latency_ms >= 0
+
+
+def test_validated_endpoint_without_validator_is_501(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+
+    import app as app_module
+    import pipeline
+
+    monkeypatch.setattr(app_module, "VALIDATOR_DB_URI", "sqlite://")
+    monkeypatch.setattr(app_module, "_pipeline", None)
+    monkeypatch.setattr(pipeline, "VALIDATOR_DIR", str(tmp_path))
+    # a validator imported by an earlier test would hide the missing directory
+    monkeypatch.setitem(sys.modules, "validator", None)
+    r = TestClient(app_module.app).post("/generate-sql/validated", json={"query": "all students"})
+    assert r.status_code == 501
+    assert "SQL_VALIDATOR_DIR" in r.json()["detail"]
@@ -0,0 +1,121 @@
+# tests/test_single_flight.py
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from utils import llm_client
+from utils.single_flight import SingleFlight, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  Top   students\tBY marks ") == normalize_query("top students by marks")
+
+
+def test_duplicates_share_one_execution():
+    runs = []
+
+    def slow_generate(query):
+        runs.append(query)
+        time.sleep(0.05)
+        return f"SQL for {query}"
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(
+            *[flight.do("same", slow_generate, "q") for _ in range(5)],
+            flight.do("other", slow_generate, "q2"),
+        )
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert results == ["SQL for q"] * 5 + ["SQL for q2"]
+    assert sorted(runs) == ["q", "q2"]
+    assert flight.stats() == {
+        "calls": 6, "executions": 2, "coalesced": 4, "failures": 0, "in_flight": 0,
+    }
+
+
+def test_completed_calls_are_not_cached():
+    async def main():
+        flight = SingleFlight()
+        await flight.do("k", lambda: 1)
+        await flight.do("k", lambda: 2)
+        return flight
+
+    assert asyncio.run(main()).executions == 2
+
+
+def test_exception_reaches_every_waiter():
+    gate = threading.Event()
+
+    def failing():
+        gate.wait(1)
+        raise RuntimeError("ollama down")
+
+    async def main():
+        flight = SingleFlight()
+        calls = [asyncio.ensure_future(flight.do("k", failing)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        gate.set()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.failures == 1 and flight.coalesced == 2
+
+
+def test_http_client_is_pooled(monkeypatch):
+    monkeypatch.setattr(llm_client, "_http_client", None)
+    first = llm_client.get_http_client()
+    assert llm_client.get_http_client() is first
+    llm_client.close_http_client()
+    assert llm_client.get_http_client() is not first
+    llm_client.close_http_client()
+
+
+def test_stream_llm_parses_ndjson(monkeypatch):
+    def handler(request):
+        assert request.url.path == "/api/generate"
+        lines = [{"response": "SELECT 1", "done": False}, {"response": ";", "done": False}, {"done": True}]
+        return httpx.Response(200, text="\n".join(json.dumps(l) for l in lines))
+
+    client = httpx.Client(base_url="http://ollama.test", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(llm_client, "_http_client", client)
+    assert list(llm_client.stream_llm("prompt")) == ["SELECT 1", ";"]
+
+
+def test_litellm_calls_use_the_shared_pool(monkeypatch):
+    litellm = pytest.importorskip("litellm")
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.path)
+        return httpx.Response(200, json={"model": "llama3", "response": "SELECT 1;", "done": True,
+                                         "prompt_eval_count": 3, "eval_count": 2})
+
+    client = httpx.Client(base_url="http://ollama.test", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(llm_client, "_http_client", client)
+    pooled = llm_client.litellm_http_handler()
+    response = litellm.completion(model="ollama/llama3", messages=[{"role": "user", "content": "q"}],
+                                  api_base="http://ollama.test", client=pooled)
+    assert response.choices[0].message.content == "SELECT 1;"
+    assert seen == ["/api/generate"]
+    # litellm closing its handler must not close the shared pool
+    pooled.close()
+    assert not client.is_closed
+
+
+def test_metrics_endpoint_reports_coalescing(monkeypatch):
+    from fastapi.testclient import TestClient
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "generation_flight", SingleFlight())
+    monkeypatch.setattr(app_module, "generate_sql", lambda q: "SELECT 1;")
+    client = TestClient(app_module.app)
+    assert client.post("/generate-sql", json={"query": "q"}).json()["sql"] == "SELECT 1;"
+    assert client.get("/metrics").json()["generate_sql"]["executions"] == 1
@@ -0,0 +1,79 @@
+# tests/test_stream.py
+import json
+import time
+
+import sql_stream
+
+
+CANNED_TOKENS = ["```sql\n", "SELECT id, name ", "FROM student ", "WHERE year = 3;", "\n```"]
+
+
+def fake_llm(prompt, delay=0.0):
+    for token in CANNED_TOKENS:
+        if delay:
+            time.sleep(delay)
+        yield token
+
+
+def parse_sse(body: str):
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_sql_emits_tokens_then_final():
+    events = list(sql_stream.stream_sql("names of third year students", token_stream=fake_llm))
+    tokens = [data["token"] for event, data in events if event == "token"]
+    assert tokens == CANNED_TOKENS
+
+    event, final = events[-1]
+    assert event == "final"
+    assert final["sql"] == "SELECT id, name FROM student WHERE year = 3;"
+    assert final["safe"] is True
+    assert final["message"] == "Safe"
+    assert 0 <= final["first_token_ms"] <= final["total_ms"]
+
+
+def test_stream_sql_reports_guardrail_rejection():
+    def unsafe_llm(prompt):
+        yield "DROP TABLE student;"
+
+    event, final = list(sql_stream.stream_sql("drop everything", token_stream=unsafe_llm))[-1]
+    assert event == "final"
+    assert final["safe"] is False
+
+
+def test_stream_sql_emits_error_event():
+    def broken_llm(prompt):
+        yield "SELECT"
+        raise ConnectionError("ollama unreachable")
+
+    events = list(sql_stream.stream_sql("anything", token_stream=broken_llm))
+    assert events[-1][0] == "error"
+    assert "ollama unreachable" in events[-1][1]["detail"]
+
+
+def test_first_token_latency_measured_separately():
+    events = list(sql_stream.stream_sql("x", token_stream=lambda p: fake_llm(p, delay=0.02)))
+    final = events[-1][1]
+    # First chunk lands after one delay, the whole answer after all of them.
+    assert final["first_token_ms"] >= 15
+    assert final["total_ms"] - final["first_token_ms"] >= 15 * (len(CANNED_TOKENS) - 1)
+
+
+def test_stream_endpoint(monkeypatch):
+    from fastapi.testclient import TestClient
+    import app as app_module
+
+    monkeypatch.setattr(sql_stream, "stream_llm", fake_llm)
+    client = TestClient(app_module.app)
+    resp = client.post("/generate-sql/stream", json={"query": "names of third year students"})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(resp.text)
+    assert [e for e, _ in events[:-1]] == ["token"] * len(CANNED_TOKENS)
+    assert events[-1][0] == "final"
+    assert events[-1][1]["sql"].startswith("SELECT id, name")
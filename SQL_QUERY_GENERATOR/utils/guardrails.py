@@ -1,14 +1,18 @@
+import re
+
 FORBIDDEN = ["insert", "update", "delete", "drop", "alter", "truncate"]
 
+# Whole words only, so identifiers such as updated_at or is_deleted pass
+_FORBIDDEN_RE = re.compile(r"\b(" + "|".join(FORBIDDEN) + r")\b")
+
 def validate_sql(sql: str):
-    s = sql.lower()
+    s = sql.strip().lower()
 
     if not s.startswith("select"):
         return False, "Only SELECT queries are allowed."
 
-    for f in FORBIDDEN:
-        if f in s:
-            return False, f"Forbidden keyword detected: {f}"
+    match = _FORBIDDEN_RE.search(s)
+    if match:
+        return False, f"Forbidden keyword detected: {match.group(1)}"
 
     return True, "Safe"
-
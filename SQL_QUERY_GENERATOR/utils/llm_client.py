@@ -1,5 +1,114 @@
+import json
+import os
+import threading
+
+
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.0"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+
+_http_client = None
+_client_lock = threading.Lock()
+
+
+def ollama_base_url():
+    """Normalise OLLAMA_HOST ("host", "host:port" or full URL) to a base URL."""
+    host = os.getenv("OLLAMA_HOST", "http://localhost:11434").rstrip("/")
+    if "://" not in host:
+        host = f"http://{host}"
+    if host.count(":") < 2:
+        host = f"{host}:11434"
+    return host
+
+
+def get_http_client():
+    """Process-wide keep-alive connection pool to the Ollama server."""
+    import httpx  # deferred: only needed once the first LLM call is made
+
+    global _http_client
+    with _client_lock:
+        if _http_client is None or _http_client.is_closed:
+            _http_client = httpx.Client(
+                base_url=ollama_base_url(),
+                timeout=LLM_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                    keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+                ),
+            )
+        return _http_client
+
+
+def litellm_http_handler():
+    """
+    litellm HTTP handler that sends requests through the shared pool, so the
+    crewai crew (which calls Ollama via litellm) reuses the same keep-alive
+    connections as the streaming endpoint.
+    """
+    from litellm.llms.custom_httpx.http_handler import HTTPHandler
+
+    class PooledHTTPHandler(HTTPHandler):
+        def __init__(self):
+            # no pool of its own: every request resolves the shared client,
+            # so it follows close_http_client() and the re-created pool
+            pass
+
+        @property
+        def client(self):
+            return get_http_client()
+
+        def close(self):
+            # the pool belongs to this module (closed at shutdown), not to litellm
+            pass
+
+    return PooledHTTPHandler()
+
+
+def close_http_client():
+    global _http_client
+    with _client_lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+
+
 def call_llm(prompt: str):
     # You can later replace this with Groq/OpenAI when needed.
     # For now we return a static demo SQL.
     return "SELECT id, name FROM student WHERE year = 3;"
 
+
+def generate_llm(prompt: str):
+    """Return Ollama's full (non-streamed) completion for `prompt`."""
+    payload = {
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": False,
+        "options": {"temperature": LLM_TEMPERATURE},
+    }
+    resp = get_http_client().post("/api/generate", json=payload)
+    resp.raise_for_status()
+    return resp.json().get("response", "")
+
+
+def stream_llm(prompt: str):
+    """Yield text chunks from Ollama's streaming /api/generate endpoint."""
+    payload = {
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": True,
+        "options": {"temperature": LLM_TEMPERATURE},
+    }
+    with get_http_client().stream("POST", "/api/generate", json=payload) as resp:
+        resp.raise_for_status()
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("response"):
+                yield chunk["response"]
+            if chunk.get("done"):
+                break
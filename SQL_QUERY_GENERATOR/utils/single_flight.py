@@ -0,0 +1,52 @@
+import asyncio
+
+
+def normalize_query(query: str):
+    """Key used to detect duplicate questions: case-folded, whitespace collapsed."""
+    return " ".join(query.split()).casefold()
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key.
+
+    The first caller for a key runs `fn` in a worker thread; callers that
+    arrive while it is still running await the same result (or exception)
+    instead of starting their own run. Nothing is cached once the call
+    completes.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    async def do(self, key, fn, *args):
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.coalesced += 1
+        # shield: one caller disconnecting must not cancel the shared run
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            self.failures += 1
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "in_flight": len(self._inflight),
+        }
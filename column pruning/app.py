@@ -1,10 +1,12 @@
 import streamlit as st
-import pandas as pd
 import os
 import json
 from pathlib import Path
 
+import pyarrow as pa
 from column_agent import ColumnPruningAgent   # <-- YOU MUST SAVE YOUR CLASS AS column_agent.py
+from dataset import DatasetSource, format_bytes
+from upload_cache import materialize
 
 
 st.set_page_config(page_title="Column Pruning Agent", layout="wide")
@@ -15,45 +17,64 @@ if not os.getenv("GOOGLE_API_KEY"):
     st.error("❌ GOOGLE_API_KEY is not set. Export it or pass it in Docker.")
     st.stop()
 
+
+@st.cache_resource
+def get_agent() -> ColumnPruningAgent:
+    # One agent (and LLM client) per process, shared across sessions and reruns
+    return ColumnPruningAgent()
+
+
+def cached_upload(uploaded):
+    """Path of the upload's Arrow cache entry; the bytes are hashed once per session."""
+    key = (uploaded.name, uploaded.size, getattr(uploaded, "file_id", None))
+    paths = st.session_state.setdefault("upload_paths", {})
+    # The entry may have been evicted since this session first saw the upload
+    if key not in paths or not paths[key].exists():
+        paths[key] = materialize(uploaded.getvalue(), uploaded.name)
+    return paths[key]
+
+
 uploaded_file = st.file_uploader("Upload dataset (.csv / .xlsx / parquet)", type=["csv", "xlsx", "xls", "parquet"])
 
 if uploaded_file:
-    suffix = uploaded_file.name.lower()
-
-    if suffix.endswith(".csv"):
-        df = pd.read_csv(uploaded_file)
-    elif suffix.endswith((".xlsx", ".xls")):
-        df = pd.read_excel(uploaded_file)
-    elif suffix.endswith(".parquet"):
-        df = pd.read_parquet(uploaded_file)
-    else:
+    try:
+        # Parsed once into a memory-mapped Arrow file; reruns and projections read from it
+        ds = DatasetSource(cached_upload(uploaded_file))
+    except pa.ArrowException as e:
+        st.error(f"Could not read this file: {e}")
+        st.stop()
+    except ValueError:
         st.error("Unsupported format")
         st.stop()
 
-    st.success(f"Loaded dataset with {df.shape[0]} rows and {df.shape[1]} columns.")
-    st.write(df.head())
+    # Only the header and a preview are parsed until pruning picks the columns
+    columns = ds.columns
+    st.success(f"Detected {len(columns)} columns.")
+    st.write(ds.head(5))
 
     query = st.text_input("Enter natural language query:", placeholder="Example: Show average grade by gender")
 
     mode = st.radio(
         "Select pruning mode",
-        ["LLM reasoning", "Offline heuristic"],
+        ["Auto (heuristic first)", "LLM reasoning", "Offline heuristic"],
         horizontal=True
     )
 
     run_btn = st.button("🚀 Run Column Pruning")
 
     if run_btn and query.strip():
-        agent = ColumnPruningAgent()
-
-        columns = list(df.columns)
+        agent = get_agent()
 
         if mode == "Offline heuristic":
-            pruned = agent.prune_offline_simple(query, columns)
-            reasons = {c: "Selected by heuristic pattern matching." for c in pruned}
+            ranked = agent.rank_offline(query, columns)
+            pruned = [c for c, _ in ranked]
+            reasons = {c: f"Heuristic relevance score {score:.2f}" for c, score in ranked}
             pruned_out = [c for c in columns if c not in pruned]
-        else:
+        elif mode == "LLM reasoning":
             pruned, reasons, pruned_out = agent.prune_with_reason(query, columns)
+        else:
+            pruned, reasons, pruned_out, info = agent.prune_auto(query, columns)
+            st.caption(f"Answered by **{info['tier']}** tier (heuristic confidence {info['confidence']:.2f})")
 
         st.subheader("✅ Selected Columns")
         st.write(pruned)
@@ -67,7 +88,12 @@ if uploaded_file:
         st.write(f"Kept **{kept}/{len(columns)}** columns → Removed **{removed}** ({removed/len(columns)*100:.1f}%)")
 
         st.subheader("📄 Preview of pruned dataset")
-        st.write(df[pruned].head())
+        pruned_df = ds.project(pruned)
+        st.caption(
+            f"Loaded {pruned_df.shape[0]} rows × {pruned_df.shape[1]} columns "
+            f"({format_bytes(pruned_df.memory_usage(deep=True).sum())} in memory)"
+        )
+        st.write(pruned_df.head())
 
         with st.expander("🔎 Full reasoning"):
             st.json(reasons)
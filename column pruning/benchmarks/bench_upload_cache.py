@@ -0,0 +1,71 @@
+"""
+Benchmark Streamlit rerun latency with and without the upload cache.
+
+    python benchmarks/bench_upload_cache.py --mb 100 --reruns 5
+
+Simulates what app.py does on each rerun for a generated CSV of about
+`--mb` megabytes: read the columns, show a 5-row preview and project the
+pruned columns. "before" parses the raw upload bytes every time; "after"
+hashes and converts them once, then memory-maps the Arrow cache entry.
+"""
+from pathlib import Path
+import argparse
+import io
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd  # noqa: E402
+
+from dataset import DatasetSource  # noqa: E402
+from upload_cache import materialize  # noqa: E402
+
+STUDENT_CSV = Path(__file__).resolve().parent.parent / "student_data.csv"
+PRUNED = ["G3", "sex", "age"]
+
+
+def synthetic_csv(megabytes: float) -> bytes:
+    frame = pd.read_csv(STUDENT_CSV)
+    header = (",".join(frame.columns) + "\n").encode()
+    block = frame.to_csv(index=False, header=False).encode()
+    return header + block * max(1, int(megabytes * 1024 * 1024 // len(block)))
+
+
+def rerun(ds: DatasetSource) -> None:
+    ds.columns
+    ds.head(5)
+    ds.project(PRUNED)
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=100)
+    parser.add_argument("--reruns", type=int, default=5)
+    args = parser.parse_args()
+
+    data = synthetic_csv(args.mb)
+    print(f"upload: {len(data) / 1024 / 1024:.1f} MB CSV, projecting {PRUNED}")
+
+    before = [timed(lambda: rerun(DatasetSource(io.BytesIO(data), name="upload.csv"))) for _ in range(args.reruns)]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        first = timed(lambda: materialize(data, "upload.csv", cache_dir))
+        path = materialize(data, "upload.csv", cache_dir)
+        after = [timed(lambda: rerun(DatasetSource(path))) for _ in range(args.reruns)]
+
+    print(f"before: mean {statistics.mean(before):.1f} ms per rerun (raw bytes re-parsed)")
+    print(f"after:  mean {statistics.mean(after):.1f} ms per rerun (memory-mapped Arrow cache)")
+    print(f"        one-time hash + conversion {first:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
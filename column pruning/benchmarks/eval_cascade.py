@@ -0,0 +1,61 @@
+"""
+Evaluate the heuristic-first pruning cascade on a labelled query corpus.
+
+    python benchmarks/eval_cascade.py
+    python benchmarks/eval_cascade.py --sweep 0.5 0.6 0.7 0.8 0.9
+    python benchmarks/eval_cascade.py --llm      # compare against live Gemini answers
+
+Reports, per confidence threshold, how many queries would still reach the
+LLM and how often the heuristic answer agrees with the reference (the
+corpus labels by default, or the LLM's own keep list with --llm).
+"""
+from pathlib import Path
+import argparse
+import json
+import sys
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from cascade import DEFAULT_THRESHOLD, evaluate_cascade  # noqa: E402
+from dataset import DatasetSource  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=str, default=str(Path(__file__).with_name("cascade_corpus.jsonl")))
+    parser.add_argument("--file", type=str, default=str(ROOT / "student_data.csv"), help="Dataset whose columns the corpus refers to")
+    parser.add_argument("--sweep", type=float, nargs="+", default=[DEFAULT_THRESHOLD], help="Thresholds to evaluate")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--llm", action="store_true", help="Measure agreement against live LLM decisions (needs GOOGLE_API_KEY)")
+    args = parser.parse_args()
+
+    with open(args.corpus, "r", encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    columns = DatasetSource(args.file).columns
+
+    reference = None
+    if args.llm:
+        from column_agent import ColumnPruningAgent
+        from decision_cache import DecisionCache
+
+        agent = ColumnPruningAgent(cache=DecisionCache(None))
+        answers = {}
+
+        def reference(query):
+            if query not in answers:
+                answers[query] = agent.prune_with_reason(query, columns)[0]
+            return answers[query]
+
+    print(f"corpus: {len(corpus)} queries over {len(columns)} columns, reference: {'llm' if args.llm else 'labels'}")
+    print(f"{'threshold':>9}  {'llm calls':>9}  {'call rate':>9}  {'agreement':>9}  {'jaccard':>7}")
+    for threshold in args.sweep:
+        r = evaluate_cascade(corpus, columns, threshold, args.top_k, reference=reference)
+        print(
+            f"{threshold:9.2f}  {r['llm_calls']:>4d}/{r['queries']:<4d}  {r['llm_call_rate'] * 100:8.1f}%  "
+            f"{r['agreement'] * 100:8.1f}%  {r['mean_jaccard']:7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Confidence scoring for the heuristic-first pruning cascade.
+
+The offline ranker is trusted on its own when the query names columns
+plainly ("average G3 by sex"); anything vaguer is escalated to the LLM.
+Confidence is computed over the query's content tokens (stopwords and
+aggregation words such as "average" or "count" are ignored) from three
+signals:
+
+- exact:     share of tokens that are some column's full name
+- coverage:  share of tokens that match any column token at all
+- ambiguity: share of matched, non-exact tokens shared by several columns
+"""
+from typing import Dict
+import os
+
+from ranking import ColumnRanker, _norm, query_tokens, ranker_for
+
+
+# Words that describe the operation rather than a column
+AGGREGATE_WORDS = frozenset(_norm(w) for w in (
+    "average avg mean median total sum count number max maximum min minimum "
+    "highest lowest top most least distribution compare versus vs group grouped "
+    "breakdown across how many much list"
+).split())
+
+EXACT_WEIGHT = 0.5
+COVERAGE_WEIGHT = 0.3
+CLARITY_WEIGHT = 0.2
+
+DEFAULT_THRESHOLD = float(os.getenv("PRUNE_CASCADE_THRESHOLD", "0.8"))
+
+
+def heuristic_confidence(ranker: ColumnRanker, query: str) -> Dict[str, float]:
+    """Score in [0, 1] of how safely the ranker's answer can skip the LLM."""
+    tokens = [t for t in query_tokens(query) if t not in AGGREGATE_WORDS]
+    if not tokens:
+        return {"confidence": 0.0, "exact": 0.0, "coverage": 0.0, "ambiguity": 0.0}
+
+    matched = exact = ambiguous = 0
+    for tok in tokens:
+        df = ranker.document_frequency(tok)
+        if not df:
+            continue
+        matched += 1
+        if ranker.is_column_name(tok):
+            exact += 1
+        elif df > 1:
+            ambiguous += 1
+
+    exact_share = exact / len(tokens)
+    coverage = matched / len(tokens)
+    ambiguity = ambiguous / matched if matched else 1.0
+    confidence = (
+        EXACT_WEIGHT * exact_share
+        + COVERAGE_WEIGHT * coverage
+        + CLARITY_WEIGHT * (1.0 - ambiguity)
+    )
+    return {
+        "confidence": round(confidence, 4),
+        "exact": round(exact_share, 4),
+        "coverage": round(coverage, 4),
+        "ambiguity": round(ambiguity, 4),
+    }
+
+
+def jaccard(a, b) -> float:
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def evaluate_cascade(corpus, columns, threshold: float = DEFAULT_THRESHOLD, top_k: int = 10,
+                     descriptions=None, reference=None) -> Dict[str, float]:
+    """Replay a labelled query corpus through the heuristic tier.
+
+    `corpus` is an iterable of {"query", "keep"} dicts. `reference(query)`
+    optionally returns the LLM's keep list to measure agreement against;
+    without it the labelled "keep" sets stand in for the LLM.
+    """
+    ranker = ranker_for(columns, descriptions)
+    total = answered = exact_matches = 0
+    overlap = 0.0
+    for item in corpus:
+        total += 1
+        ranked = ranker.rank(item["query"], top_k)
+        if not ranked or heuristic_confidence(ranker, item["query"])["confidence"] < threshold:
+            continue
+        answered += 1
+        expected = reference(item["query"]) if reference else item["keep"]
+        keep = [c for c, _ in ranked]
+        exact_matches += set(keep) == set(expected)
+        overlap += jaccard(keep, expected)
+    return {
+        "queries": total,
+        "heuristic_answers": answered,
+        "llm_calls": total - answered,
+        "llm_call_rate": (total - answered) / total if total else 0.0,
+        "agreement": exact_matches / answered if answered else 1.0,
+        "mean_jaccard": overlap / answered if answered else 1.0,
+    }
@@ -1,4 +1,4 @@
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import ast
 import os
 import argparse
@@ -11,13 +11,28 @@ from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
 import pandas as pd
 
+from dataset import (
+    DEFAULT_CHUNK_ROWS, DatasetSource, compact_dtypes, compaction_report, format_bytes, load_dataset,
+    measure_projection, peak_rss_bytes, stream_filter, stream_value_counts, value_mask,
+)
+from decision_cache import DecisionCache, normalize_query
+from cascade import DEFAULT_THRESHOLD, heuristic_confidence
+from column_profile import describe_columns, get_profile, profile_value_counts
+from partitioned import scan_filtered
+from ranking import ranker_for
+
 load_dotenv()
 
 class ColumnPruningAgent:
-    def __init__(self, model: str | None = None):
+    def __init__(self, model: str | None = None, cache: DecisionCache | None = None):
         # Prefer env override, then fallback to a broadly available, supported model name
         effective_model = model or os.getenv("GEMINI_MODEL", "gemini-1.5-flash-latest")
+        self.model_name = effective_model
         self.llm = ChatGoogleGenerativeAI(model=effective_model)
+        # Decisions are reused across calls, CLI runs and replicas; PRUNE_CACHE=0 disables
+        if cache is None and os.getenv("PRUNE_CACHE", "1") != "0":
+            cache = DecisionCache()
+        self.cache = cache
         self.prompt = PromptTemplate(
             input_variables=["query", "columns"],
             template=(
@@ -35,11 +50,21 @@ class ColumnPruningAgent:
         )
         self.chain = self.prompt | self.llm | StrOutputParser()
 
-    def prune_with_reason(self, query: str, columns: List[str]) -> Tuple[List[str], Dict[str, str], List[str]]:
-        """Return pruned columns, reasons per column, and pruned-out columns.
-
-        LLM is asked to produce strict JSON: {"keep": [..], "prune": [..], "reasons": {col: reason}}
-        """
+    @staticmethod
+    def _columns_text(columns: List[str], column_info: Optional[Dict[str, str]] = None) -> str:
+        """Comma-separated names, or one line per column with its profile summary."""
+        if not column_info:
+            return ", ".join(columns)
+        return "\n".join(f"- {c} ({column_info[c]})" if c in column_info else f"- {c}" for c in columns)
+
+    def _cache_key(self, query: str, columns: List[str], column_info: Optional[Dict[str, str]]) -> Optional[str]:
+        if not self.cache:
+            return None
+        # Profile-enriched prompts can answer differently, so they are cached separately
+        model = self.model_name + ("+profile" if column_info else "")
+        return self.cache.make_key(query, columns, model)
+
+    def _reason_chain(self):
         reason_prompt = PromptTemplate(
             input_variables=["query", "columns"],
             template=(
@@ -51,15 +76,13 @@ class ColumnPruningAgent:
                 "- No imaginary fields.\n"
                 "- Be minimal but sufficient.\n\n"
                 "Output STRICT JSON with keys: keep (list of columns to keep), prune (list to drop), reasons (object mapping each column to a short reason).\n"
-                "Example: {\"keep\":[\"G3\",\"sex\"],\"prune\":[\"age\"],\"reasons\":{\"G3\":\"target metric\",\"sex\":\"grouping\",\"age\":\"not needed\"}}\n"
+                "Example: {{\"keep\":[\"G3\",\"sex\"],\"prune\":[\"age\"],\"reasons\":{{\"G3\":\"target metric\",\"sex\":\"grouping\",\"age\":\"not needed\"}}}}\n"
             ),
         )
-        chain = reason_prompt | self.llm | StrOutputParser()
-        response_text = chain.invoke({
-            "query": query,
-            "columns": ", ".join(columns),
-        })
+        return reason_prompt | self.llm | StrOutputParser()
 
+    @staticmethod
+    def _parse_reasoned(response_text: str, columns: List[str]) -> Tuple[List[str], Dict[str, str], List[str]]:
         # Clean up the response - remove markdown code blocks if present
         cleaned_text = response_text.strip()
         if cleaned_text.startswith("```"):
@@ -119,41 +142,133 @@ class ColumnPruningAgent:
 
         return pruned, norm_reasons, norm_prune_out
 
-    def prune_offline_simple(self, query: str, columns: List[str]) -> List[str]:
-        """Heuristic, LLM-free pruning by keyword matching.
-        - Matches column names/tokens appearing in the query (case-insensitive)
-        - Adds common target/metric/group-by terms
+    def prune_with_reason(self, query: str, columns: List[str], column_info: Optional[Dict[str, str]] = None
+                          ) -> Tuple[List[str], Dict[str, str], List[str]]:
+        """Return pruned columns, reasons per column, and pruned-out columns.
+
+        LLM is asked to produce strict JSON: {"keep": [..], "prune": [..], "reasons": {col: reason}}
+        Decisions are served from the cache when this query/columns/model was answered before.
+        `column_info` (see column_profile.describe_columns) adds per-column summaries to the prompt.
+        """
+        cache_key = self._cache_key(query, columns, column_info)
+        if cache_key:
+            hit = self.cache.get(cache_key, need_reasons=True)
+            if hit is not None:
+                return hit["keep"], hit["reasons"], hit["prune"]
+
+        response_text = self._reason_chain().invoke({
+            "query": query,
+            "columns": self._columns_text(columns, column_info),
+        })
+        pruned, norm_reasons, norm_prune_out = self._parse_reasoned(response_text, columns)
+
+        if cache_key:
+            self.cache.put(cache_key, pruned, norm_reasons, norm_prune_out)
+        return pruned, norm_reasons, norm_prune_out
+
+    async def aprune_with_reason_batch(self, queries: List[str], columns: List[str], max_concurrency: int = 8,
+                                       column_info: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """prune_with_reason for many queries over one column set.
+
+        Cached decisions are answered directly, repeated queries share one
+        prompt, and the rest go through the chain's async batch API with at
+        most `max_concurrency` LLM calls in flight. Returns one dict per query:
+        {"keep", "reasons", "prune", "tier": "cache" | "llm"} or {"error": str}.
         """
-        q = query.lower()
-        tokens = set(q.replace("(", " ").replace(")", " ").replace(",", " ").split())
-        # Seed keywords
-        keywords = {
-            "sum", "avg", "average", "mean", "total", "count", "by", "group", "trend" ,
-            "year", "month", "day", "date",
-        }
-        tokens |= keywords
-        selected: List[str] = []
-        for c in columns:
-            cl = c.lower()
-            name_parts = set(cl.replace("_", " ").split())
-            if cl in q or name_parts & tokens:
-                selected.append(c)
-        # Minimal safeguard: if nothing matched, return columns most mentioned in datasets like grades
-        if not selected:
-            for c in ["G3", "G2", "G1", "sex", "school", "internet", "absences"]:
-                if c in columns:
-                    selected.append(c)
-        # Deduplicate preserving order
-        seen = set(); dedup = []
-        for c in selected:
-            if c not in seen:
-                seen.add(c); dedup.append(c)
-        return dedup
-
-    def prune(self, query: str, columns: List[str]) -> List[str]:
+        results: List[Optional[Dict]] = [None] * len(queries)
+        pending: Dict[str, List[int]] = {}
+        for i, query in enumerate(queries):
+            cache_key = self._cache_key(query, columns, column_info)
+            hit = self.cache.get(cache_key, need_reasons=True) if cache_key else None
+            if hit is not None:
+                results[i] = {"keep": hit["keep"], "reasons": hit["reasons"], "prune": hit["prune"], "tier": "cache"}
+            else:
+                pending.setdefault(cache_key or normalize_query(query), []).append(i)
+
+        if pending:
+            groups = list(pending.values())
+            columns_text = self._columns_text(columns, column_info)
+            outputs = await self._reason_chain().abatch(
+                [{"query": queries[idx[0]], "columns": columns_text} for idx in groups],
+                config={"max_concurrency": max_concurrency},
+                return_exceptions=True,
+            )
+            for idx, output in zip(groups, outputs):
+                try:
+                    if isinstance(output, Exception):
+                        raise output
+                    keep, reasons, pruned_out = self._parse_reasoned(output, columns)
+                except Exception as e:
+                    result = {"error": str(e)}
+                else:
+                    result = {"keep": keep, "reasons": reasons, "prune": pruned_out, "tier": "llm"}
+                    cache_key = self._cache_key(queries[idx[0]], columns, column_info)
+                    if cache_key:
+                        self.cache.put(cache_key, keep, reasons, pruned_out)
+                for i in idx:
+                    results[i] = dict(result)
+        return results
+
+    def rank_offline(self, query: str, columns: List[str], top_k: Optional[int] = 10,
+                     descriptions: Optional[Dict[str, str]] = None) -> List[Tuple[str, float]]:
+        """LLM-free relevance ranking: top-k (column, score) pairs, best first.
+
+        The column-token matrix is built once per schema and reused (see ranking.py).
+        """
+        return ranker_for(columns, descriptions).rank(query, top_k)
+
+    def prune_offline_simple(self, query: str, columns: List[str], top_k: Optional[int] = 10,
+                             descriptions: Optional[Dict[str, str]] = None) -> List[str]:
+        """Heuristic, LLM-free pruning: the top-k columns whose name parts or
+        descriptions match the query, best match first. Empty when nothing matches.
+        """
+        return [c for c, _ in self.rank_offline(query, columns, top_k, descriptions)]
+
+    def heuristic_answer(self, query: str, columns: List[str], threshold: Optional[float] = None,
+                         top_k: Optional[int] = 10, descriptions: Optional[Dict[str, str]] = None
+                         ) -> Tuple[Optional[Tuple[List[str], Dict[str, str], List[str]]], Dict]:
+        """The offline ranker's (keep, reasons, pruned_out) if its confidence clears
+        `threshold`, else None, together with the confidence breakdown."""
+        threshold = DEFAULT_THRESHOLD if threshold is None else threshold
+        ranker = ranker_for(columns, descriptions)
+        info: Dict = heuristic_confidence(ranker, query)
+        ranked = ranker.rank(query, top_k)
+        if not ranked or info["confidence"] < threshold:
+            return None, info
+        keep = [c for c, _ in ranked]
+        reasons = {c: f"Heuristic relevance score {score:.2f}." for c, score in ranked}
+        info["tier"] = "heuristic"
+        return (keep, reasons, [c for c in columns if c not in keep]), info
+
+    def prune_auto(self, query: str, columns: List[str], threshold: Optional[float] = None,
+                   top_k: Optional[int] = 10, descriptions: Optional[Dict[str, str]] = None,
+                   column_info: Optional[Dict[str, str]] = None
+                   ) -> Tuple[List[str], Dict[str, str], List[str], Dict]:
+        """Heuristic-first pruning: answer from the offline ranker when its
+        confidence clears `threshold`, otherwise fall back to prune_with_reason.
+
+        Returns (keep, reasons, pruned_out, info); info["tier"] is "heuristic",
+        "cache" or "llm" and carries the confidence breakdown (see cascade.py).
+        """
+        answer, info = self.heuristic_answer(query, columns, threshold, top_k, descriptions)
+        if answer is not None:
+            return (*answer, info)
+
+        hits_before = self.cache.stats()["hits"] if self.cache else 0
+        keep, reasons, pruned_out = self.prune_with_reason(query, columns, column_info)
+        info["tier"] = "cache" if self.cache and self.cache.stats()["hits"] > hits_before else "llm"
+        return keep, reasons, pruned_out, info
+
+    def prune(self, query: str, columns: List[str], column_info: Optional[Dict[str, str]] = None) -> List[str]:
+        cache_key = self._cache_key(query, columns, column_info)
+        if cache_key:
+            hit = self.cache.get(cache_key)
+            if hit is not None:
+                return hit["keep"]
+
         response_text = self.chain.invoke({
             "query": query,
-            "columns": ", ".join(columns),
+            "columns": self._columns_text(columns, column_info),
         })
 
         # Clean up the response - remove markdown code blocks if present
@@ -192,16 +307,59 @@ class ColumnPruningAgent:
         if not pruned:
             raise ValueError("No valid columns selected. Ensure you choose only from the available columns.")
 
+        if cache_key:
+            self.cache.put(cache_key, pruned)
         return pruned
 
 
+def _print_profile_counts(profile: Dict, column: str) -> None:
+    info = profile["columns"][column]
+    print(profile_value_counts(profile, column))
+    if len(info["top_values"]) < info["cardinality"]:
+        bound = "" if info["cardinality_exact"] else "over "
+        print(f"[Profile] top {len(info['top_values'])} of {bound}{info['cardinality']} distinct values")
+
+
+def _print_stream_stats(stats: Dict[str, int]) -> None:
+    peak = peak_rss_bytes()
+    scanned = stats.get("rows_scanned", stats.get("rows", 0))
+    print(
+        f"[Stream] scanned {scanned} rows in {stats['chunks']} chunks, "
+        f"peak memory {format_bytes(peak) if peak is not None else 'n/a'}"
+    )
+
+
+def _print_filtered(ds: DatasetSource, column: str, value, limit: int, columns: Optional[List[str]] = None,
+                    stream: bool = False, chunksize: int = DEFAULT_CHUNK_ROWS) -> None:
+    """First `limit` rows where column == value, reading only `columns` (all when None) plus `column`."""
+    if ds.kind in ("parquet", "partitioned"):
+        # Pushed down: non-matching partitions and row groups are never read
+        table, stats = scan_filtered(ds.source, column, value, columns, limit)
+        df = table.to_pandas()
+        print(compact_dtypes(df) if ds.compact else df)
+        skipped = stats["bytes"] - stats["bytes_scanned"]
+        pct = skipped / stats["bytes"] * 100.0 if stats["bytes"] else 0.0
+        print(
+            f"[Pushdown] scanned {stats['files_scanned']}/{stats['files']} files, "
+            f"{stats['row_groups_scanned']}/{stats['row_groups']} row groups, "
+            f"{format_bytes(stats['bytes_scanned'])} of {format_bytes(stats['bytes'])} ({pct:.1f}% skipped)"
+        )
+    elif stream:
+        filtered, stats = stream_filter(ds.source, ds.kind, column, value, limit, columns=columns, chunksize=chunksize)
+        print(filtered)
+        _print_stream_stats(stats)
+    else:
+        df = ds.full() if columns is None else ds.project(list(dict.fromkeys(list(columns) + [column])))
+        print(df[value_mask(df[column], value)].head(limit))
+
+
 if __name__ == "__main__":
     if not os.getenv("GOOGLE_API_KEY"):
         raise SystemExit("Please set GOOGLE_API_KEY in your environment (or .env) to run this program.")
 
     parser = argparse.ArgumentParser(description="Column Pruning Agent CLI")
     default_file = (Path(__file__).parent / "student_data.csv").resolve()
-    parser.add_argument("--file", type=str, default=str(default_file), help=f"Path to dataset (csv/parquet/xlsx). Defaults to {default_file}")
+    parser.add_argument("--file", type=str, default=str(default_file), help=f"Path to dataset (csv/parquet/xlsx, or a hive-partitioned parquet directory). Defaults to {default_file}")
     parser.add_argument("--query", type=str, help="Natural language query to answer")
     parser.add_argument("--show", action="store_true", help="Show the table (head) of the dataset")
     parser.add_argument("--limit", type=int, default=10, help="Number of rows to show when using --show")
@@ -213,6 +371,15 @@ if __name__ == "__main__":
     parser.add_argument("--reason", action="store_true", help="Also output keep/prune reasoning per column")
     parser.add_argument("--metrics", action="store_true", help="Also output efficiency metrics of pruning")
     parser.add_argument("--offline-simple", action="store_true", help="Use a heuristic, offline pruning (no LLM)")
+    parser.add_argument("--auto", action="store_true", help="Heuristic first; call the LLM only when its confidence is low")
+    parser.add_argument("--threshold", type=float, default=None, help=f"Confidence needed to skip the LLM with --auto (default {DEFAULT_THRESHOLD})")
+    parser.add_argument("--top-k", type=int, default=10, help="Max columns kept by --offline-simple ranking")
+    parser.add_argument("--stream", action="store_true", help="Scan the file in chunks with bounded memory (csv/parquet)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows per chunk with --stream")
+    parser.add_argument("--no-compact", action="store_true", help="Keep pandas' default dtypes instead of compacting on load")
+    parser.add_argument("--profile", action="store_true", help="Add per-column profile summaries (dtype, range, values) to LLM pruning prompts")
+    parser.add_argument("--no-profile", action="store_true", help="Count category values from the data instead of the profile sidecar")
+    parser.add_argument("--descriptions", type=str, help="JSON file mapping column name -> description/synonyms for offline ranking")
     args = parser.parse_args()
 
     # If no action flags were provided, default to interactive mode
@@ -227,50 +394,75 @@ if __name__ == "__main__":
 
     agent = ColumnPruningAgent()
 
+    descriptions = None
+    if args.descriptions:
+        with open(args.descriptions, "r", encoding="utf-8") as f:
+            descriptions = json.load(f)
+
     if args.file:
         path = Path(args.file)
         if not path.exists():
             raise SystemExit(f"File not found: {path}")
 
-        suffix = path.suffix.lower()
-        if suffix == ".csv":
-            df = pd.read_csv(path)
-        elif suffix in {".parquet", ".pq"}:
-            df = pd.read_parquet(path)
-        elif suffix in {".xlsx", ".xls"}:
-            df = pd.read_excel(path)
-        else:
-            raise SystemExit("Unsupported file type. Use csv, parquet, or xlsx/xls.")
+        try:
+            ds = DatasetSource(path, compact=not args.no_compact)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        # Only the header/schema is read here; rows are parsed on demand and,
+        # after pruning, only for the kept columns.
+        columns = ds.columns
 
         pd.set_option("display.max_columns", 200)
         pd.set_option("display.width", 200)
 
         if args.show:
-            print(df.head(args.limit))
+            print(ds.head(args.limit))
+
+        # Built in one streaming pass on first use, then read from <file>.profile.json
+        profile = None
+        if (args.category and not args.value and not args.no_profile) or (args.query and args.profile):
+            profile = get_profile(path, ds.kind, chunksize=args.chunksize)
+        column_info = describe_columns(profile, columns) if profile and args.profile else None
 
         if args.category and not args.value:
-            if args.category not in df.columns:
+            if args.category not in columns:
                 raise SystemExit(f"Column not found: {args.category}")
-            vals = df[args.category].value_counts(dropna=False).reset_index()
-            vals.columns = [args.category, "count"]
-            print(vals)
+            if profile is not None:
+                _print_profile_counts(profile, args.category)
+            elif args.stream:
+                counts, stats = stream_value_counts(ds.source, ds.kind, args.category, args.chunksize)
+                print(counts.reset_index())
+                _print_stream_stats(stats)
+            else:
+                vals = ds.project([args.category])[args.category].value_counts(dropna=False).reset_index()
+                vals.columns = [args.category, "count"]
+                print(vals)
 
         if args.category and args.value is not None:
-            if args.category not in df.columns:
+            if args.category not in columns:
                 raise SystemExit(f"Column not found: {args.category}")
-            filtered = df[df[args.category].astype(str) == str(args.value)]
-            print(filtered.head(args.limit))
+            # With a query, the filter runs after pruning so only kept columns are read
+            if not args.query:
+                _print_filtered(ds, args.category, args.value, args.limit, stream=args.stream, chunksize=args.chunksize)
 
         if args.query:
-            columns = list(df.columns)
+            cascade_info = None
             if args.offline_simple:
-                pruned_columns = agent.prune_offline_simple(args.query, columns)
-                reasons = {c: "Selected by heuristic keyword match." for c in pruned_columns}
+                ranked = agent.rank_offline(args.query, columns, args.top_k, descriptions)
+                pruned_columns = [c for c, _ in ranked]
+                reasons = {c: f"Heuristic relevance score {score:.2f}." for c, score in ranked}
                 pruned_out = [c for c in columns if c not in pruned_columns]
+            elif args.auto:
+                pruned_columns, reasons, pruned_out, cascade_info = agent.prune_auto(
+                    args.query, columns, args.threshold, args.top_k, descriptions, column_info
+                )
+                if not args.metrics:
+                    # --metrics prints the full [Cascade] breakdown instead
+                    print(f"\n[Answered by] {cascade_info['tier']} (confidence {cascade_info['confidence']:.2f})")
             elif args.reason or args.metrics:
-                pruned_columns, reasons, pruned_out = agent.prune_with_reason(args.query, columns)
+                pruned_columns, reasons, pruned_out = agent.prune_with_reason(args.query, columns, column_info)
             else:
-                pruned_columns = agent.prune(args.query, columns)
+                pruned_columns = agent.prune(args.query, columns, column_info)
                 reasons = {}
                 pruned_out = [c for c in columns if c not in pruned_columns]
             print("\n[Pruned Columns]")
@@ -286,11 +478,49 @@ if __name__ == "__main__":
                 kept = len(pruned_columns); total = len(columns); removed = total - kept
                 pct = (removed / total * 100.0) if total else 0.0
                 print(f"\n[Efficiency] kept={kept}, removed={removed} of {total} columns ({pct:.1f}% reduction)")
+                # Comparing full vs pruned loads would materialize the whole file
+                if not args.stream:
+                    io, raw = measure_projection(ds.source, ds.kind, pruned_columns)
+                    print(
+                        f"[Load] pruned {io['pruned_load_s'] * 1000:.1f} ms / {format_bytes(io['pruned_bytes'])} "
+                        f"vs full {io['full_load_s'] * 1000:.1f} ms / {format_bytes(io['full_bytes'])} "
+                        f"(saved {io['time_saved_s'] * 1000:.1f} ms, {format_bytes(io['bytes_saved'])} in memory)"
+                    )
+                    if "full_disk_bytes" in io:
+                        print(f"[Disk] read {format_bytes(io['pruned_disk_bytes'])} of {format_bytes(io['full_disk_bytes'])} compressed column data")
+                    rows = compaction_report(raw, compact_dtypes(raw))
+                    before = sum(r["before_bytes"] for r in rows); after = sum(r["after_bytes"] for r in rows)
+                    saved_pct = (1 - after / before) * 100.0 if before else 0.0
+                    print(f"[Compaction] {format_bytes(before)} -> {format_bytes(after)} ({saved_pct:.1f}% smaller)")
+                    for r in rows:
+                        print(
+                            f"  - {r['column']}: {r['before_dtype']} {format_bytes(r['before_bytes'])} -> "
+                            f"{r['after_dtype']} {format_bytes(r['after_bytes'])}"
+                        )
+                if cascade_info is not None:
+                    print(
+                        f"[Cascade] tier={cascade_info['tier']}, confidence={cascade_info['confidence']:.2f} "
+                        f"(exact={cascade_info['exact']:.2f}, coverage={cascade_info['coverage']:.2f}, "
+                        f"ambiguity={cascade_info['ambiguity']:.2f})"
+                    )
+                if agent.cache and not args.offline_simple:
+                    cs = agent.cache.stats()
+                    print(
+                        f"[Cache] hits={cs['hits']} (memory={cs['memory_hits']}, disk={cs['disk_hits']}), "
+                        f"misses={cs['misses']}, hit rate={cs['hit_rate'] * 100:.1f}%, "
+                        f"LLM calls avoided={cs['llm_calls_avoided']}"
+                    )
             if args.show_pruned:
                 try:
-                    print(df[pruned_columns].head(args.pruned_limit))
+                    if args.stream:
+                        print(load_dataset(ds.source, ds.kind, pruned_columns, nrows=args.pruned_limit))
+                    else:
+                        print(ds.project(pruned_columns).head(args.pruned_limit))
                 except Exception as e:
                     print(f"Error displaying pruned columns: {e}")
+            if args.category and args.value is not None:
+                print(f"\n[Filter] {args.category} == {args.value}")
+                _print_filtered(ds, args.category, args.value, args.limit, pruned_columns, args.stream, args.chunksize)
 
         if args.interactive:
             while True:
@@ -301,18 +531,22 @@ if __name__ == "__main__":
                         n = int(input(f"Rows to show [default {args.limit}]: ") or args.limit)
                     except Exception:
                         n = args.limit
-                    print(df.head(n))
+                    print(ds.head(n))
                 elif choice == "2":
                     cat = input("Category column name: ").strip()
-                    if cat not in df.columns:
+                    if cat not in columns:
                         print(f"Column not found: {cat}")
                         continue
-                    vals = df[cat].value_counts(dropna=False).reset_index()
-                    vals.columns = [cat, "count"]
-                    print(vals)
+                    if args.no_profile:
+                        vals = ds.project([cat])[cat].value_counts(dropna=False).reset_index()
+                        vals.columns = [cat, "count"]
+                        print(vals)
+                    else:
+                        profile = profile or get_profile(path, ds.kind, chunksize=args.chunksize)
+                        _print_profile_counts(profile, cat)
                 elif choice == "3":
                     cat = input("Category column name: ").strip()
-                    if cat not in df.columns:
+                    if cat not in columns:
                         print(f"Column not found: {cat}")
                         continue
                     val = input("Value to filter by: ").strip()
@@ -320,23 +554,22 @@ if __name__ == "__main__":
                         n = int(input(f"Rows to show [default {args.limit}]: ") or args.limit)
                     except Exception:
                         n = args.limit
-                    filtered = df[df[cat].astype(str) == str(val)]
-                    print(filtered.head(n))
+                    _print_filtered(ds, cat, val, n, stream=args.stream, chunksize=args.chunksize)
                 elif choice == "4":
                     q = input("Enter your query (natural language): ").strip()
-                    columns = list(df.columns)
                     try:
                         mode = input("Use offline heuristic? [y/N]: ").strip().lower()
                         if mode == "y":
-                            pruned = agent.prune_offline_simple(q, columns)
-                            reasons = {c: "Selected by heuristic keyword match." for c in pruned}
+                            ranked = agent.rank_offline(q, columns, args.top_k, descriptions)
+                            pruned = [c for c, _ in ranked]
+                            reasons = {c: f"Heuristic relevance score {score:.2f}." for c, score in ranked}
                             pruned_out = [c for c in columns if c not in pruned]
                         else:
                             explain = input("Show reasoning and metrics? [y/N]: ").strip().lower()
                             if explain == "y":
-                                pruned, reasons, pruned_out = agent.prune_with_reason(q, columns)
+                                pruned, reasons, pruned_out = agent.prune_with_reason(q, columns, column_info)
                             else:
-                                pruned = agent.prune(q, columns)
+                                pruned = agent.prune(q, columns, column_info)
                                 reasons = {}
                                 pruned_out = [c for c in columns if c not in pruned]
                         print("\n[Pruned Columns]")
@@ -348,7 +581,7 @@ if __name__ == "__main__":
                             except Exception:
                                 n = args.limit
                             try:
-                                print(df[pruned].head(n))
+                                print(ds.project(pruned).head(n))
                             except Exception as e:
                                 print(f"Error displaying pruned columns: {e}")
                         if reasons:
@@ -0,0 +1,242 @@
+"""
+Per-column dataset profiles stored as a sidecar file.
+
+One streaming pass records, for every column: dtype, row/null counts,
+cardinality, min/max (numeric columns) and the most frequent values. The
+result is written next to the dataset as `<file>.profile.json` and keyed by
+the file's SHA-256 (for a partitioned directory: its files' paths and
+bytes), so it is rebuilt only when the content changes.
+Category inspection is then answered from the sidecar without touching the
+data, and `describe_columns` turns it into short per-column summaries for
+the pruning prompts.
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import math
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from dataset import DEFAULT_CHUNK_ROWS, file_kind, iter_chunks
+
+
+PROFILE_VERSION = 1
+PROFILE_TOP_K = 20
+# Columns with more distinct values than this only report a lower bound
+MAX_TRACKED_VALUES = 10_000
+PROFILE_CACHE_DIR = os.getenv(
+    "PROFILE_CACHE_DIR", str(Path.home() / ".cache" / "column_pruning" / "profiles")
+)
+
+
+def _files(path: Path) -> List[Path]:
+    """The file itself, or every data file of a partitioned directory in a stable order."""
+    if not path.is_dir():
+        return [path]
+    return sorted(p for p in path.rglob("*") if p.is_file() and not p.name.startswith((".", "_")))
+
+
+def file_hash(path) -> str:
+    path = Path(path)
+    digest = hashlib.sha256()
+    for file in _files(path):
+        if file != path:
+            # partition paths carry data (school=GP/year=2024), so they are hashed too
+            digest.update(file.relative_to(path).as_posix().encode("utf-8") + b"\0")
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _stat(path: Path) -> Tuple[int, int]:
+    """(total size, newest mtime) over the file(s): a cheap change check before rehashing."""
+    stats = [f.stat() for f in _files(path)]
+    return sum(st.st_size for st in stats), max((st.st_mtime_ns for st in stats), default=0)
+
+
+def sidecar_path(path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + ".profile.json")
+
+
+def _plain(value):
+    """JSON-safe scalar: numpy types unwrapped, NaN/NA/NaT as None, dates as ISO strings."""
+    if value is None or (isinstance(value, float) and math.isnan(value)) or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, (np.datetime64, np.timedelta64)):
+        # .item() would give nanoseconds as a plain int
+        value = pd.Timestamp(value) if isinstance(value, np.datetime64) else pd.Timedelta(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (timedelta, Decimal)):
+        return str(value)
+    return value.item() if hasattr(value, "item") else value
+
+
+class _ColumnStats:
+    def __init__(self):
+        self.dtypes: List[str] = []
+        self.rows = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.counts: Optional[Dict] = {}
+        self.distinct_lower_bound = 0
+
+    def update(self, s: pd.Series) -> None:
+        dtype = str(s.dtype)
+        if dtype not in self.dtypes:
+            self.dtypes.append(dtype)
+        self.rows += len(s)
+        self.nulls += int(s.isna().sum())
+        if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s) and s.notna().any():
+            lo, hi = _plain(s.min()), _plain(s.max())
+            self.min = lo if self.min is None else min(self.min, lo)
+            self.max = hi if self.max is None else max(self.max, hi)
+        if self.counts is None:
+            return
+        for value, n in s.value_counts(dropna=True).items():
+            key = _plain(value)
+            self.counts[key] = self.counts.get(key, 0) + int(n)
+        if len(self.counts) > MAX_TRACKED_VALUES:
+            # Too many distinct values to keep exact counts in bounded memory
+            self.distinct_lower_bound = len(self.counts)
+            self.counts = None
+
+    def summary(self, top_k: int) -> Dict:
+        exact = self.counts is not None
+        top = sorted(self.counts.items(), key=lambda kv: -kv[1])[:top_k] if exact else []
+        return {
+            "dtype": self.dtypes[0] if len(self.dtypes) == 1 else "/".join(self.dtypes),
+            "rows": self.rows,
+            "nulls": self.nulls,
+            "null_rate": self.nulls / self.rows if self.rows else 0.0,
+            "cardinality": len(self.counts) if exact else self.distinct_lower_bound,
+            "cardinality_exact": exact,
+            "min": self.min,
+            "max": self.max,
+            "top_values": [[v, n] for v, n in top],
+        }
+
+
+def build_profile(path, kind: Optional[str] = None, top_k: int = PROFILE_TOP_K,
+                  chunksize: int = DEFAULT_CHUNK_ROWS) -> Dict:
+    """Profile every column in one chunked pass over the file."""
+    kind = kind or file_kind(path)
+    stats: Dict[str, _ColumnStats] = {}
+    for chunk in iter_chunks(path, kind, chunksize=chunksize):
+        for col in chunk.columns:
+            stats.setdefault(col, _ColumnStats()).update(chunk[col])
+    return {
+        "version": PROFILE_VERSION,
+        "top_k": top_k,
+        "columns": {col: st.summary(top_k) for col, st in stats.items()},
+    }
+
+
+def _write_json(path: Path, data: Dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _candidates(path: Path, digest: Optional[str]) -> List[Path]:
+    paths = [sidecar_path(path)]
+    if digest:
+        paths.append(Path(PROFILE_CACHE_DIR) / f"{digest}.json")
+    return paths
+
+
+def load_profile(path) -> Optional[Dict]:
+    """The stored profile for this file's current content, or None."""
+    path = Path(path)
+    size, mtime_ns = _stat(path)
+    sidecar = sidecar_path(path)
+    digest = None
+    if sidecar.exists():
+        try:
+            with open(sidecar, "r", encoding="utf-8") as f:
+                profile = json.load(f)
+        except (OSError, ValueError):
+            profile = None
+        if profile and profile.get("version") == PROFILE_VERSION:
+            # Same size and mtime: trust the sidecar without rehashing the file
+            if (profile.get("size"), profile.get("mtime_ns")) == (size, mtime_ns):
+                return profile
+            digest = file_hash(path)
+            if profile.get("sha256") == digest:
+                return profile
+    digest = digest or file_hash(path)
+    fallback = Path(PROFILE_CACHE_DIR) / f"{digest}.json"
+    try:
+        with open(fallback, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+        return profile if profile.get("version") == PROFILE_VERSION else None
+    except (OSError, ValueError):
+        return None
+
+
+def get_profile(path, kind: Optional[str] = None, top_k: int = PROFILE_TOP_K,
+                chunksize: int = DEFAULT_CHUNK_ROWS) -> Dict:
+    """Load the stored profile, building and saving it on first use."""
+    path = Path(path)
+    profile = load_profile(path)
+    if profile is not None:
+        return profile
+    profile = build_profile(path, kind, top_k, chunksize)
+    size, mtime_ns = _stat(path)
+    profile.update(sha256=file_hash(path), size=size, mtime_ns=mtime_ns)
+    for target in _candidates(path, profile["sha256"]):
+        try:
+            _write_json(target, profile)
+            break
+        except OSError:
+            # read-only data directory: fall back to the profile cache dir
+            continue
+    return profile
+
+
+def profile_value_counts(profile: Dict, column: str) -> pd.DataFrame:
+    """Value counts for one column straight from the profile (top-k when the column has more values)."""
+    info = profile["columns"][column]
+    rows = [tuple(pair) for pair in info["top_values"]]
+    if info["nulls"]:
+        rows.append((None, info["nulls"]))
+    rows.sort(key=lambda r: -r[1])
+    return pd.DataFrame(rows, columns=[column, "count"])
+
+
+def describe_columns(profile: Dict, columns: List[str], max_values: int = 5) -> Dict[str, str]:
+    """One-line summaries per column for LLM prompts, e.g. "int64, 0-20, 18 distinct"."""
+    described: Dict[str, str] = {}
+    for col in columns:
+        info = profile["columns"].get(col)
+        if info is None:
+            continue
+        parts = [info["dtype"]]
+        if info["min"] is not None:
+            parts.append(f"{info['min']}-{info['max']}")
+        bound = "" if info["cardinality_exact"] else ">"
+        parts.append(f"{bound}{info['cardinality']} distinct")
+        if info["null_rate"]:
+            parts.append(f"{info['null_rate'] * 100:.0f}% null")
+        if info["min"] is None and info["top_values"]:
+            shown = [str(v) for v, _ in info["top_values"][:max_values]]
+            more = ", ..." if info["cardinality"] > len(shown) else ""
+            parts.append("values: " + ", ".join(shown) + more)
+        described[col] = "; ".join(parts)
+    return described
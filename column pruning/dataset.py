@@ -0,0 +1,385 @@
+"""
+Dataset loading shared by the CLI (column_agent.py) and the Streamlit app.
+
+Loading is two-phase so pruning actually saves I/O: read only the column
+names first (CSV header line, parquet footer, first Excel row), prune, then
+parse just the kept columns (`usecols` / parquet `columns=`). With
+`compact=True`, loaded frames also get compact dtypes (see `compact_dtypes`).
+
+For files larger than memory, `iter_chunks` and the `stream_*` helpers scan
+CSV/parquet in fixed-size row chunks, so peak memory depends on the chunk
+size and the parsed columns, not on the file size.
+"""
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import sys
+import time
+
+import pandas as pd
+
+
+SUPPORTED_SUFFIXES = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".xlsx": "excel",
+    ".xls": "excel",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+
+
+def file_kind(name) -> str:
+    """Map a file name to 'csv', 'parquet', 'excel' or 'arrow'; directories are
+    read as hive-partitioned parquet datasets ('partitioned')."""
+    if not hasattr(name, "read") and Path(str(name)).is_dir():
+        return "partitioned"
+    suffix = Path(str(name)).suffix.lower()
+    if suffix not in SUPPORTED_SUFFIXES:
+        raise ValueError("Unsupported file type. Use csv, parquet, or xlsx/xls.")
+    return SUPPORTED_SUFFIXES[suffix]
+
+
+def _rewind(source) -> None:
+    # Streamlit uploads are file-like objects that every reader consumes
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def read_columns(source, kind: str) -> List[str]:
+    """Return the dataset's column names without parsing any data rows."""
+    _rewind(source)
+    if kind == "csv":
+        columns = list(pd.read_csv(source, nrows=0).columns)
+    elif kind == "parquet":
+        import pyarrow.parquet as pq
+
+        schema = pq.read_schema(source)
+        index_cols = {c for c in (schema.pandas_metadata or {}).get("index_columns", []) if isinstance(c, str)}
+        columns = [c for c in schema.names if c not in index_cols]
+    elif kind == "arrow":
+        columns = _open_arrow(source).schema.names
+    elif kind == "partitioned":
+        from partitioned import open_dataset
+
+        columns = open_dataset(source).schema.names
+    else:
+        columns = list(pd.read_excel(source, nrows=0).columns)
+    _rewind(source)
+    return columns
+
+
+def _open_arrow(source):
+    """Open an Arrow IPC file memory-mapped, so projections only page in the columns they touch."""
+    import pyarrow as pa
+
+    if hasattr(source, "read"):
+        return pa.ipc.open_file(source)
+    return pa.ipc.open_file(pa.memory_map(str(source), "r"))
+
+
+# Compaction: yes/no columns become boolean, low-cardinality strings category,
+# integers the narrowest (unsigned when possible) type that holds them
+YES_NO = {"yes": True, "no": False}
+CATEGORY_MAX_RATIO = 0.5
+SAMPLE_ROWS = 1000
+
+
+def _is_text(s: pd.Series) -> bool:
+    return pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s)
+
+
+def infer_compact_dtypes(sample: pd.DataFrame) -> Dict[str, str]:
+    """Plan a compact dtype per column from a sample: 'boolean', 'category' or 'integer'."""
+    plan: Dict[str, str] = {}
+    for col in sample.columns:
+        s = sample[col]
+        if pd.api.types.is_integer_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            plan[col] = "integer"
+        elif _is_text(s):
+            values = s.dropna().astype(str)
+            if len(values) and set(values.str.lower().unique()) <= set(YES_NO):
+                plan[col] = "boolean"
+            elif values.nunique() <= max(1, CATEGORY_MAX_RATIO * len(values)):
+                plan[col] = "category"
+    return plan
+
+
+def compact_dtypes(df: pd.DataFrame, plan: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Apply a dtype plan (inferred from `df` when None), checking it against the full data."""
+    plan = infer_compact_dtypes(df) if plan is None else plan
+    converted = {}
+    for col, target in plan.items():
+        if col not in df.columns:
+            continue
+        s = df[col]
+        if target == "integer" and pd.api.types.is_integer_dtype(s) and not pd.api.types.is_bool_dtype(s) and len(s):
+            converted[col] = pd.to_numeric(s, downcast="unsigned" if s.min() >= 0 else "integer")
+        elif target == "boolean" and _is_text(s):
+            mapped = s.str.lower().map(YES_NO)
+            if mapped.notna().sum() == s.notna().sum():
+                converted[col] = mapped.astype("boolean" if mapped.isna().any() else bool)
+            else:
+                # the sample only saw yes/no; other values turned up later
+                converted[col] = s.astype("category")
+        elif target == "category" and _is_text(s):
+            converted[col] = s.astype("category")
+    return df.assign(**converted) if converted else df
+
+
+def compaction_report(before: pd.DataFrame, after: pd.DataFrame) -> List[Dict]:
+    """Per-column dtype and memory before/after compaction."""
+    before_bytes = before.memory_usage(deep=True, index=False)
+    after_bytes = after.memory_usage(deep=True, index=False)
+    return [
+        {
+            "column": col,
+            "before_dtype": str(before[col].dtype),
+            "after_dtype": str(after[col].dtype),
+            "before_bytes": int(before_bytes[col]),
+            "after_bytes": int(after_bytes[col]),
+        }
+        for col in before.columns
+    ]
+
+
+def value_mask(series: pd.Series, value) -> pd.Series:
+    """Rows equal to `value` as typed by the user ("yes" also matches a compacted True)."""
+    text = str(value)
+    if pd.api.types.is_bool_dtype(series) and text.lower() in YES_NO:
+        return (series == YES_NO[text.lower()]).fillna(False).astype(bool)
+    return series.astype(str) == text
+
+
+def load_dataset(source, kind: str, columns: Optional[List[str]] = None, nrows: Optional[int] = None,
+                 compact: bool = False) -> pd.DataFrame:
+    """Load the dataset, parsing only `columns` (all when None) and at most `nrows` rows.
+
+    With `compact`, dtypes are planned from a short sample pass; for CSV the
+    category columns are parsed straight into categoricals.
+    """
+    _rewind(source)
+    plan = None
+    if kind == "csv":
+        dtype = None
+        if compact:
+            plan = infer_compact_dtypes(pd.read_csv(source, usecols=columns, nrows=min(nrows or SAMPLE_ROWS, SAMPLE_ROWS)))
+            _rewind(source)
+            dtype = {c: "category" for c, t in plan.items() if t == "category"}
+        df = pd.read_csv(source, usecols=columns, nrows=nrows, dtype=dtype)
+    elif kind == "parquet":
+        df = pd.read_parquet(source, columns=columns)
+        if nrows is not None:
+            df = df.head(nrows)
+    elif kind == "arrow":
+        table = _open_arrow(source).read_all()
+        if columns is not None:
+            table = table.select(list(columns))
+        if nrows is not None:
+            table = table.slice(0, nrows)
+        df = table.to_pandas()
+    elif kind == "partitioned":
+        from partitioned import open_dataset
+
+        dataset = open_dataset(source)
+        if nrows is not None:
+            table = dataset.head(nrows, columns=columns)
+        else:
+            # files are decoded in parallel on Arrow's thread pool
+            table = dataset.to_table(columns=columns, use_threads=True)
+        df = table.to_pandas()
+    else:
+        df = pd.read_excel(source, usecols=columns, nrows=nrows)
+    _rewind(source)
+    if columns is not None:
+        # usecols ignores the requested order
+        df = df[list(columns)]
+    if compact:
+        df = compact_dtypes(df, plan)
+    return df
+
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def iter_chunks(source, kind: str, columns: Optional[List[str]] = None,
+                chunksize: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield the dataset in row chunks, parsing only `columns` (all when None).
+
+    Excel has no streaming reader and is yielded as a single chunk.
+    """
+    _rewind(source)
+    if kind == "csv":
+        with pd.read_csv(source, usecols=columns, chunksize=chunksize) as reader:
+            for chunk in reader:
+                yield chunk if columns is None else chunk[list(columns)]
+    elif kind == "parquet":
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(source)
+        for batch in pf.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif kind == "arrow":
+        reader = _open_arrow(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if columns is not None:
+                batch = batch.select(list(columns))
+            for start in range(0, batch.num_rows, chunksize):
+                yield batch.slice(start, chunksize).to_pandas()
+    elif kind == "partitioned":
+        from partitioned import open_dataset
+
+        for batch in open_dataset(source).to_batches(columns=columns, batch_size=chunksize):
+            if batch.num_rows:
+                yield batch.to_pandas()
+    else:
+        yield load_dataset(source, kind, columns)
+    _rewind(source)
+
+
+def stream_value_counts(source, kind: str, column: str,
+                        chunksize: int = DEFAULT_CHUNK_ROWS) -> Tuple[pd.Series, Dict[str, int]]:
+    """Value counts of one column (NaN included), aggregated chunk by chunk."""
+    counts = pd.Series(dtype="int64")
+    rows = chunks = 0
+    for chunk in iter_chunks(source, kind, [column], chunksize):
+        chunks += 1
+        rows += len(chunk)
+        # NaN != NaN, so merging through a dict would give every chunk's nulls their own row
+        counts = pd.concat([counts, chunk[column].value_counts(dropna=False)]).groupby(level=0, dropna=False).sum()
+    series = counts.astype("int64").rename("count").sort_values(ascending=False, kind="stable")
+    series.index.name = column
+    return series, {"rows": rows, "chunks": chunks}
+
+
+def stream_filter(source, kind: str, column: str, value, limit: int,
+                  columns: Optional[List[str]] = None,
+                  chunksize: int = DEFAULT_CHUNK_ROWS) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """First `limit` rows where `column` equals `value` (compared as strings).
+
+    Only `columns` plus the filter column are parsed, and the scan stops as
+    soon as `limit` matches have been found.
+    """
+    wanted = None
+    if columns is not None:
+        wanted = list(columns) + ([column] if column not in columns else [])
+    found: List[pd.DataFrame] = []
+    matched = rows = chunks = 0
+    for chunk in iter_chunks(source, kind, wanted, chunksize):
+        chunks += 1
+        rows += len(chunk)
+        hits = chunk[value_mask(chunk[column], value)]
+        if len(hits):
+            found.append(hits.head(limit - matched))
+            matched += len(found[-1])
+        if matched >= limit:
+            break
+    result = pd.concat(found) if found else pd.DataFrame(columns=wanted or read_columns(source, kind))
+    return result, {"rows_scanned": rows, "chunks": chunks, "matches": matched}
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """High-water mark of this process's resident memory, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def parquet_column_bytes(source, kind: str = "parquet") -> Dict[str, int]:
+    """Compressed on-disk bytes per column, read from the parquet footer(s)."""
+    import pyarrow.parquet as pq
+
+    if kind == "partitioned":
+        from partitioned import open_dataset
+
+        metas = [fragment.metadata for fragment in open_dataset(source).get_fragments()]
+    else:
+        _rewind(source)
+        metas = [pq.ParquetFile(source).metadata]
+        _rewind(source)
+    sizes: Dict[str, int] = {}
+    for meta in metas:
+        for rg in range(meta.num_row_groups):
+            group = meta.row_group(rg)
+            for i in range(group.num_columns):
+                col = group.column(i)
+                name = col.path_in_schema.split(".")[0]
+                sizes[name] = sizes.get(name, 0) + col.total_compressed_size
+    return sizes
+
+
+def _timed_load(source, kind: str, columns: Optional[List[str]]):
+    start = time.perf_counter()
+    df = load_dataset(source, kind, columns)
+    elapsed = time.perf_counter() - start
+    return df, elapsed, int(df.memory_usage(deep=True).sum())
+
+
+def projection_savings(source, kind: str, columns: List[str]) -> Dict[str, float]:
+    """Load the kept columns and the full dataset, reporting the real time and memory saved."""
+    return measure_projection(source, kind, columns)[0]
+
+
+def measure_projection(source, kind: str, columns: List[str]) -> Tuple[Dict[str, float], pd.DataFrame]:
+    """projection_savings plus the pruned frame it loaded, for callers that need the data too."""
+    pruned, pruned_s, pruned_bytes = _timed_load(source, kind, columns)
+    _, full_s, full_bytes = _timed_load(source, kind, None)
+    report = {
+        "full_load_s": full_s,
+        "pruned_load_s": pruned_s,
+        "time_saved_s": full_s - pruned_s,
+        "full_bytes": full_bytes,
+        "pruned_bytes": pruned_bytes,
+        "bytes_saved": full_bytes - pruned_bytes,
+    }
+    if kind in ("parquet", "partitioned"):
+        disk = parquet_column_bytes(source, kind)
+        report["full_disk_bytes"] = sum(disk.values())
+        report["pruned_disk_bytes"] = sum(disk.get(c, 0) for c in columns)
+    return report, pruned
+
+
+def format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+class DatasetSource:
+    """A dataset whose columns are known up front and whose data is parsed only on demand."""
+
+    def __init__(self, source, kind: Optional[str] = None, name: Optional[str] = None, compact: bool = False):
+        self.source = source
+        self.kind = kind or file_kind(name or source)
+        self.compact = compact
+        self._columns: Optional[List[str]] = None
+        self._full: Optional[pd.DataFrame] = None
+
+    @property
+    def columns(self) -> List[str]:
+        if self._columns is None:
+            self._columns = read_columns(self.source, self.kind)
+        return self._columns
+
+    def full(self) -> pd.DataFrame:
+        if self._full is None:
+            self._full = load_dataset(self.source, self.kind, compact=self.compact)
+        return self._full
+
+    def head(self, n: int) -> pd.DataFrame:
+        if self._full is not None:
+            return self._full.head(n)
+        return load_dataset(self.source, self.kind, nrows=n, compact=self.compact)
+
+    def project(self, columns: List[str]) -> pd.DataFrame:
+        """Only the given columns, reusing the full frame if it was already loaded."""
+        if self._full is not None:
+            return self._full[columns]
+        return load_dataset(self.source, self.kind, columns, compact=self.compact)
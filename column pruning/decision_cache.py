@@ -0,0 +1,108 @@
+"""
+Persistent cache of LLM pruning decisions.
+
+Entries are keyed on (normalized query, hash of the ordered column list,
+model name) and hold the keep list plus, when known, the per-column reasons
+and pruned-out list. Lookups go through an in-process LRU first, then a
+directory of small JSON files. Files are written atomically (temp file +
+rename), so CLI runs and several Streamlit replicas can share one directory
+(e.g. a mounted volume) and keep decisions across restarts.
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+
+DEFAULT_CACHE_DIR = os.getenv("PRUNE_CACHE_DIR", str(Path.home() / ".cache" / "column_pruning"))
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split()).casefold()
+
+
+def columns_fingerprint(columns: List[str]) -> str:
+    return hashlib.sha256("\x1f".join(columns).encode("utf-8")).hexdigest()
+
+
+class DecisionCache:
+    def __init__(self, directory: Optional[str] = DEFAULT_CACHE_DIR, max_entries: int = 512):
+        self.directory = Path(directory) if directory else None
+        self.max_entries = max_entries
+        self._lru: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(query: str, columns: List[str], model: str) -> str:
+        raw = json.dumps([normalize_query(query), columns_fingerprint(columns), model])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _remember(self, key: str, entry: Dict) -> None:
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, key: str, need_reasons: bool = False) -> Optional[Dict]:
+        """Return a copy of the entry, or None. `need_reasons` skips keep-only entries."""
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and (entry.get("reasons") is not None or not need_reasons):
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                return json.loads(json.dumps(entry))
+        entry = None
+        if self.directory is not None:
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                entry = None
+        with self._lock:
+            if entry is None or (need_reasons and entry.get("reasons") is None):
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, entry)
+            return json.loads(json.dumps(entry))
+
+    def put(self, key: str, keep: List[str], reasons: Optional[Dict[str, str]] = None,
+            prune: Optional[List[str]] = None) -> None:
+        entry = {"keep": list(keep), "reasons": reasons, "prune": prune}
+        with self._lock:
+            self._remember(key, entry)
+        if self.directory is None:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+        except OSError:
+            # A read-only or full cache dir must never break pruning
+            pass
+
+    def stats(self) -> Dict[str, float]:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "lookups": lookups,
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "llm_calls_avoided": hits,
+        }
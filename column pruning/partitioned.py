@@ -0,0 +1,88 @@
+"""
+Parquet scans with filter pushdown, for single files and hive-partitioned
+directories (e.g. `students/school=GP/year=2024/part-0.parquet`).
+
+An equality filter becomes an Arrow expression that is checked twice
+before any data is read: against each file's partition values (whole
+directories are skipped) and against each row group's min/max statistics
+(row groups that cannot contain the value are skipped). Only the requested
+columns of the surviving row groups are decoded, on Arrow's thread pool,
+so several files are scanned in parallel.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as pads
+
+
+def open_dataset(path) -> pads.Dataset:
+    return pads.dataset(str(path), format="parquet", partitioning="hive")
+
+
+def equality_filter(dataset: pads.Dataset, column: str, value) -> pc.Expression:
+    """`column == value` with the user's text cast to the column's type."""
+    typ = dataset.schema.field(column).type
+    if pa.types.is_dictionary(typ):
+        typ = typ.value_type
+    text = str(value)
+    if pa.types.is_boolean(typ):
+        text = {"yes": "true", "no": "false"}.get(text.lower(), text)
+    try:
+        scalar = pc.cast(pa.scalar(text), typ)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        # e.g. "abc" for an integer column: nothing can match
+        return pc.scalar(False)
+    return pc.field(column) == scalar
+
+
+def _chunk_bytes(fragment, row_groups, names) -> int:
+    meta = fragment.metadata
+    total = 0
+    for rg in row_groups:
+        group = meta.row_group(rg)
+        for i in range(group.num_columns):
+            col = group.column(i)
+            if names is None or col.path_in_schema.split(".")[0] in names:
+                total += col.total_compressed_size
+    return total
+
+
+def plan_scan(dataset: pads.Dataset, expr: pc.Expression, columns: Optional[List[str]] = None
+              ) -> Tuple[List, Dict[str, int]]:
+    """Row-group fragments that may match `expr`, and how much was skipped."""
+    names = None if columns is None else set(columns)
+    stats = {"files": 0, "files_scanned": 0, "row_groups": 0, "row_groups_scanned": 0,
+             "bytes": 0, "bytes_scanned": 0}
+    for fragment in dataset.get_fragments():
+        n = fragment.metadata.num_row_groups
+        stats["files"] += 1
+        stats["row_groups"] += n
+        stats["bytes"] += _chunk_bytes(fragment, range(n), names)
+
+    selected = []
+    for fragment in dataset.get_fragments(filter=expr):
+        pieces = fragment.split_by_row_group(filter=expr, schema=dataset.schema)
+        if not pieces:
+            continue
+        stats["files_scanned"] += 1
+        stats["row_groups_scanned"] += len(pieces)
+        stats["bytes_scanned"] += _chunk_bytes(fragment, [p.row_groups[0].id for p in pieces], names)
+        selected.extend(pieces)
+    return selected, stats
+
+
+def scan_filtered(path, column: str, value, columns: Optional[List[str]] = None,
+                  limit: Optional[int] = None) -> Tuple[pa.Table, Dict[str, int]]:
+    """Rows where `column == value`, reading only `columns` (all when None) plus the filter column."""
+    dataset = open_dataset(path)
+    wanted = None
+    if columns is not None:
+        wanted = list(columns) + ([column] if column not in columns else [])
+    expr = equality_filter(dataset, column, value)
+    pieces, stats = plan_scan(dataset, expr, wanted)
+    pruned = pads.FileSystemDataset(pieces, dataset.schema, dataset.format, dataset.filesystem)
+    scanner = pruned.scanner(columns=wanted, filter=expr, use_threads=True)
+    table = scanner.head(limit) if limit is not None else scanner.to_table()
+    stats["rows"] = table.num_rows
+    return table, stats
@@ -0,0 +1,178 @@
+"""
+Vectorized column relevance ranking for the offline (LLM-free) pruner.
+
+Each column is a small "document" made of its full name, its split
+camel/snake-case parts and an optional description or synonym list. The
+column-token matrix is built once per schema in CSR form (postings per
+token), so scoring a query is a handful of NumPy gathers plus one
+`bincount`, regardless of how many columns the table has.
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import re
+import threading
+
+import numpy as np
+
+
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_WORD = re.compile(r"[A-Za-z0-9]+")
+
+# Relative weight of each field a token can come from
+NAME_WEIGHT = 3.0
+PART_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.5
+
+# Filler words that carry no column signal in queries or descriptions
+STOPWORDS = frozenset(
+    "a an and are all by each for from in is of on or per show the to what which with".split()
+)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def _norm(token: str) -> str:
+    token = token.lower()
+    # crude plural folding so "grades" matches "grade"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        token = token[:-1]
+    return token
+
+
+Description = Union[str, Sequence[str]]
+
+
+def _as_text(description: Description) -> str:
+    # a synonym list reads the same as its words joined into one description
+    return description if isinstance(description, str) else " ".join(str(d) for d in description)
+
+
+def normalize_descriptions(descriptions: Optional[Dict[str, Description]]) -> Dict[str, str]:
+    """Descriptions as plain strings, so they can be tokenised and used in cache keys."""
+    return {col: _as_text(text) for col, text in (descriptions or {}).items() if text is not None}
+
+
+def column_tokens(name: str, description: Optional[Description] = None) -> Dict[str, float]:
+    """Weighted bag of tokens for one column."""
+    bag: Dict[str, float] = {}
+
+    def add(tok: str, w: float, min_len: int = 2) -> None:
+        tok = _norm(tok)
+        if len(tok) >= min_len:
+            bag[tok] = bag.get(tok, 0.0) + w
+
+    # The whole name (e.g. "G3", "famsize") is the strongest signal
+    add(re.sub(r"[^A-Za-z0-9]", "", name), NAME_WEIGHT, min_len=1)
+    words = _WORD.findall(name)
+    for word in words:
+        if len(words) > 1:
+            add(word, PART_WEIGHT)
+        parts = _CAMEL.findall(word)
+        if len(parts) > 1:
+            for part in parts:
+                add(part, PART_WEIGHT)
+    if description:
+        for word in _WORD.findall(_as_text(description)):
+            if word.lower() not in STOPWORDS:
+                add(word, DESCRIPTION_WEIGHT)
+    return bag
+
+
+def query_tokens(query: str) -> List[str]:
+    return sorted({_norm(t) for t in _WORD.findall(query) if t.lower() not in STOPWORDS})
+
+
+class ColumnRanker:
+    """BM25-style ranking of columns against a natural-language query."""
+
+    def __init__(self, columns: Sequence[str], descriptions: Optional[Dict[str, Description]] = None):
+        descriptions = normalize_descriptions(descriptions)
+        self.columns = list(columns)
+        self._names = {_norm(re.sub(r"[^A-Za-z0-9]", "", c)) for c in self.columns}
+        bags = [column_tokens(c, descriptions.get(c)) for c in self.columns]
+
+        vocab: Dict[str, int] = {}
+        rows: List[int] = []
+        terms: List[int] = []
+        tfs: List[float] = []
+        for col_idx, bag in enumerate(bags):
+            for tok, tf in bag.items():
+                rows.append(col_idx)
+                terms.append(vocab.setdefault(tok, len(vocab)))
+                tfs.append(tf)
+        self.vocab = vocab
+
+        rows_a = np.asarray(rows, dtype=np.int32)
+        terms_a = np.asarray(terms, dtype=np.int32)
+        tf_a = np.asarray(tfs, dtype=np.float32)
+
+        n = max(len(self.columns), 1)
+        doc_len = np.bincount(rows_a, weights=tf_a, minlength=n).astype(np.float32)
+        avg_len = float(doc_len.mean()) or 1.0
+        df = np.bincount(terms_a, minlength=len(vocab)).astype(np.float32)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        # Per-posting BM25 contribution, precomputed so queries only sum
+        norm = K1 * (1 - B + B * doc_len[rows_a] / avg_len)
+        weight = idf[terms_a] * tf_a * (K1 + 1) / (tf_a + norm)
+
+        # CSR by term: postings for term t live in [indptr[t], indptr[t + 1])
+        order = np.argsort(terms_a, kind="stable")
+        self._cols = rows_a[order]
+        self._weights = weight[order].astype(np.float32)
+        self._indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df.astype(np.int64), out=self._indptr[1:])
+
+    def document_frequency(self, token: str) -> int:
+        """Number of columns whose token bag contains the (normalized) token."""
+        t = self.vocab.get(token)
+        return 0 if t is None else int(self._indptr[t + 1] - self._indptr[t])
+
+    def is_column_name(self, token: str) -> bool:
+        """True when the (normalized) token is some column's full name."""
+        return token in self._names
+
+    def scores(self, query: str) -> np.ndarray:
+        """Relevance score of every column for `query` (0 when nothing matches)."""
+        ids = [self.vocab[t] for t in query_tokens(query) if t in self.vocab]
+        if not ids:
+            return np.zeros(len(self.columns), dtype=np.float32)
+        spans = [np.arange(self._indptr[i], self._indptr[i + 1]) for i in ids]
+        idx = np.concatenate(spans)
+        return np.bincount(self._cols[idx], weights=self._weights[idx], minlength=len(self.columns)).astype(np.float32)
+
+    def rank(self, query: str, top_k: Optional[int] = 10) -> List[Tuple[str, float]]:
+        """Top-k (column, score) pairs with a positive score, best first."""
+        s = self.scores(query)
+        hits = np.flatnonzero(s > 0)
+        if top_k is not None and len(hits) > top_k:
+            hits = hits[np.argpartition(-s[hits], top_k - 1)[:top_k]]
+        hits = hits[np.lexsort((hits, -s[hits]))]
+        return [(self.columns[i], float(s[i])) for i in hits]
+
+
+_RANKERS: "OrderedDict[tuple, ColumnRanker]" = OrderedDict()
+_MAX_RANKERS = 16
+# Streamlit sessions share this module, so the LRU is touched from several threads
+_RANKERS_LOCK = threading.Lock()
+
+
+def ranker_for(columns: Sequence[str], descriptions: Optional[Dict[str, Description]] = None) -> ColumnRanker:
+    """Return a cached ranker for this exact schema, building it on first use."""
+    descriptions = normalize_descriptions(descriptions)
+    key = (tuple(columns), tuple(sorted(descriptions.items())))
+    with _RANKERS_LOCK:
+        ranker = _RANKERS.get(key)
+        if ranker is not None:
+            _RANKERS.move_to_end(key)
+            return ranker
+    # build outside the lock; if two threads race, both rankers are identical
+    ranker = ColumnRanker(columns, descriptions)
+    with _RANKERS_LOCK:
+        ranker = _RANKERS.setdefault(key, ranker)
+        _RANKERS.move_to_end(key)
+        if len(_RANKERS) > _MAX_RANKERS:
+            _RANKERS.popitem(last=False)
+    return ranker
@@ -0,0 +1,159 @@
+"""
+Headless HTTP API around ColumnPruningAgent, for other agents to call.
+
+    uvicorn service:app --host 0.0.0.0 --port 8000
+
+POST /prune prunes one query; POST /prune/batch prunes many queries over
+the same column set, sending the LLM-bound ones through the chain's async
+batch API with bounded concurrency.
+"""
+from typing import Dict, List, Literal, Optional
+import logging
+import os
+import threading
+import time
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+
+from column_agent import ColumnPruningAgent
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = int(os.getenv("PRUNE_CONCURRENCY", "8"))
+MAX_CONCURRENCY = int(os.getenv("PRUNE_MAX_CONCURRENCY", "32"))
+MAX_BATCH_QUERIES = int(os.getenv("PRUNE_MAX_BATCH", "500"))
+
+Mode = Literal["llm", "auto", "offline"]
+
+_agent: Optional[ColumnPruningAgent] = None
+_agent_lock = threading.Lock()
+
+
+def get_agent() -> ColumnPruningAgent:
+    """One agent (and LLM client) per process, built on first use."""
+    global _agent
+    with _agent_lock:
+        if _agent is None:
+            _agent = ColumnPruningAgent()
+        return _agent
+
+
+app = FastAPI(
+    title="Column Pruning API",
+    description="Select the columns needed to answer natural-language queries",
+    version="1.0.0",
+)
+
+
+class PruneRequest(BaseModel):
+    query: str
+    columns: List[str] = Field(min_length=1)
+    mode: Mode = "llm"
+    top_k: int = 10
+
+    class Config:
+        json_schema_extra = {
+            "example": {"query": "average G3 by sex", "columns": ["school", "sex", "age", "G3"], "mode": "auto"}
+        }
+
+
+class BatchPruneRequest(BaseModel):
+    queries: List[str] = Field(min_length=1)
+    columns: List[str] = Field(min_length=1)
+    mode: Mode = "llm"
+    top_k: int = 10
+    concurrency: int = Field(DEFAULT_CONCURRENCY, ge=1)
+
+
+class PruneResult(BaseModel):
+    query: str
+    keep: List[str] = []
+    prune: List[str] = []
+    reasons: Dict[str, str] = {}
+    tier: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchSummary(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    tiers: Dict[str, int]
+    elapsed_ms: float
+
+
+class BatchPruneResponse(BaseModel):
+    results: List[PruneResult]
+    summary: BatchSummary
+
+
+async def prune_many(queries: List[str], columns: List[str], mode: str, top_k: int,
+                     concurrency: int) -> List[PruneResult]:
+    agent = get_agent()
+    results: List[Optional[PruneResult]] = [None] * len(queries)
+    llm_bound: List[int] = []
+    for i, query in enumerate(queries):
+        if mode == "llm":
+            llm_bound.append(i)
+            continue
+        # offline always answers from the ranker; auto only when it is confident
+        answer, _ = agent.heuristic_answer(query, columns, 0.0 if mode == "offline" else None, top_k)
+        if answer is not None:
+            keep, reasons, pruned_out = answer
+            results[i] = PruneResult(query=query, keep=keep, prune=pruned_out, reasons=reasons, tier="heuristic")
+        elif mode == "offline":
+            results[i] = PruneResult(query=query, prune=list(columns), tier="heuristic")
+        else:
+            llm_bound.append(i)
+
+    if llm_bound:
+        answers = await agent.aprune_with_reason_batch(
+            [queries[i] for i in llm_bound], columns, max_concurrency=min(concurrency, MAX_CONCURRENCY)
+        )
+        for i, answer in zip(llm_bound, answers):
+            results[i] = PruneResult(query=queries[i], **answer)
+    return results
+
+
+@app.get("/")
+async def root():
+    return {
+        "message": "Column Pruning API",
+        "endpoints": {"/prune": "POST", "/prune/batch": "POST", "/health": "GET"},
+    }
+
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "service": "column-pruning"}
+
+
+@app.post("/prune", response_model=PruneResult)
+async def prune(request: PruneRequest):
+    result = (await prune_many([request.query], request.columns, request.mode, request.top_k, 1))[0]
+    if result.error:
+        raise HTTPException(status_code=502, detail=result.error)
+    return result
+
+
+@app.post("/prune/batch", response_model=BatchPruneResponse)
+async def prune_batch(request: BatchPruneRequest):
+    if len(request.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+    started = time.perf_counter()
+    results = await prune_many(request.queries, request.columns, request.mode, request.top_k, request.concurrency)
+    tiers: Dict[str, int] = {}
+    for r in results:
+        if r.tier:
+            tiers[r.tier] = tiers.get(r.tier, 0) + 1
+    failed = sum(1 for r in results if r.error)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"Pruned {len(results)} queries ({failed} failed) in {elapsed_ms:.0f} ms: {tiers}")
+    return BatchPruneResponse(
+        results=results,
+        summary=BatchSummary(
+            total=len(results), succeeded=len(results) - failed, failed=failed, tiers=tiers, elapsed_ms=elapsed_ms
+        ),
+    )
@@ -0,0 +1,57 @@
+# tests/test_cascade.py
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from cascade import DEFAULT_THRESHOLD, evaluate_cascade, heuristic_confidence
+from decision_cache import DecisionCache
+from ranking import ColumnRanker
+
+
+ROOT = Path(__file__).resolve().parent.parent
+STUDENT_COLUMNS = list(pd.read_csv(ROOT / "student_data.csv", nrows=0).columns)
+
+
+def test_verbatim_column_names_are_confident():
+    ranker = ColumnRanker(STUDENT_COLUMNS)
+    assert heuristic_confidence(ranker, "average G3 by sex")["confidence"] == 1.0
+    vague = heuristic_confidence(ranker, "students with high alcohol consumption")
+    assert vague["confidence"] < DEFAULT_THRESHOLD and vague["coverage"] == 0.0
+
+
+def test_shared_description_tokens_count_as_ambiguous():
+    ranker = ColumnRanker(STUDENT_COLUMNS, {"G1": "first period grade", "G3": "final grade"})
+    conf = heuristic_confidence(ranker, "grade")
+    assert conf["ambiguity"] == 1.0 and conf["confidence"] < DEFAULT_THRESHOLD
+
+
+def test_corpus_call_rate_and_agreement():
+    with open(ROOT / "benchmarks" / "cascade_corpus.jsonl", encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    report = evaluate_cascade(corpus, STUDENT_COLUMNS)
+    assert report["llm_call_rate"] < 0.6
+    assert report["agreement"] == 1.0
+
+
+def test_prune_auto_reports_answering_tier(monkeypatch):
+    pytest.importorskip("langchain_google_genai")
+    from langchain_core.language_models import FakeListLLM
+    from column_agent import ColumnPruningAgent
+
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    agent = ColumnPruningAgent(model="fake", cache=DecisionCache(None))
+    reply = json.dumps({"keep": ["Dalc", "Walc"], "prune": [], "reasons": {"Dalc": "weekday", "Walc": "weekend"}})
+    agent.llm = FakeListLLM(responses=[reply, "unused"])
+
+    keep, _, pruned_out, info = agent.prune_auto("average G3 by sex", STUDENT_COLUMNS)
+    assert info["tier"] == "heuristic" and set(keep) == {"G3", "sex"}
+    assert len(pruned_out) == len(STUDENT_COLUMNS) - 2
+
+    keep, reasons, _, info = agent.prune_auto("students with high alcohol consumption", STUDENT_COLUMNS)
+    assert info["tier"] == "llm" and keep == ["Dalc", "Walc"] and reasons["Walc"] == "weekend"
+
+    _, _, _, info = agent.prune_auto("students with high alcohol consumption", STUDENT_COLUMNS)
+    assert info["tier"] == "cache"
+    assert agent.llm.i == 1  # only the low-confidence query reached the model
@@ -0,0 +1,97 @@
+# tests/test_column_profile.py
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import column_profile
+from column_profile import build_profile, describe_columns, get_profile, profile_value_counts, sidecar_path
+
+
+STUDENT_CSV = Path(__file__).resolve().parent.parent / "student_data.csv"
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "students.csv"
+    path.write_bytes(STUDENT_CSV.read_bytes())
+    return path
+
+
+def test_profile_matches_pandas(dataset):
+    frame = pd.read_csv(dataset)
+    profile = build_profile(dataset, chunksize=50)["columns"]
+    assert profile["G3"]["min"] == frame["G3"].min() and profile["G3"]["max"] == frame["G3"].max()
+    assert profile["Mjob"]["cardinality"] == frame["Mjob"].nunique()
+    assert dict(map(tuple, profile["Mjob"]["top_values"])) == frame["Mjob"].value_counts().to_dict()
+    assert profile["school"]["null_rate"] == 0.0 and profile["school"]["min"] is None
+
+
+def test_datetime_and_decimal_columns_are_written_as_text(tmp_path):
+    from decimal import Decimal
+
+    path = tmp_path / "events.parquet"
+    pd.DataFrame({
+        "at": pd.to_datetime(["2024-01-02 03:04:05", "2024-01-02 03:04:05", None]),
+        "day": [pd.Timestamp("2024-05-06").date()] * 3,
+        "amount": [Decimal("1.50"), Decimal("1.50"), None],
+    }).to_parquet(path)
+    profile = get_profile(path)
+    columns = json.loads(sidecar_path(path).read_text())["columns"]
+    assert columns["at"]["top_values"] == [["2024-01-02T03:04:05", 2]] and columns["at"]["nulls"] == 1
+    assert columns["day"]["top_values"] == [["2024-05-06", 3]]
+    assert columns["amount"]["top_values"] == [["1.50", 2]]
+    assert profile["columns"] == columns
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path):
+    with pytest.raises(TypeError):
+        column_profile._write_json(tmp_path / "p.json", {"bad": object()})
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sidecar_is_reused_until_content_changes(dataset, monkeypatch):
+    first = get_profile(dataset)
+    assert json.loads(sidecar_path(dataset).read_text())["sha256"] == first["sha256"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("profile should come from the sidecar")
+
+    monkeypatch.setattr(column_profile, "build_profile", fail)
+    os.utime(dataset)  # touched but unchanged: rehash, no rebuild
+    assert get_profile(dataset)["sha256"] == first["sha256"]
+
+    monkeypatch.undo()
+    with open(dataset, "a", encoding="utf-8") as f:
+        f.write(",".join(["MS"] + ["0"] * 32) + "\n")
+    assert get_profile(dataset)["columns"]["school"]["rows"] == 396
+
+
+def test_read_only_directory_falls_back_to_cache_dir(dataset, tmp_path, monkeypatch):
+    monkeypatch.setattr(column_profile, "PROFILE_CACHE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setattr(column_profile, "_write_json", _write_only_under(tmp_path / "profiles"))
+    profile = get_profile(dataset)
+    assert not sidecar_path(dataset).exists()
+    assert (tmp_path / "profiles" / f"{profile['sha256']}.json").exists()
+    assert column_profile.load_profile(dataset)["sha256"] == profile["sha256"]
+
+
+def _write_only_under(root):
+    original = column_profile._write_json
+
+    def write(path, data):
+        if root not in Path(path).parents:
+            raise PermissionError(path)
+        original(path, data)
+    return write
+
+
+def test_counts_and_prompt_summaries_come_from_profile(dataset):
+    profile = get_profile(dataset)
+    counts = profile_value_counts(profile, "sex")
+    assert counts.to_dict("list") == {"sex": ["F", "M"], "count": [208, 187]}
+    described = describe_columns(profile, ["G3", "internet"])
+    assert described["G3"] == "int64; 0-20; 18 distinct"
+    assert described["internet"].endswith("values: yes, no")
@@ -0,0 +1,160 @@
+# tests/test_dataset.py
+import io
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from dataset import (
+    DatasetSource, compact_dtypes, compaction_report, infer_compact_dtypes, load_dataset, measure_projection,
+    projection_savings,
+    read_columns, stream_filter, stream_value_counts, value_mask,
+)
+
+
+ROOT = Path(__file__).resolve().parent.parent
+STUDENT_CSV = ROOT / "student_data.csv"
+
+
+@pytest.fixture
+def frame():
+    return pd.read_csv(STUDENT_CSV)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_read_columns_reads_header_only(tmp_path, frame, suffix):
+    path = tmp_path / f"data{suffix}"
+    if suffix == ".csv":
+        frame.to_csv(path, index=False)
+    else:
+        frame.set_index("school").to_parquet(path)
+    expected = list(frame.columns) if suffix == ".csv" else [c for c in frame.columns if c != "school"]
+    assert read_columns(path, suffix.lstrip(".")) == expected
+
+
+def test_projection_keeps_requested_order(frame):
+    df = load_dataset(STUDENT_CSV, "csv", ["G3", "sex"])
+    assert list(df.columns) == ["G3", "sex"]
+    pd.testing.assert_frame_equal(df, frame[["G3", "sex"]])
+
+
+def test_source_parses_rows_lazily():
+    ds = DatasetSource(STUDENT_CSV)
+    assert ds.columns[:3] == ["school", "sex", "age"]
+    assert len(ds.head(4)) == 4
+    assert ds._full is None
+    assert list(ds.project(["G1"]).columns) == ["G1"]
+    assert ds._full is None
+
+
+def test_file_like_uploads_are_rewound():
+    upload = io.BytesIO(STUDENT_CSV.read_bytes())
+    ds = DatasetSource(upload, name="upload.csv")
+    assert len(ds.columns) == 33
+    assert len(ds.project(["G3"])) == 395
+
+
+def test_projection_savings_reports_real_loads(tmp_path, frame):
+    path = tmp_path / "data.parquet"
+    frame.to_parquet(path)
+    report = projection_savings(path, "parquet", ["G3"])
+    assert report["pruned_bytes"] < report["full_bytes"]
+    assert report["bytes_saved"] == report["full_bytes"] - report["pruned_bytes"]
+    assert 0 < report["pruned_disk_bytes"] < report["full_disk_bytes"]
+
+
+def test_measure_projection_returns_the_pruned_frame(frame):
+    report, pruned = measure_projection(STUDENT_CSV, "csv", ["G3", "sex"])
+    pd.testing.assert_frame_equal(pruned, frame[["G3", "sex"]])
+    assert report["pruned_bytes"] == int(pruned.memory_usage(deep=True).sum())
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_streamed_value_counts_match_full_load(tmp_path, frame, suffix):
+    path = tmp_path / f"data{suffix}"
+    frame.to_csv(path, index=False) if suffix == ".csv" else frame.to_parquet(path, row_group_size=50)
+    counts, stats = stream_value_counts(path, suffix.lstrip("."), "Mjob", chunksize=37)
+    assert counts.to_dict() == frame["Mjob"].value_counts().to_dict()
+    assert stats == {"rows": 395, "chunks": 11}
+
+
+def test_streamed_value_counts_merge_nulls_across_chunks(tmp_path):
+    path = tmp_path / "nulls.csv"
+    pd.DataFrame({"job": ["a", None, "b", None, "a", None, None]}).to_csv(path, index=False)
+    counts, stats = stream_value_counts(path, "csv", "job", chunksize=2)
+    assert stats["chunks"] == 4
+    assert counts.isna().sum() == 0 and counts.index.isna().sum() == 1
+    assert counts.iloc[0] == 4 and pd.isna(counts.index[0])
+    assert counts.drop(index=counts.index[0]).to_dict() == {"a": 2, "b": 1}
+
+
+def test_streamed_filter_stops_at_limit_and_parses_only_requested_columns(frame):
+    filtered, stats = stream_filter(STUDENT_CSV, "csv", "sex", "M", limit=5, columns=["G3"], chunksize=20)
+    expected = frame[frame["sex"] == "M"].head(5)[["G3", "sex"]]
+    pd.testing.assert_frame_equal(filtered, expected)
+    assert stats["matches"] == 5 and stats["rows_scanned"] < len(frame)
+
+    none, stats = stream_filter(STUDENT_CSV, "csv", "sex", "X", limit=5, columns=["G3"], chunksize=100)
+    assert none.empty and list(none.columns) == ["G3", "sex"] and stats["rows_scanned"] == 395
+
+
+def test_compact_load_narrows_student_dtypes(frame):
+    df = load_dataset(STUDENT_CSV, "csv", compact=True)
+    assert str(df["internet"].dtype) == "bool" and str(df["Mjob"].dtype) == "category"
+    assert str(df["G3"].dtype) == "uint8" and str(df["age"].dtype) == "uint8"
+    assert (df["internet"] == (frame["internet"] == "yes")).all()
+    assert df["G3"].tolist() == frame["G3"].tolist()
+    report = compaction_report(frame, df)
+    assert sum(r["after_bytes"] for r in report) < sum(r["before_bytes"] for r in report) / 4
+
+
+def test_compaction_checks_the_plan_against_full_data():
+    sample = pd.DataFrame({"flag": ["yes", "no"], "n": [1, 2]})
+    plan = infer_compact_dtypes(sample)
+    assert plan == {"flag": "boolean", "n": "integer"}
+    full = pd.DataFrame({"flag": ["yes", "no", "maybe", None], "n": [1, 2, -300, 4]})
+    out = compact_dtypes(full, plan)
+    assert str(out["flag"].dtype) == "category" and str(out["n"].dtype) == "int16"
+    assert str(compact_dtypes(pd.DataFrame({"f": ["yes", None]}))["f"].dtype) == "boolean"
+
+
+def test_value_mask_accepts_yes_for_compacted_flags(frame):
+    df = load_dataset(STUDENT_CSV, "csv", ["internet"], compact=True)
+    assert value_mask(df["internet"], "no").sum() == (frame["internet"] == "no").sum()
+    assert value_mask(df["internet"], "True").sum() == (frame["internet"] == "yes").sum()
+
+
+STREAM_SCRIPT = """
+import json, sys
+from dataset import peak_rss_bytes, stream_filter, stream_value_counts
+path = sys.argv[1]
+counts, stats = stream_value_counts(path, "csv", "sex")
+filtered, fstats = stream_filter(path, "csv", "age", "22", limit=3, columns=["G3"])
+print(json.dumps({"rows": stats["rows"], "total": int(counts.sum()), "matches": fstats["matches"],
+                  "peak": peak_rss_bytes()}))
+"""
+
+
+@pytest.mark.skipif(not os.getenv("COLUMN_PRUNING_BIG_GB"), reason="set COLUMN_PRUNING_BIG_GB=<size> to run")
+def test_streaming_a_multi_gb_csv_keeps_memory_bounded(tmp_path, frame):
+    size = float(os.environ["COLUMN_PRUNING_BIG_GB"]) * 1024 ** 3
+    block = frame[frame["age"] != 22].to_csv(index=False, header=False).encode()
+    path = tmp_path / "big.csv"
+    repeats = int(size // len(block)) + 1
+    with open(path, "wb") as f:
+        f.write((",".join(frame.columns) + "\n").encode())
+        for _ in range(repeats):
+            f.write(block)
+        # the only matches sit at the very end of the file
+        f.write(frame[frame["age"] == 22].to_csv(index=False, header=False).encode())
+
+    out = subprocess.run([sys.executable, "-c", STREAM_SCRIPT, str(path)], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout)
+    assert result["rows"] == result["total"] == repeats * int((frame["age"] != 22).sum()) + int((frame["age"] == 22).sum())
+    assert result["matches"] == min(3, int((frame["age"] == 22).sum()))
+    assert path.stat().st_size > size and result["peak"] < 512 * 1024 ** 2
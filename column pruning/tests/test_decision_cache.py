@@ -0,0 +1,59 @@
+# tests/test_decision_cache.py
+import json
+
+import pytest
+
+from decision_cache import DecisionCache
+
+
+COLUMNS = ["school", "sex", "age", "G1", "G2", "G3"]
+
+
+def test_disk_entries_survive_a_new_process(tmp_path):
+    key = DecisionCache.make_key("average G3 by sex", COLUMNS, "gemini")
+    DecisionCache(tmp_path).put(key, ["G3", "sex"], {"G3": "target", "sex": "grouping"}, ["age"])
+
+    fresh = DecisionCache(tmp_path)
+    assert fresh.get(key, need_reasons=True) == {
+        "keep": ["G3", "sex"], "reasons": {"G3": "target", "sex": "grouping"}, "prune": ["age"],
+    }
+    assert fresh.get(key)["keep"] == ["G3", "sex"]
+    assert fresh.stats()["disk_hits"] == 1 and fresh.stats()["memory_hits"] == 1
+
+
+def test_key_components():
+    key = DecisionCache.make_key("Average  G3 by sex", COLUMNS, "gemini")
+    assert key == DecisionCache.make_key("average g3 BY sex ", COLUMNS, "gemini")
+    assert key != DecisionCache.make_key("average g3 by sex", list(reversed(COLUMNS)), "gemini")
+    assert key != DecisionCache.make_key("average g3 by sex", COLUMNS, "other-model")
+
+
+def test_keep_only_entries_do_not_answer_reason_lookups(tmp_path):
+    cache = DecisionCache(tmp_path)
+    cache.put("k", ["G3"])
+    assert cache.get("k", need_reasons=True) is None
+    assert cache.get("k") == {"keep": ["G3"], "reasons": None, "prune": None}
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_returned_entries_are_copies(tmp_path):
+    cache = DecisionCache(None)
+    cache.put("k", ["G3"], {"G3": "target"}, [])
+    cache.get("k")["keep"].append("oops")
+    assert cache.get("k")["keep"] == ["G3"]
+
+
+def test_agent_skips_llm_on_cached_decision(tmp_path, monkeypatch):
+    pytest.importorskip("langchain_google_genai")
+    from langchain_core.language_models import FakeListLLM
+    from column_agent import ColumnPruningAgent
+
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    reply = json.dumps({"keep": ["G3", "sex"], "prune": ["age"], "reasons": {"G3": "target", "sex": "group"}})
+    agent = ColumnPruningAgent(model="fake", cache=DecisionCache(tmp_path))
+    agent.llm = FakeListLLM(responses=[reply])
+
+    first = agent.prune_with_reason("average G3 by sex", COLUMNS)
+    # FakeListLLM would raise if asked for a second response
+    second = ColumnPruningAgent(model="fake", cache=DecisionCache(tmp_path)).prune_with_reason("Average G3 by sex", COLUMNS)
+    assert first == second == (["G3", "sex"], {"G3": "target", "sex": "group"}, ["age"])
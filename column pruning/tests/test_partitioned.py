@@ -0,0 +1,68 @@
+# tests/test_partitioned.py
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from column_profile import get_profile
+from dataset import DatasetSource, iter_chunks
+from partitioned import scan_filtered
+
+
+STUDENT_CSV = Path(__file__).resolve().parent.parent / "student_data.csv"
+
+
+@pytest.fixture
+def frame():
+    df = pd.read_csv(STUDENT_CSV)
+    df["year"] = np.where(np.arange(len(df)) % 2 == 0, 2023, 2024)
+    return df
+
+
+@pytest.fixture
+def partitioned(tmp_path, frame):
+    root = tmp_path / "students"
+    # sorted by age so row-group min/max statistics are selective
+    table = pa.Table.from_pandas(frame.sort_values("age", kind="stable"), preserve_index=False)
+    pq.write_to_dataset(table, root, partition_cols=["school", "year"], row_group_size=40)
+    return root
+
+
+def test_directory_is_a_dataset_source(partitioned, frame):
+    ds = DatasetSource(partitioned)
+    assert ds.kind == "partitioned"
+    assert set(ds.columns) == set(frame.columns)
+    assert len(ds.project(["G3", "school"])) == len(frame)
+    assert sum(len(c) for c in iter_chunks(partitioned, "partitioned", ["G3"], chunksize=64)) == len(frame)
+
+
+def test_partition_filter_skips_other_partitions(partitioned, frame):
+    table, stats = scan_filtered(partitioned, "school", "MS", ["G3"])
+    assert table.column_names == ["G3", "school"]
+    assert table.num_rows == (frame["school"] == "MS").sum()
+    assert stats["files"] == 4 and stats["files_scanned"] == 2
+    assert stats["bytes_scanned"] < stats["bytes"]
+
+
+def test_row_group_statistics_skip_non_matching_groups(partitioned, frame):
+    table, stats = scan_filtered(partitioned, "age", "22", ["G3"])
+    assert table.to_pandas()["G3"].tolist() == frame.loc[frame["age"] == 22, "G3"].tolist()
+    assert stats["row_groups_scanned"] == 1 < stats["row_groups"]
+
+    table, stats = scan_filtered(partitioned, "year", "2024", None, limit=5)
+    assert table.num_rows == 5 and stats["files_scanned"] == 2
+
+
+def test_uncastable_value_reads_nothing(partitioned):
+    table, stats = scan_filtered(partitioned, "age", "old", ["G3"])
+    assert table.num_rows == 0 and stats["row_groups_scanned"] == 0
+
+
+def test_profile_covers_partition_columns(partitioned, frame):
+    profile = get_profile(partitioned)
+    assert profile["columns"]["G3"]["rows"] == len(frame)
+    assert dict(map(tuple, profile["columns"]["school"]["top_values"])) == frame["school"].value_counts().to_dict()
+    assert get_profile(partitioned)["sha256"] == profile["sha256"]
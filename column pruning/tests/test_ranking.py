@@ -0,0 +1,43 @@
+# tests/test_ranking.py
+from pathlib import Path
+
+import pandas as pd
+
+from ranking import ColumnRanker, column_tokens, ranker_for
+
+
+STUDENT_COLUMNS = list(pd.read_csv(Path(__file__).resolve().parent.parent / "student_data.csv", nrows=0).columns)
+
+
+def test_column_tokens_split_camel_and_snake():
+    assert set(column_tokens("studyTime_total")) == {"studytimetotal", "studytime", "study", "time", "total"}
+
+
+def test_exact_names_rank_without_substring_noise():
+    ranked = ColumnRanker(STUDENT_COLUMNS).rank("average G3 by sex")
+    # "average" used to pull in "age" through substring matching
+    assert [c for c, _ in ranked] in (["G3", "sex"], ["sex", "G3"])
+    assert all(score > 0 for _, score in ranked)
+
+
+def test_descriptions_and_top_k():
+    ranker = ColumnRanker(STUDENT_COLUMNS, {"G3": "final grade", "Medu": "mother's education"})
+    assert {c for c, _ in ranker.rank("final grade by mother education")} == {"G3", "Medu"}
+    assert len(ranker.rank("G1 G2 G3 sex age school", top_k=2)) == 2
+
+
+def test_no_match_returns_empty():
+    assert ColumnRanker(STUDENT_COLUMNS).rank("total revenue") == []
+
+
+def test_ranker_is_cached_per_schema():
+    assert ranker_for(STUDENT_COLUMNS) is ranker_for(list(STUDENT_COLUMNS))
+    assert ranker_for(STUDENT_COLUMNS) is not ranker_for(STUDENT_COLUMNS[:-1])
+
+
+def test_synonym_lists_work_as_descriptions():
+    synonyms = {"G3": ["final grade", "result"], "Medu": ("mother", "education")}
+    ranker = ranker_for(STUDENT_COLUMNS, synonyms)
+    assert ranker is ranker_for(STUDENT_COLUMNS, {"G3": ["final grade", "result"], "Medu": ["mother", "education"]})
+    assert [c for c, _ in ranker.rank("result by mother")] in (["G3", "Medu"], ["Medu", "G3"])
+    assert "result" in column_tokens("G3", ["final grade", "result"])
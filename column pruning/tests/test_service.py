@@ -0,0 +1,118 @@
+# tests/test_service.py
+import asyncio
+import json
+import re
+from typing import Any, List, Optional
+
+import pytest
+
+pytest.importorskip("langchain_google_genai")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import service
+from column_agent import ColumnPruningAgent
+from decision_cache import DecisionCache
+
+
+COLUMNS = ["school", "sex", "age", "studytime", "G1", "G2", "G3"]
+
+
+class KeywordLLM(BaseChatModel):
+    """Local stand-in for Gemini: keeps the columns named in the query, tracking concurrency."""
+
+    delay: float = 0.02
+    calls: int = 0
+    active: int = 0
+    peak: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "keyword"
+
+    def _answer(self, prompt: str) -> str:
+        query = re.search(r"User Query:\n(.*)\n", prompt).group(1)
+        if "fail" in query:
+            return "not json"
+        names = re.search(r"Available Columns \(use exact names\):\n(.*)\n", prompt).group(1).split(", ")
+        words = set(query.lower().split())
+        keep = [c for c in names if c.lower() in words]
+        return json.dumps({
+            "keep": keep,
+            "prune": [c for c in names if c not in keep],
+            "reasons": {c: "named in query" for c in keep},
+        })
+
+    def _result(self, messages) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(messages[-1].content)))])
+
+    def _generate(self, messages, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        self.calls += 1
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            return self._result(messages)
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    agent = ColumnPruningAgent(model="fake", cache=DecisionCache(None))
+    agent.llm = KeywordLLM()
+    monkeypatch.setattr(service, "_agent", agent)
+    return agent.llm
+
+
+@pytest.fixture
+def client():
+    return TestClient(service.app)
+
+
+def test_batch_bounds_concurrency_and_dedupes(client, llm):
+    queries = [f"mean G{i % 3 + 1} by sex for group {i}" for i in range(12)] + ["mean G1 by sex for group 0"]
+    resp = client.post("/prune/batch", json={"queries": queries, "columns": COLUMNS, "concurrency": 3})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [r["query"] for r in body["results"]] == queries
+    assert body["results"][0]["keep"] == ["sex", "G1"] and body["results"][1]["keep"] == ["sex", "G2"]
+    assert body["results"][0]["reasons"] == {"sex": "named in query", "G1": "named in query"}
+    assert "school" in body["results"][0]["prune"]
+    assert llm.calls == 12 and llm.peak == 3
+    assert body["summary"]["succeeded"] == 13 and body["summary"]["tiers"] == {"llm": 13}
+
+
+def test_batch_reports_per_query_errors_and_reuses_cache(client, llm):
+    queries = ["G3 by school", "this will fail"]
+    body = client.post("/prune/batch", json={"queries": queries, "columns": COLUMNS}).json()
+    assert body["results"][0]["tier"] == "llm" and body["results"][1]["error"].startswith("Model did not return")
+    assert body["summary"]["failed"] == 1
+
+    again = client.post("/prune/batch", json={"queries": ["g3  BY school"], "columns": COLUMNS}).json()
+    assert again["results"][0]["tier"] == "cache" and llm.calls == 2
+
+
+def test_auto_mode_only_sends_unclear_queries_to_llm(client, llm):
+    queries = ["average G3 by sex", "does studytime matter"]
+    body = client.post("/prune/batch", json={"queries": queries, "columns": COLUMNS, "mode": "auto"}).json()
+    assert [r["tier"] for r in body["results"]] == ["heuristic", "llm"]
+    assert set(body["results"][0]["keep"]) == {"G3", "sex"}
+    assert llm.calls == 1
+
+
+def test_single_prune_endpoint(client, llm):
+    resp = client.post("/prune", json={"query": "age by school", "columns": COLUMNS})
+    assert resp.status_code == 200 and resp.json()["keep"] == ["school", "age"]
+    assert client.post("/prune", json={"query": "fail", "columns": COLUMNS}).status_code == 502
+    offline = client.post("/prune", json={"query": "G1 and G2", "columns": COLUMNS, "mode": "offline"}).json()
+    assert offline["tier"] == "heuristic" and llm.calls == 2
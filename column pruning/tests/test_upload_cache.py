@@ -0,0 +1,64 @@
+# tests/test_upload_cache.py
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from dataset import DatasetSource, iter_chunks
+from upload_cache import content_hash, evict, materialize
+
+
+STUDENT_CSV = Path(__file__).resolve().parent.parent / "student_data.csv"
+
+
+def test_identical_uploads_share_one_entry(tmp_path):
+    data = STUDENT_CSV.read_bytes()
+    path = materialize(data, "a.csv", tmp_path)
+    assert path.name == f"{content_hash(data)}.arrow"
+    mtime = path.stat().st_mtime_ns
+    assert materialize(data, "renamed.csv", tmp_path) == path
+    assert path.stat().st_mtime_ns == mtime
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_cached_projection_matches_source(tmp_path, suffix):
+    frame = pd.read_csv(STUDENT_CSV)
+    src = tmp_path / f"upload{suffix}"
+    frame.to_csv(src, index=False) if suffix == ".csv" else frame.to_parquet(src)
+
+    ds = DatasetSource(materialize(src.read_bytes(), src.name, tmp_path / "cache"))
+    assert ds.kind == "arrow" and ds.columns == list(frame.columns)
+    pd.testing.assert_frame_equal(ds.project(["G3", "sex"]), frame[["G3", "sex"]])
+    pd.testing.assert_frame_equal(ds.head(3), frame.head(3))
+    assert sum(len(c) for c in iter_chunks(ds.source, "arrow", ["age"], chunksize=100)) == len(frame)
+
+
+def test_mixed_type_columns_are_cached_as_text(tmp_path):
+    src = tmp_path / "mixed.xlsx"
+    pd.DataFrame({"code": [1, "A2", 3.5, None], "n": [1, 2, 3, 4]}).to_excel(src, index=False)
+    ds = DatasetSource(materialize(src.read_bytes(), src.name, tmp_path / "cache"))
+    df = ds.project(["code", "n"])
+    assert df["code"].tolist()[:3] == ["1", "A2", "3.5"] and pd.isna(df["code"].iloc[3])
+    assert df["n"].tolist() == [1, 2, 3, 4]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    frame = pd.read_csv(STUDENT_CSV)
+    uploads = [frame.head(n).to_csv(index=False).encode() for n in (100, 200, 300)]
+    paths = [materialize(data, "a.csv", tmp_path) for data in uploads]
+    sizes = [p.stat().st_size for p in paths]
+    # reading the first entry again makes the second the least recently used
+    materialize(uploads[0], "a.csv", tmp_path)
+    assert evict(tmp_path, max_bytes=sum(sizes) - 1) == 1
+    assert [p.exists() for p in paths] == [True, False, True]
+
+    # a new entry is kept even when it alone is over the cap
+    path = materialize(frame.to_csv(index=False).encode(), "a.csv", tmp_path, max_bytes=1)
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
+
+
+def test_unsupported_upload_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        materialize(b"x", "notes.txt", tmp_path)
+    assert not any(tmp_path.iterdir())
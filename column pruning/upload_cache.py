@@ -0,0 +1,105 @@
+"""
+Content-addressed columnar cache for uploaded datasets.
+
+An upload is hashed and parsed once into an uncompressed Arrow IPC file
+named after its SHA-256 (`<hash>.arrow`). Every later rerun, preview and
+column projection memory-maps that file instead of re-parsing the CSV or
+Excel bytes, and identical uploads (from any session or replica sharing
+the directory) reuse the same entry.
+
+The directory is capped at UPLOAD_CACHE_MAX_BYTES: after each new entry
+the least recently used ones are deleted until it fits again.
+"""
+from pathlib import Path
+from typing import Optional
+import hashlib
+import io
+import os
+import tempfile
+import time
+
+import pyarrow as pa
+
+from dataset import file_kind, load_dataset
+
+
+DEFAULT_UPLOAD_CACHE_DIR = os.getenv(
+    "UPLOAD_CACHE_DIR", str(Path.home() / ".cache" / "column_pruning" / "uploads")
+)
+DEFAULT_UPLOAD_CACHE_MAX_BYTES = int(os.getenv("UPLOAD_CACHE_MAX_BYTES", str(5 * 1024**3)))
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _to_table(data: bytes, kind: str) -> pa.Table:
+    if kind == "arrow":
+        return pa.ipc.open_file(pa.BufferReader(data)).read_all()
+    # Same parser as the uncached path, so dtypes do not change with caching
+    df = load_dataset(io.BytesIO(data), kind)
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # Mixed-type object columns (common in Excel sheets) have no Arrow type; store them as text
+        mixed = df.select_dtypes(include="object").columns
+        df[mixed] = df[mixed].astype("string")
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _touch(path: Path) -> None:
+    # Recency lives in atime so mtime keeps recording when the entry was written
+    try:
+        os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns))
+    except OSError:
+        pass
+
+
+def evict(directory, max_bytes: int = DEFAULT_UPLOAD_CACHE_MAX_BYTES, keep: Optional[Path] = None) -> int:
+    """Delete least recently used entries until the directory fits in `max_bytes`; returns how many."""
+    entries = []
+    for p in Path(directory).glob("*.arrow"):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        entries.append((st.st_atime_ns, st.st_size, p))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, p in sorted(entries):
+        if total <= max_bytes:
+            break
+        if p == keep:
+            continue
+        try:
+            # Readers that already memory-mapped the file keep their mapping
+            p.unlink()
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def materialize(data: bytes, name: str, directory: Optional[str] = None,
+                max_bytes: int = DEFAULT_UPLOAD_CACHE_MAX_BYTES) -> Path:
+    """Return the cached Arrow file for these upload bytes, converting them on first sight."""
+    directory = Path(directory or DEFAULT_UPLOAD_CACHE_DIR)
+    path = directory / f"{content_hash(data)}.arrow"
+    if path.exists():
+        _touch(path)
+        return path
+
+    table = _to_table(data, file_kind(name))
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f, pa.ipc.new_file(f, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    evict(directory, max_bytes, keep=path)
+    return path
@@ -11,6 +11,10 @@ class SQLValidator:
         self.metadata.reflect(bind=self.engine)
         self.inspector = inspect(self.engine)
 
+    def schema(self):
+        """Reflected tables as {table: [columns]}, for callers that prompt on the same schema."""
+        return {name: [c.name for c in table.columns] for name, table in self.metadata.tables.items()}
+
     def validate_syntax(self, query: str):
         """Use PostgreSQL to actually parse the query via EXPLAIN."""
         try:
@@ -38,7 +42,9 @@ class SQLValidator:
             elif isinstance(token, sqlparse.sql.Identifier):
                 tables.add(token.get_real_name())
 
-        tables = [t for t in tables if t in self.metadata.tables]
+        # Unquoted identifiers are case-insensitive (PostgreSQL folds them to lower case)
+        known = {name.lower() for name in self.metadata.tables}
+        tables = [t for t in tables if t and t.lower() in known]
         if not tables:
             return False, "No valid tables referenced"
         return True, "Semantics valid"
@@ -66,9 +72,13 @@ class SQLValidator:
 
     def validate_security(self, query: str):
         """Naive SQL injection / dangerous statement check."""
-        forbidden_keywords = ["drop", "delete", "insert", "update", "union", "exec", "--", ";"]
+        forbidden_keywords = ["drop", "delete", "insert", "update", "union", "exec"]
+        forbidden_tokens = ["--", ";"]
         query_lower = query.lower()
-        if any(keyword in query_lower for keyword in forbidden_keywords):
+        # Keywords match whole words only so columns like updated_at are allowed
+        if any(re.search(rf"\b{keyword}\b", query_lower) for keyword in forbidden_keywords):
+            return False, "Forbidden SQL keyword detected"
+        if any(token in query_lower for token in forbidden_tokens):
             return False, "Forbidden SQL keyword detected"
         return True, "Security valid"
 
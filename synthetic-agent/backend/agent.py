@@ -1,32 +1,45 @@
 # backend/agent.py
 import os
 import logging
-from typing import Optional
+import re
+import threading
+import time
+from typing import Iterator, Optional
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 try:
-    import openai
-    _HAS_OPENAI = True
-except Exception:
-    openai = None
-    _HAS_OPENAI = False
-
-try:
-    from transformers import pipeline
+    from transformers import pipeline, StoppingCriteriaList, TextIteratorStreamer
     _HAS_TRANSFORMERS = True
 except Exception:
     pipeline = None
+    StoppingCriteriaList = None
+    TextIteratorStreamer = None
     _HAS_TRANSFORMERS = False
 
-from database import save_turn
+from database import record_turn
+from kv_cache import USER_MARK, get_session_cache
+from llm_client import CircuitOpenError, chat_stream_sync, chat_sync
+from model_registry import get_registry
 from utils import sanitize_text
 
+# HF replies see the user's earlier turns (with the model's KV cache kept between turns)
+HF_MULTI_TURN = os.getenv("HF_MULTI_TURN", "1") == "1"
+SYSTEM_PROMPT = "You are AIML Nexus, an expert assistant for AIML research and development. Keep answers concise and actionable."
+
+
+def _stop_when_set(event: threading.Event):
+    """Stopping criteria for generate() that end decoding once `event` is set."""
+    # a plain bool is accepted by every StoppingCriteriaList version (older ones any() it, newer ones OR it in)
+    criteria = [lambda input_ids, scores, **kwargs: event.is_set()]
+    return StoppingCriteriaList(criteria) if StoppingCriteriaList is not None else criteria
+
+
 class AIMLAgent:
     """
     Modular agent:
-      - If OPENAI_API_KEY is present and openai installed -> uses OpenAI ChatCompletion.
+      - If OPENAI_API_KEY is present -> uses the OpenAI chat completions API (llm_client).
       - Else if transformers installed -> uses local HF text-generation pipeline.
       - Else -> fallback deterministic replies.
     """
@@ -35,16 +48,11 @@ class AIMLAgent:
         self.openai_key = os.getenv("OPENAI_API_KEY") or None
         self.hf_model = os.getenv("HF_MODEL", hf_model)
         self.backend = "fallback"
-        self.generator = None
+        self.last_stream_stats = None
 
-        if self.openai_key and _HAS_OPENAI:
-            try:
-                openai.api_key = self.openai_key
-                self.backend = "openai"
-                logger.info("AIMLAgent: Using OpenAI backend.")
-            except Exception as e:
-                logger.exception("Failed to configure OpenAI: %s", e)
-                self.backend = "fallback"
+        if self.openai_key:
+            self.backend = "openai"
+            logger.info("AIMLAgent: Using OpenAI backend.")
         elif _HAS_TRANSFORMERS:
             try:
                 # create pipeline lazily
@@ -66,44 +74,46 @@ class AIMLAgent:
         else:
             return self._respond_fallback(message, user_id)
 
+    @staticmethod
+    def _openai_messages(message: str):
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": message}
+        ]
+
     def _respond_openai(self, message: str, user_id: Optional[str]) -> str:
         try:
-            system_prompt = "You are AIML Nexus, an expert assistant for AIML research and development. Keep answers concise and actionable."
-            resp = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": message}
-                ],
-                max_tokens=300,
-                temperature=0.7,
-            )
-            text = resp.choices[0].message.content.strip()
+            text = chat_sync(self._openai_messages(message), max_tokens=300, temperature=0.7)
             try:
-                save_turn(user_id, message, text)
+                record_turn(user_id, message, text)
             except Exception:
                 logger.debug("Could not save turn.")
             return text
+        except CircuitOpenError:
+            # remote is down: answer locally without waiting on it
+            return self._respond_fallback(message, user_id)
         except Exception as e:
             logger.exception("OpenAI call failed: %s", e)
             return self._respond_fallback(message, user_id)
 
     def _respond_hf(self, message: str, user_id: Optional[str]) -> str:
         try:
-            if self.generator is None:
-                # Lazy load to avoid heavy startup cost unless used
-                self.generator = pipeline("text-generation", model=self.hf_model, device=-1)
-            prompt = f"You are AIML Nexus. User: {message}\nAIML Nexus:"
-            out = self.generator(prompt, max_length=256, do_sample=True, top_p=0.95, top_k=50, num_return_sequences=1)
-            text = out[0].get("generated_text", "")
-            # remove prompt prefix if present
-            if prompt in text:
-                reply = text.split(prompt, 1)[1].strip()
+            # Loaded on first use and shared by every agent in the process
+            generator = get_registry().get(self.hf_model)
+            if self._multi_turn(generator):
+                reply = get_session_cache().generate(generator, self._session_key(user_id), message)
             else:
-                # fallback to full text
-                reply = text.strip()
+                prompt = f"You are AIML Nexus. User: {message}\nAIML Nexus:"
+                out = generator(prompt, max_length=256, do_sample=True, top_p=0.95, top_k=50, num_return_sequences=1)
+                text = out[0].get("generated_text", "")
+                # remove prompt prefix if present
+                if prompt in text:
+                    reply = text.split(prompt, 1)[1].strip()
+                else:
+                    # fallback to full text
+                    reply = text.strip()
             try:
-                save_turn(user_id, message, reply)
+                record_turn(user_id, message, reply)
             except Exception:
                 logger.debug("Could not save turn.")
             return reply
@@ -111,7 +121,24 @@ class AIMLAgent:
             logger.exception("HF generation failed: %s", e)
             return self._respond_fallback(message, user_id)
 
+    @staticmethod
+    def _multi_turn(generator) -> bool:
+        # the session cache drives model.generate directly, so it needs the pipeline's model
+        return HF_MULTI_TURN and hasattr(generator, "model") and hasattr(generator, "tokenizer")
+
+    def _session_key(self, user_id: Optional[str]) -> str:
+        return f"{self.hf_model}:{user_id or 'anonymous'}"
+
     def _respond_fallback(self, message: str, user_id: Optional[str]) -> str:
+        reply = self._fallback_reply(message)
+        try:
+            record_turn(user_id, message, reply)
+        except Exception:
+            logger.debug("Could not save turn.")
+        return reply
+
+    @staticmethod
+    def _fallback_reply(message: str) -> str:
         m = message.lower()
         if any(g in m for g in ["hello", "hi", "hey"]):
             reply = "Hello! I'm AIML Nexus — how can I help you with your AIML project?"
@@ -121,8 +148,123 @@ class AIMLAgent:
             reply = "You're welcome! If you need more help, ask anytime."
         else:
             reply = f"I received: {message}. (Tip: set OPENAI_API_KEY to enable richer replies.)"
+        return reply
+
+    def respond_stream(self, message: str, user_id: Optional[str] = "anonymous") -> Iterator[str]:
+        """
+        Like respond(), but yields the reply in chunks as the backend produces them.
+        The turn is persisted once, after the last chunk (or with what was
+        produced if the caller stops early). Timing of the last stream is kept
+        in `last_stream_stats`: time to first chunk, total time, chunk count.
+        """
+        message = sanitize_text(message)
+        if not message:
+            yield "I didn't catch that — please type a message."
+            return
+
+        if self.backend == "openai":
+            chunks = self._stream_openai(message)
+        elif self.backend == "hf":
+            chunks = self._stream_hf(message, user_id)
+        else:
+            chunks = self._stream_fallback(message)
+
+        parts = []
+        start = time.perf_counter()
+        ttft_ms = None
         try:
-            save_turn(user_id, message, reply)
-        except Exception:
-            logger.debug("Could not save turn.")
-        return reply
\ No newline at end of file
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - start) * 1000
+                parts.append(chunk)
+                yield chunk
+        finally:
+            total_ms = (time.perf_counter() - start) * 1000
+            self.last_stream_stats = {"ttft_ms": ttft_ms, "total_ms": total_ms, "chunks": len(parts)}
+            logger.debug("Streamed %d chunks (%s backend): first after %s ms, done in %.0f ms.",
+                        len(parts), self.backend, "-" if ttft_ms is None else f"{ttft_ms:.0f}", total_ms)
+            reply = "".join(parts).strip()
+            if reply:
+                try:
+                    record_turn(user_id, message, reply)
+                except Exception:
+                    logger.debug("Could not save turn.")
+
+    def _stream_openai(self, message: str) -> Iterator[str]:
+        produced = False
+        try:
+            for text in chat_stream_sync(self._openai_messages(message), max_tokens=300, temperature=0.7):
+                produced = True
+                yield text
+        except CircuitOpenError:
+            yield from self._stream_fallback(message)
+        except Exception as e:
+            logger.exception("OpenAI stream failed: %s", e)
+            # mid-reply failures keep the partial answer rather than appending a canned one
+            if not produced:
+                yield from self._stream_fallback(message)
+
+    def _stream_hf(self, message: str, user_id: Optional[str]) -> Iterator[str]:
+        produced = False
+        try:
+            generator = get_registry().get(self.hf_model)
+            prompt = f"You are AIML Nexus. User: {message}\nAIML Nexus:"
+            streamer = TextIteratorStreamer(generator.tokenizer, skip_prompt=True, skip_special_tokens=True)
+            stop = threading.Event()
+            stopping = _stop_when_set(stop)
+            errors = []
+
+            def generate():
+                try:
+                    if self._multi_turn(generator):
+                        get_session_cache().generate(generator, self._session_key(user_id), message, streamer=streamer,
+                                                     stopping_criteria=stopping)
+                    else:
+                        generator(prompt, max_length=256, do_sample=True, top_p=0.95, top_k=50,
+                                  num_return_sequences=1, streamer=streamer, stopping_criteria=stopping)
+                except Exception as e:
+                    errors.append(e)
+                    # unblock the consumer loop below
+                    streamer.end()
+
+            # generate() runs in a worker thread; decoded text arrives through the streamer
+            worker = threading.Thread(target=generate, daemon=True)
+            worker.start()
+            try:
+                for text in self._until_user_mark(streamer):
+                    produced = True
+                    yield text
+            finally:
+                # the client went away or the reply reached the next "User:" line: stop decoding too
+                stop.set()
+            worker.join()
+            if errors:
+                raise errors[0]
+        except Exception as e:
+            logger.exception("HF streaming failed: %s", e)
+            if not produced:
+                yield from self._stream_fallback(message)
+
+    @staticmethod
+    def _until_user_mark(chunks: Iterator[str]) -> Iterator[str]:
+        """Pass text through until the model starts a new "User:" line, which is never shown."""
+        pending = ""
+        for text in chunks:
+            pending += text
+            if USER_MARK in pending:
+                pending = pending.split(USER_MARK, 1)[0]
+                break
+            # hold back a tail that could be the start of the marker
+            hold = next((n for n in range(min(len(pending), len(USER_MARK) - 1), 0, -1)
+                         if USER_MARK.startswith(pending[-n:])), 0)
+            if len(pending) > hold:
+                yield pending[:len(pending) - hold]
+                pending = pending[len(pending) - hold:]
+        if pending:
+            yield pending
+
+    def _stream_fallback(self, message: str) -> Iterator[str]:
+        # word by word, so the UI path is the same for every backend
+        yield from re.findall(r"\S+\s*", self._fallback_reply(message))
\ No newline at end of file
@@ -1,7 +1,6 @@
 # backend/app.py
 import streamlit as st
-from agent import AIMLAgent
-from database import get_last_n_turns
+from chat_client import CHAT_API_URL, ChatAPIClient
 import os
 
 st.set_page_config(page_title="AIML Nexus (Streamlit)", layout="centered")
@@ -9,26 +8,76 @@ st.set_page_config(page_title="AIML Nexus (Streamlit)", layout="centered")
 st.title("AIML Nexus — Backend Chat (Streamlit)")
 st.write("A minimal chat UI that talks to the AIML Nexus agent (OpenAI/Local HF/fallback).")
 
-# create/get agent (singleton via session_state)
-if "agent" not in st.session_state:
-    st.session_state.agent = AIMLAgent()
+# create/get agent (singleton via session_state); with CHAT_API_URL set this UI
+# is a thin client of the chat API (service.py) and generates nothing itself
+if CHAT_API_URL:
+    if "agent" not in st.session_state:
+        st.session_state.agent = ChatAPIClient(CHAT_API_URL)
+    agent = st.session_state.agent
+    load_history = agent.history
+    search = agent.search
+else:
+    from agent import AIMLAgent
+    from database import get_user_turns, search_turns
+    from model_registry import get_registry
+    from retention import start_compactor
 
-agent = st.session_state.agent
+    # once per process, however many sessions rerun this script
+    start_compactor()
+    if "agent" not in st.session_state:
+        st.session_state.agent = AIMLAgent()
+    agent = st.session_state.agent
+    load_history = get_user_turns
+    search = search_turns
+
+# HF models are shared by all sessions in this process
+if not CHAT_API_URL and agent.backend == "hf":
+    stats = get_registry().stats()
+    with st.sidebar.expander("Loaded models"):
+        cap = f" of {stats['cap_mb']:.0f} MB" if stats["cap_mb"] else ""
+        st.write(f"{stats['total_mb']:.0f} MB{cap} · {stats['loads']} loads · {stats['evictions']} unloads")
+        for m in stats["models"]:
+            st.write(f"`{m['name']}` — {m['mb']:.0f} MB, {m['hits']} uses")
 
 # user id simple input
 user_id = st.text_input("User ID", value=os.getenv('USER', 'local-user'), key="user_id")
 
-# show last N turns from DB
-with st.expander("Conversation history (last 20)"):
-    rows = get_last_n_turns(20)
+# show this user's history, 20 turns per page (older pages on request)
+if st.session_state.get("history_user") != user_id:
+    st.session_state.history_user = user_id
+    st.session_state.history_before = None
+
+with st.expander("Conversation history"):
+    rows = load_history(user_id, 20, before_id=st.session_state.history_before)
     if rows:
         for r in rows:
             st.markdown(f"**{r.user_id}**: {r.user_message}")
             st.markdown(f"> {r.reply}")
     else:
         st.write("_No conversation history yet._")
+    older, latest = st.columns([1, 1])
+    if len(rows) == 20 and older.button("Older"):
+        st.session_state.history_before = rows[0].id
+        st.experimental_rerun()
+    if st.session_state.history_before is not None and latest.button("Latest"):
+        st.session_state.history_before = None
+        st.experimental_rerun()
+
+with st.expander("Search conversations"):
+    query = st.text_input("Keywords", key="search_query")
+    only_mine = st.checkbox("Only this user", value=False, key="search_only_mine")
+    if query.strip():
+        hits = search(query, user_id if only_mine else None, 20)
+        if hits:
+            for h in hits:
+                st.markdown(f"**{h.user_id}** (#{h.id}): {h.snippet}")
+        else:
+            st.write("_No matching turns._")
 
 st.markdown("---")
+timing = st.session_state.get("last_timing")
+if timing and timing["ttft_ms"] is not None:
+    st.caption(f"Last reply: first token after {timing['ttft_ms']:.0f} ms, done in {timing['total_ms']:.0f} ms")
 # input area
 user_input = st.text_area("Message", value="", height=120, key="user_input")
 
@@ -42,15 +91,19 @@ if clear:
     st.session_state.user_input = ""
 
 if send and user_input.strip():
-    with st.spinner("AIML Nexus is thinking..."):
-        try:
-            reply = agent.respond(user_input.strip(), user_id=user_id)
-        except Exception as e:
-            reply = f"Error generating reply: {e}"
-
     st.markdown("**You:**")
     st.write(user_input)
     st.markdown("**AIML Nexus:**")
-    st.info(reply)
+    # render the reply as it streams in instead of waiting behind a spinner
+    placeholder = st.empty()
+    reply = ""
+    try:
+        for chunk in agent.respond_stream(user_input.strip(), user_id=user_id):
+            reply += chunk
+            placeholder.info(reply + "▌")
+    except Exception as e:
+        reply += f"\n\nError generating reply: {e}"
+    placeholder.info(reply)
+    st.session_state.last_timing = agent.last_stream_stats
 
     st.experimental_rerun()
\ No newline at end of file
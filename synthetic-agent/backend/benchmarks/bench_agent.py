@@ -0,0 +1,271 @@
+"""
+Benchmark AIMLAgent.respond per backend at several concurrency levels.
+
+    python benchmarks/bench_agent.py --backends fallback,openai,hf --concurrency 1,8,32 --requests 200
+    python benchmarks/bench_agent.py --json after.json --baseline before.json
+
+  - fallback: canned replies, so what is measured is sanitising and persistence.
+  - openai: the real llm_client against load_chat's local mock, which
+    answers after --mock-llm-ms. The mock runs in a child process so it
+    does not compete with the agent for the GIL.
+  - hf: a tiny local model (--hf-model). It is skipped when transformers,
+    torch or the weights are not available.
+
+Every request is timed end to end and split into persistence (the agent's
+record_turn call, i.e. save_turn with --persist sync) and generation (the
+rest). Memory is the process RSS after each run. Each backend and
+concurrency level is run --repeat times; the report keeps the medians, the
+spread (max - min) of the compared metrics and the total fallbacks.
+--json writes the report; --baseline compares it with an earlier one and
+exits 1 if throughput or p50 latency got worse by more than --tolerance,
+by more than the two runs' spreads together and by more than --min-delta-ms
+per request, so run-to-run jitter is not a regression. p95 is printed for
+reference only: with a few hundred requests it moves too much to gate on.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_tmp = tempfile.TemporaryDirectory()
+# database.py creates its engine at import time, so point it at a scratch file first
+os.environ["AIML_NEXUS_DB"] = f"sqlite:///{Path(_tmp.name) / 'bench.db'}"
+
+from load_chat import start_mock_llm_process  # noqa: E402
+
+# llm_client reads its endpoint at import time, so the mock and its delay come first
+_early = argparse.ArgumentParser(add_help=False)
+_early.add_argument("--mock-llm-ms", type=float, default=200)
+os.environ["OPENAI_BASE_URL"] = start_mock_llm_process(_early.parse_known_args()[0].mock_llm_ms)
+os.environ["OPENAI_API_KEY"] = "mock"
+os.environ.setdefault("LLM_MAX_IN_FLIGHT", "256")
+
+import agent as agent_module  # noqa: E402
+import database  # noqa: E402
+from agent import AIMLAgent  # noqa: E402
+from model_registry import get_registry  # noqa: E402
+
+MESSAGES = [
+    "how to pick a learning rate for fine-tuning",
+    "what is the difference between batch norm and layer norm",
+    "suggest a baseline for tabular classification",
+    "how do I detect overfitting early",
+]
+# lower is better for latencies; higher for throughput
+COMPARED = {"throughput_rps": 1, "latency_ms.p50": -1}
+# printed next to the compared metrics but never counted as a regression
+REPORTED = {"latency_ms.p95": -1}
+
+_request = threading.local()
+_record_turn = agent_module.record_turn
+
+
+def _timed_record_turn(user_id, user_message, reply):
+    start = time.perf_counter()
+    try:
+        return _record_turn(user_id, user_message, reply)
+    finally:
+        _request.persist = getattr(_request, "persist", 0.0) + time.perf_counter() - start
+
+
+# the agent persists through its module-level record_turn; time it per request
+agent_module.record_turn = _timed_record_turn
+
+
+def percentiles(values) -> dict:
+    ordered = sorted(values)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]  # noqa: E731
+    return {"p50": pick(50), "p90": pick(90), "p95": pick(95), "p99": pick(99), "max": ordered[-1]}
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # no procfs: the peak is the closest cheap figure
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def prepare(agent: AIMLAgent, backend: str, hf_model: str):
+    """Point the agent at `backend`; returns (load seconds, None) or (None, reason it cannot run)."""
+    agent.backend = backend
+    if backend != "hf":
+        return 0.0, None
+    if not agent_module._HAS_TRANSFORMERS:
+        return None, "transformers is not installed"
+    agent.hf_model = hf_model
+    start = time.perf_counter()
+    try:
+        get_registry().get(hf_model)
+    except Exception as e:
+        return None, f"could not load {hf_model}: {e}"
+    return time.perf_counter() - start, None
+
+
+def run(agent: AIMLAgent, backend: str, concurrency: int, requests: int) -> dict:
+    def one(i: int):
+        message = MESSAGES[i % len(MESSAGES)]
+        _request.persist = 0.0
+        start = time.perf_counter()
+        reply = agent.respond(message, user_id=f"bench-{concurrency}-{i % concurrency}")
+        total = time.perf_counter() - start
+        # openai and hf answer with the canned reply when generation fails
+        fell_back = backend != "fallback" and reply == AIMLAgent._fallback_reply(message)
+        return total * 1000, _request.persist * 1000, fell_back
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    flush_start = time.perf_counter()
+    database.flush_turns()
+    flush_ms = (time.perf_counter() - flush_start) * 1000
+
+    latency = [r[0] for r in results]
+    persist = [r[1] for r in results]
+    return {
+        "backend": backend,
+        "concurrency": concurrency,
+        "requests": requests,
+        "fallbacks": sum(r[2] for r in results),
+        "throughput_rps": requests / elapsed,
+        "latency_ms": percentiles(latency),
+        "generation_ms": percentiles([t - p for t, p in zip(latency, persist)]),
+        "persist_ms": percentiles(persist),
+        "persist_share": sum(persist) / sum(latency),
+        "flush_ms": flush_ms,
+        "rss_mb": rss_mb(),
+        "rss_growth_mb": rss_mb() - rss_before,
+    }
+
+
+def _metric(result: dict, path: str) -> float:
+    value = result
+    for key in path.split("."):
+        value = value[key]
+    return value
+
+
+def median_result(runs: list) -> dict:
+    """One result for repeated runs: timings, rates and percentiles are medians over `runs`, fallbacks the total."""
+    result = dict(runs[0], repeats=len(runs), fallbacks=sum(r["fallbacks"] for r in runs))
+    for key, value in runs[0].items():
+        if isinstance(value, dict):
+            result[key] = {k: statistics.median(r[key][k] for r in runs) for k in value}
+        elif isinstance(value, float):
+            result[key] = statistics.median(r[key] for r in runs)
+    result["spread"] = {path: max(_metric(r, path) for r in runs) - min(_metric(r, path) for r in runs)
+                        for path in {**COMPARED, **REPORTED}}
+    return result
+
+
+def compare(report: dict, baseline: dict, tolerance: float, min_delta_ms: float = 0.0) -> int:
+    """Print the change for every run present in both reports; returns how many regressed."""
+    old = {(r["backend"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\nagainst baseline from {baseline['meta']['created']} "
+          f"(tolerance {tolerance:.0%}, latency floor {min_delta_ms:g} ms; p95 not gated)")
+    for result in report["results"]:
+        before = old.get((result["backend"], result["concurrency"]))
+        if before is None:
+            continue
+        for path, sign in {**COMPARED, **REPORTED}.items():
+            a, b = _metric(before, path), _metric(result, path)
+            change = (b - a) / a if a else 0.0
+            # a change within what repeats of either run already varied by is noise
+            noise = before.get("spread", {}).get(path, 0.0) + result.get("spread", {}).get(path, 0.0)
+            worse = path in COMPARED and change * sign < -tolerance and abs(b - a) > noise
+            if path.startswith("latency_ms"):
+                worse = worse and b - a > min_delta_ms
+            elif a and b:
+                # throughput as time per request, so the same floor applies
+                conc = result["concurrency"]
+                worse = worse and conc * 1000 / b - conc * 1000 / a > min_delta_ms
+            regressions += worse
+            print(f"{result['backend']:<9} {result['concurrency']:>4}  {path:<15} {a:>10.2f} -> {b:>10.2f}  "
+                  f"{change:>+7.1%}  ±{noise:<8.2f}{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="fallback,openai,hf", help="comma-separated: fallback, openai, hf")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrent callers")
+    parser.add_argument("--requests", type=int, default=200, help="requests per backend and concurrency level")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per backend and concurrency level; medians and their spread are kept")
+    parser.add_argument("--mock-llm-ms", type=float, default=200, help="latency of the mock OpenAI endpoint")
+    parser.add_argument("--hf-model", default="sshleifer/tiny-gpt2")
+    parser.add_argument("--persist", choices=["sync", "write_behind"], default="sync",
+                        help="sync puts save_turn on the request path (default); write_behind only queues")
+    parser.add_argument("--json", help="write the report here")
+    parser.add_argument("--baseline", help="earlier --json report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="latency (or time per request, for throughput) must also grow by this much")
+    args = parser.parse_args()
+
+    database.PERSIST_MODE = args.persist
+    agent = AIMLAgent()
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "persist": args.persist,
+            "mock_llm_ms": args.mock_llm_ms,
+            "hf_model": args.hf_model,
+            "repeat": args.repeat,
+        },
+        "results": [],
+        "skipped": {},
+    }
+
+    print(f"persist={args.persist}  mock_llm_ms={args.mock_llm_ms:g}  {args.requests} requests per run, "
+          f"median of {args.repeat}")
+    print(f"{'backend':<9} {'conc':>4}  {'req/s':>8}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  "
+          f"{'gen p50':>8}  {'save p50':>8}  {'save %':>6}  {'rss MB':>7}  {'fallbk':>6}")
+    for backend in args.backends.split(","):
+        load_s, reason = prepare(agent, backend, args.hf_model)
+        if reason:
+            report["skipped"][backend] = reason
+            print(f"{backend:<9} skipped: {reason}")
+            continue
+        # warm up connections and caches outside the measured runs
+        agent.respond(MESSAGES[0], user_id="bench-warmup")
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            result = median_result([run(agent, backend, concurrency, args.requests)
+                                    for _ in range(max(1, args.repeat))])
+            result["load_s"] = load_s
+            report["results"].append(result)
+            lat, gen, save = result["latency_ms"], result["generation_ms"], result["persist_ms"]
+            print(f"{backend:<9} {concurrency:>4}  {result['throughput_rps']:>8.1f}  {lat['p50']:>8.2f}  "
+                  f"{lat['p95']:>8.2f}  {lat['p99']:>8.2f}  {gen['p50']:>8.2f}  {save['p50']:>8.3f}  "
+                  f"{result['persist_share']:>6.1%}  {result['rss_mb']:>7.0f}  {result['fallbacks']:>6}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+        print(f"\nreport written to {args.json}")
+    if args.baseline:
+        regressions = compare(report, json.loads(Path(args.baseline).read_text()), args.tolerance,
+                              args.min_delta_ms)
+        if regressions:
+            sys.exit(f"{regressions} metric(s) regressed beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark per-user history latency as the conversations table grows.
+
+    python benchmarks/bench_history.py --steps 100000,1000000,3000000 --users 1000
+
+At each table size it times get_user_turns for a user's latest page and for
+a page deep in their history (keyset: `id < X`), next to the same deep page
+fetched with LIMIT/OFFSET for contrast. With the (user_id, id) index the
+keyset pages should stay flat while the table grows.
+"""
+from pathlib import Path
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_tmp = tempfile.TemporaryDirectory()
+# database.py creates its engine at import time, so point it at a scratch file first
+os.environ["AIML_NEXUS_DB"] = f"sqlite:///{Path(_tmp.name) / 'bench.db'}"
+
+from sqlalchemy import func, insert, select, text  # noqa: E402
+
+import database  # noqa: E402
+
+PAGE = 20
+
+
+def grow(target: int, users: int, batch: int = 50_000) -> None:
+    with database.engine.connect() as conn:
+        have = conn.execute(select(func.count()).select_from(database.conversations)).scalar()
+    while have < target:
+        n = min(batch, target - have)
+        rows = [
+            {"user_id": f"user-{(have + i) % users}", "user_message": f"question {have + i}", "reply": "answer"}
+            for i in range(n)
+        ]
+        with database.engine.begin() as conn:
+            conn.execute(insert(database.conversations), rows)
+        have += n
+
+
+def timed(fn, repeat: int):
+    out = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - start) * 1000)
+    return statistics.median(out), sorted(out)[int(len(out) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", default="100000,1000000,3000000", help="comma-separated table sizes")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{args.users} users, page size {PAGE}, median / p95 of {args.repeat} queries (ms)")
+    print(f"{'rows':>10}  {'latest page':>15}  {'deep, keyset':>15}  {'deep, offset':>15}")
+    for target in (int(s) for s in args.steps.split(",")):
+        grow(target, args.users)
+        per_user = target // args.users
+        deep_offset = max(0, per_user - 2 * PAGE)
+
+        def latest():
+            database.get_user_turns(f"user-{rng.randrange(args.users)}", PAGE)
+
+        def deep_keyset():
+            u = rng.randrange(args.users)
+            # id of that user's (deep_offset)-th most recent turn, as a client holding the cursor would have
+            before = target - (target - 1 - u) % args.users - deep_offset * args.users
+            database.get_user_turns(f"user-{u}", PAGE, before_id=before)
+
+        def deep_offset_page():
+            with database.engine.connect() as conn:
+                conn.execute(
+                    text("SELECT * FROM conversations WHERE user_id = :u ORDER BY id DESC LIMIT :n OFFSET :o"),
+                    {"u": f"user-{rng.randrange(args.users)}", "n": PAGE, "o": deep_offset},
+                ).fetchall()
+
+        cells = [timed(fn, args.repeat) for fn in (latest, deep_keyset, deep_offset_page)]
+        print(f"{target:>10}  " + "  ".join(f"{p50:>6.3f} / {p95:>6.3f}" for p50, p95 in cells))
+
+
+if __name__ == "__main__":
+    main()
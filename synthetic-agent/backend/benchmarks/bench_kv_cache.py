@@ -0,0 +1,63 @@
+"""
+Benchmark per-turn HF latency against turn number, with and without the
+per-session KV cache.
+
+    python benchmarks/bench_kv_cache.py --model gpt2 --turns 12 --new-tokens 24
+
+Both runs carry the same multi-turn context; "no cache" re-encodes the whole
+history every turn, "cache" only encodes the new user message. Sampling is
+off (greedy) so both runs generate the same replies. Needs transformers and
+torch.
+"""
+from pathlib import Path
+import argparse
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from kv_cache import SessionKVCache  # noqa: E402
+from model_registry import load_text_generation  # noqa: E402
+
+QUESTIONS = [
+    "How should I split a small tabular dataset?",
+    "Which baseline model should I start with?",
+    "How do I tune its learning rate?",
+    "What metric fits an imbalanced target?",
+    "How do I detect overfitting early?",
+    "Should I use cross-validation here?",
+]
+
+
+def run(pipe, use_cache: bool, turns: int, new_tokens: int, context: int):
+    cache = SessionKVCache(max_context_tokens=context, max_new_tokens=new_tokens, use_cache=use_cache)
+    timings = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        cache.generate(pipe, "bench", QUESTIONS[turn % len(QUESTIONS)], do_sample=False, top_p=None, top_k=None)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, cache.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="gpt2")
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--new-tokens", type=int, default=24)
+    parser.add_argument("--context", type=int, default=768, help="context token budget")
+    args = parser.parse_args()
+
+    pipe = load_text_generation(args.model)
+    run(pipe, True, 1, args.new_tokens, args.context)  # warm-up
+    without, _ = run(pipe, False, args.turns, args.new_tokens, args.context)
+    with_cache, stats = run(pipe, True, args.turns, args.new_tokens, args.context)
+
+    print(f"{args.model}, {args.new_tokens} new tokens per turn, context budget {args.context} tokens")
+    print(f"{'turn':>4}  {'no cache ms':>12}  {'cache ms':>9}")
+    for turn, (a, b) in enumerate(zip(without, with_cache), start=1):
+        print(f"{turn:>4}  {a:>12.0f}  {b:>9.0f}")
+    print(f"cache: {stats['hits']} hits, {stats['truncations']} truncations")
+
+
+if __name__ == "__main__":
+    main()
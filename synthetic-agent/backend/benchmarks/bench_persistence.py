@@ -0,0 +1,86 @@
+"""
+Benchmark reply latency and persistence throughput for synchronous vs
+write-behind turn storage on SQLite.
+
+    python benchmarks/bench_persistence.py --turns 2000 --threads 4
+
+Each turn is one AIMLAgent reply (fallback backend, so the database is the
+only cost). "sync" inserts every turn inline before the reply returns;
+"write_behind" queues it for the background batch writer. Turns/sec counts
+until every turn is durable, i.e. including the final flush.
+"""
+from pathlib import Path
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_tmp = tempfile.TemporaryDirectory()
+# database.py creates its engine at import time, so point it at a scratch file first
+os.environ["AIML_NEXUS_DB"] = f"sqlite:///{Path(_tmp.name) / 'bench.db'}"
+os.environ.pop("OPENAI_API_KEY", None)
+
+from sqlalchemy import delete, func, select  # noqa: E402
+
+import database  # noqa: E402
+from agent import AIMLAgent  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(mode: str, turns: int, threads: int):
+    with database.engine.begin() as conn:
+        conn.execute(delete(database.conversations))
+    database.PERSIST_MODE = mode
+    agent = AIMLAgent()
+    agent.backend = "fallback"
+    latencies = [[] for _ in range(threads)]
+
+    def worker(n: int):
+        for i in range(n, turns, threads):
+            start = time.perf_counter()
+            agent.respond(f"how to train model {i}", user_id=f"user-{i % 50}")
+            latencies[n].append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    replied = time.perf_counter() - start
+    database.flush_turns()
+    durable = time.perf_counter() - start
+
+    with database.engine.connect() as conn:
+        stored = conn.execute(select(func.count()).select_from(database.conversations)).scalar()
+    flat = [ms for per_thread in latencies for ms in per_thread]
+    print(
+        f"{mode:<13} {turns / durable:>9.0f} turns/s  replies in {replied:.2f}s, durable in {durable:.2f}s  "
+        f"latency p50 {statistics.median(flat):.3f} ms  p95 {percentile(flat, 95):.3f} ms  "
+        f"p99 {percentile(flat, 99):.3f} ms  stored {stored}/{turns}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=1, help="concurrent chat sessions")
+    args = parser.parse_args()
+
+    print(f"{args.turns} turns, {args.threads} thread(s), SQLite at {database.DB_URL}")
+    for mode in ("sync", "write_behind"):
+        run(mode, args.turns, args.threads)
+    database.get_writer().close()
+
+
+if __name__ == "__main__":
+    main()
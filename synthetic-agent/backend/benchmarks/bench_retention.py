@@ -0,0 +1,127 @@
+"""
+Benchmark the hot path before and after retention compaction.
+
+    python benchmarks/bench_retention.py --rows 1000000 --days 365 --retention-days 90
+
+Builds a table of turns spread evenly over `--days`, times the hot-path
+queries (a user's latest history page, the admin "last 20" view, a keyword
+search and a synchronous save_turn), archives everything older than
+`--retention-days`, and times them again next to the archive read path.
+"""
+from pathlib import Path
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_tmp = tempfile.TemporaryDirectory()
+# database.py creates its engine at import time, so point it at a scratch file first
+os.environ["AIML_NEXUS_DB"] = f"sqlite:///{Path(_tmp.name) / 'bench.db'}"
+os.environ["AIML_NEXUS_PERSIST"] = "sync"
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+import database  # noqa: E402
+import retention  # noqa: E402
+
+VOCAB = [f"word{i}" for i in range(5000)]
+
+
+def build(rows: int, users: int, days: float, batch: int = 50_000) -> float:
+    rng = random.Random(0)
+    now = time.time()
+    step = days * 86400 / rows
+    start = time.perf_counter()
+    for done in range(0, rows, batch):
+        n = min(batch, rows - done)
+        words = rng.choices(VOCAB, k=n * 20)
+        data = [
+            {
+                "user_id": f"user-{(done + i) % users}",
+                "user_message": " ".join(words[i * 20:i * 20 + 8]),
+                "reply": " ".join(words[i * 20 + 8:i * 20 + 20]),
+                "created_at": now - days * 86400 + (done + i) * step,
+            }
+            for i in range(n)
+        ]
+        with database.engine.begin() as conn:
+            conn.execute(insert(database.conversations), data)
+    return time.perf_counter() - start
+
+
+def timed(fn, repeat: int) -> float:
+    out = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - start) * 1000)
+    return statistics.median(out)
+
+
+def size_mb() -> float:
+    path = Path(database.engine.url.database)
+    return sum(p.stat().st_size for p in path.parent.glob(path.name + "*")) / 2**20
+
+
+def hot_path(users: int, repeat: int) -> dict:
+    rng = random.Random(1)
+    with database.engine.connect() as conn:
+        hot_rows = conn.execute(select(func.count()).select_from(database.conversations)).scalar()
+    return {
+        "hot rows": hot_rows,
+        "db MB": size_mb(),
+        "history page ms": timed(lambda: database.get_user_turns(f"user-{rng.randrange(users)}"), repeat),
+        "last 20 ms": timed(lambda: database.get_last_n_turns(20), repeat),
+        "search ms": timed(lambda: database.search_turns(rng.choice(VOCAB)), repeat),
+        "search+user ms": timed(lambda: database.search_turns(rng.choice(VOCAB), f"user-{rng.randrange(users)}"),
+                                repeat),
+        "save_turn ms": timed(lambda: database.save_turn("bench", "new question", "new reply"), repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=float, default=365)
+    parser.add_argument("--retention-days", type=float, default=90)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    seconds = build(args.rows, args.users, args.days)
+    print(f"{args.rows} turns over {args.days:.0f} days, {args.users} users: built in {seconds:.0f}s")
+    before = hot_path(args.users, args.repeat)
+
+    start = time.perf_counter()
+    archived = retention.archive_old_turns(args.retention_days, partial=True)
+    archive_s = time.perf_counter() - start
+    start = time.perf_counter()
+    retention.vacuum(force=True)
+    vacuum_s = time.perf_counter() - start
+    stats = retention.archive_stats()
+    print(f"archived {archived} turns into {stats['partitions']} partitions "
+          f"({stats['compressed_bytes'] / 2**20:.1f} MB compressed) in {archive_s:.0f}s, vacuum {vacuum_s:.0f}s")
+
+    after = hot_path(args.users, args.repeat)
+    print(f"{'':<16}  {'before':>10}  {'after':>10}")
+    for key in before:
+        print(f"{key:<16}  {before[key]:>10.2f}  {after[key]:>10.2f}")
+
+    # the slower path: a user's newest archived page, and a user with no archived turns (every partition is read)
+    rng = random.Random(2)
+    retention._partition_turns.cache_clear()
+    cold = timed(lambda: (retention._partition_turns.cache_clear(),
+                          retention.get_archived_turns(f"user-{rng.randrange(args.users)}")), 10)
+    cached = timed(lambda: retention.get_archived_turns(f"user-{rng.randrange(args.users)}"), 10)
+    retention._partition_turns.cache_clear()
+    missing = timed(lambda: retention.get_archived_turns("nobody"), 1)
+    print(f"archive page ms: {cold:.1f} (cold), {cached:.1f} (cached), {missing:.0f} (no archived turns)")
+
+
+if __name__ == "__main__":
+    main()
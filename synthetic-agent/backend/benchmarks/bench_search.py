@@ -0,0 +1,84 @@
+"""
+Benchmark keyword search over conversation history: FTS5 index vs LIKE scan.
+
+    python benchmarks/bench_search.py --rows 1000000 --users 1000
+
+Builds a synthetic table (messages and replies drawn from a Zipf-like
+vocabulary, indexed by the insert triggers), then times search_turns for
+rare, medium and common words, with and without a user filter, next to the
+`LIKE '%word%'` scan it replaces.
+"""
+from pathlib import Path
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_tmp = tempfile.TemporaryDirectory()
+# database.py creates its engine at import time, so point it at a scratch file first
+os.environ["AIML_NEXUS_DB"] = f"sqlite:///{Path(_tmp.name) / 'bench.db'}"
+
+from sqlalchemy import insert  # noqa: E402
+
+import database  # noqa: E402
+
+VOCAB = [f"term{i}" for i in range(20_000)]
+WEIGHTS = [1 / (i + 1) for i in range(len(VOCAB))]
+
+
+def build(rows: int, users: int, batch: int = 50_000) -> float:
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for done in range(0, rows, batch):
+        n = min(batch, rows - done)
+        words = rng.choices(VOCAB, WEIGHTS, k=n * 20)
+        data = [
+            {
+                "user_id": f"user-{(done + i) % users}",
+                "user_message": " ".join(words[i * 20:i * 20 + 8]),
+                "reply": " ".join(words[i * 20 + 8:i * 20 + 20]),
+            }
+            for i in range(n)
+        ]
+        with database.engine.begin() as conn:
+            conn.execute(insert(database.conversations), data)
+    return time.perf_counter() - start
+
+
+def timed(fn, repeat: int):
+    out = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - start) * 1000)
+    return statistics.median(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if not database.HAS_SEARCH_INDEX:
+        sys.exit("This SQLite build has no FTS5")
+    seconds = build(args.rows, args.users)
+    size_mb = Path(database.engine.url.database).stat().st_size / 2**20
+    print(f"{args.rows} turns, {args.users} users: built and indexed in {seconds:.0f}s, {size_mb:.0f} MB")
+    print(f"{'word':<12}  {'fts ms':>8}  {'fts+user ms':>11}  {'like ms':>8}  {'like+user ms':>12}")
+    for label, word in [("rare", "term19000"), ("medium", "term500"), ("common", "term3")]:
+        fts = timed(lambda: database.search_turns(word, limit=20), args.repeat)
+        fts_user = timed(lambda: database.search_turns(word, user_id="user-7", limit=20), args.repeat)
+        like = timed(lambda: database._search_like(word, None, 20), max(1, args.repeat // 5))
+        like_user = timed(lambda: database._search_like(word, "user-7", 20), max(1, args.repeat // 5))
+        print(f"{label + ' ' + word:<12}  {fts:>8.1f}  {fts_user:>11.1f}  {like:>8.1f}  {like_user:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
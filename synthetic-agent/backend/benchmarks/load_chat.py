@@ -0,0 +1,184 @@
+"""
+Load test the chat API with concurrent sessions.
+
+    python benchmarks/load_chat.py --sessions 1,8,32 --turns 10 --mock-llm-ms 300
+
+Each session sends `--turns` messages one after another to /chat/stream (or
+/chat with --no-stream), so concurrency equals the number of sessions.
+Without --url the service is started in-process on a free port against a
+scratch SQLite database. --mock-llm-ms points the OpenAI backend at a local
+mock that answers after that many milliseconds, standing in for a remote
+model; without it the instant fallback backend is measured. The mock runs
+in its own process so it does not compete with the service for the GIL.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import argparse
+import asyncio
+import atexit
+import json
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+class MockLLM(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.3
+    # headers and body go out as separate writes; without this, delayed ACKs add ~40 ms per reply
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        words = ["Start", " with", " a", " simple", " baseline", " model."]
+        if body.get("stream"):
+            # first token after half the delay, the rest spread over the other half
+            time.sleep(self.delay / 2)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for word in words:
+                self._chunk(f"data: {json.dumps({'choices': [{'delta': {'content': word}}]})}\n\n")
+                time.sleep(self.delay / 2 / len(words))
+            self._chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            time.sleep(self.delay)
+            payload = json.dumps({"choices": [{"message": {"content": "".join(words)}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    def _chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock_llm(delay_ms: float) -> str:
+    MockLLM.delay = delay_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockLLM)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def start_mock_llm_process(delay_ms: float) -> str:
+    """Serve the mock from a child process (stopped at exit); returns its base URL."""
+    proc = subprocess.Popen([sys.executable, __file__, "--serve-mock-llm", str(delay_ms)],
+                            stdout=subprocess.PIPE, text=True)
+    atexit.register(proc.terminate)
+    url = proc.stdout.readline().strip()
+    if not url:
+        raise RuntimeError(f"mock LLM exited with {proc.wait()}")
+    return url
+
+
+def start_service(workers: int) -> str:
+    import uvicorn
+
+    os.environ["CHAT_WORKERS"] = str(workers)
+    import service
+
+    port = free_port()
+    config = uvicorn.Config(service.app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+async def session(http: httpx.AsyncClient, user: str, turns: int, stream: bool, out: list) -> None:
+    for i in range(turns):
+        body = {"message": f"how to pick a model, question {i}", "user_id": user}
+        start = time.perf_counter()
+        first = None
+        if stream:
+            async with http.stream("POST", "/chat/stream", json=body) as r:
+                r.raise_for_status()
+                async for line in r.aiter_lines():
+                    if first is None and line.startswith("data:"):
+                        first = time.perf_counter() - start
+        else:
+            r = await http.post("/chat", json=body)
+            r.raise_for_status()
+        total = time.perf_counter() - start
+        out.append((total * 1000, (first if first is not None else total) * 1000))
+
+
+async def run(url: str, sessions: int, turns: int, stream: bool):
+    limits = httpx.Limits(max_connections=sessions, max_keepalive_connections=sessions)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as http:
+        results: list = []
+        start = time.perf_counter()
+        await asyncio.gather(*(session(http, f"load-{sessions}-{n}", turns, stream, results) for n in range(sessions)))
+        elapsed = time.perf_counter() - start
+    latency = sorted(r[0] for r in results)
+    ttft = sorted(r[1] for r in results)
+    p95 = lambda xs: xs[min(len(xs) - 1, int(len(xs) * 0.95))]  # noqa: E731
+    print(f"{sessions:>8}  {len(results) / elapsed:>9.1f}  {statistics.median(latency):>9.0f}  {p95(latency):>9.0f}"
+          f"  {statistics.median(ttft):>9.0f}  {p95(ttft):>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="existing chat API; default starts one in-process")
+    parser.add_argument("--sessions", default="1,8,32", help="comma-separated concurrent session counts")
+    parser.add_argument("--turns", type=int, default=10, help="messages per session")
+    parser.add_argument("--workers", type=int, default=16, help="CHAT_WORKERS for the in-process service")
+    parser.add_argument("--mock-llm-ms", type=float, help="serve the OpenAI backend from a local mock with this latency")
+    parser.add_argument("--no-stream", action="store_true", help="use POST /chat instead of /chat/stream")
+    parser.add_argument("--serve-mock-llm", type=float, metavar="MS", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_mock_llm is not None:
+        # child of start_mock_llm_process: hand back the URL, then serve until terminated
+        print(start_mock_llm(args.serve_mock_llm), flush=True)
+        threading.Event().wait()
+
+    url = args.url
+    if url is None:
+        tmp = tempfile.mkdtemp()
+        os.environ["AIML_NEXUS_DB"] = f"sqlite:///{Path(tmp) / 'load.db'}"
+        if args.mock_llm_ms is not None:
+            os.environ["OPENAI_BASE_URL"] = start_mock_llm_process(args.mock_llm_ms)
+            os.environ["OPENAI_API_KEY"] = "mock"
+            os.environ["LLM_MAX_IN_FLIGHT"] = str(max(int(s) for s in args.sessions.split(",")))
+        else:
+            os.environ.pop("OPENAI_API_KEY", None)
+        url = start_service(args.workers)
+    backend = httpx.get(f"{url}/health").json()["backend"]
+
+    print(f"{url}  backend={backend}  {args.turns} turns per session  {'/chat' if args.no_stream else '/chat/stream'}")
+    print(f"{'sessions':>8}  {'turns/s':>9}  {'p50 ms':>9}  {'p95 ms':>9}  {'ttft p50':>9}  {'ttft p95':>9}")
+    for sessions in (int(s) for s in args.sessions.split(",")):
+        asyncio.run(run(url, sessions, args.turns, not args.no_stream))
+
+
+if __name__ == "__main__":
+    main()
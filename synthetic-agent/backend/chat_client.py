@@ -0,0 +1,64 @@
+# backend/chat_client.py
+import json
+import os
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+
+# set to use the chat API (service.py) instead of an in-process agent
+CHAT_API_URL = os.getenv('CHAT_API_URL')
+
+
+class ChatAPIClient:
+    """Small sync client for service.py, used by the Streamlit UI."""
+
+    def __init__(self, base_url: str, timeout: float = 120.0):
+        self.http = httpx.Client(base_url=base_url.rstrip("/"), timeout=timeout)
+        self.last_stream_stats: Optional[Dict] = None
+
+    def respond(self, message: str, user_id: str = "anonymous") -> str:
+        response = self.http.post("/chat", json={"message": message, "user_id": user_id})
+        response.raise_for_status()
+        return response.json()["reply"]
+
+    def respond_stream(self, message: str, user_id: str = "anonymous") -> Iterator[str]:
+        with self.http.stream("POST", "/chat/stream", json={"message": message, "user_id": user_id}) as response:
+            response.raise_for_status()
+            for event, data in _sse(response.iter_lines()):
+                if event == "error":
+                    raise RuntimeError(data["error"])
+                if event == "done":
+                    self.last_stream_stats = {"ttft_ms": data["ttft_ms"], "total_ms": data["total_ms"]}
+                    return
+                yield data["delta"]
+
+    def history(self, user_id: str, limit: int = 20, before_id: Optional[int] = None) -> List[SimpleNamespace]:
+        """Same page as database.get_user_turns, as objects with the Turn fields."""
+        params = {"limit": limit}
+        if before_id is not None:
+            params["before_id"] = before_id
+        # ids may contain "/", "?" or "#": escape them all so they stay one path segment
+        response = self.http.get(f"/history/{quote(user_id, safe='')}", params=params)
+        response.raise_for_status()
+        return [SimpleNamespace(**t) for t in response.json()["turns"]]
+
+    def search(self, query: str, user_id: Optional[str] = None, limit: int = 20) -> List[SimpleNamespace]:
+        """Same hits as database.search_turns."""
+        params = {"q": query, "limit": limit}
+        if user_id is not None:
+            params["user_id"] = user_id
+        response = self.http.get("/search", params=params)
+        response.raise_for_status()
+        return [SimpleNamespace(**h) for h in response.json()]
+
+
+def _sse(lines: Iterator[str]) -> Iterator[Tuple[Optional[str], Dict]]:
+    event = None
+    for line in lines:
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            yield event, json.loads(line[len("data:"):])
+            event = None
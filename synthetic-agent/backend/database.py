@@ -1,12 +1,47 @@
 # backend/database.py
+import atexit
+import logging
 import os
-from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, Text, select
+import re
+import threading
+import time
+from sqlalchemy import (create_engine, event, inspect, MetaData, Table, Column, Index, Float, Integer, LargeBinary,
+                        String, Text, func, or_, select, text)
 from sqlalchemy.sql import insert
 from dataclasses import dataclass
+from typing import List, Optional
+
+from write_behind import WriteBehindWriter
+
+logger = logging.getLogger(__name__)
 
 DB_URL = os.getenv('AIML_NEXUS_DB', 'sqlite:///./aiml_nexus.db')
+# "write_behind" queues turns for a background batch writer; "sync" inserts inline
+PERSIST_MODE = os.getenv('AIML_NEXUS_PERSIST', 'write_behind')
+WRITE_BATCH_SIZE = int(os.getenv('AIML_NEXUS_WRITE_BATCH', '100'))
+WRITE_FLUSH_INTERVAL = float(os.getenv('AIML_NEXUS_WRITE_INTERVAL', '0.2'))
+WRITE_MAX_BUFFER = int(os.getenv('AIML_NEXUS_WRITE_BUFFER', '10000'))
+# NORMAL is durable under WAL except for the last commits on power loss; FULL syncs every commit
+SQLITE_SYNCHRONOUS = os.getenv('AIML_NEXUS_SQLITE_SYNC', 'NORMAL')
+# search ranks only this many of the newest matches, so common words stay cheap
+SEARCH_CANDIDATES = int(os.getenv('AIML_NEXUS_SEARCH_CANDIDATES', '2000'))
+# a shorter last word only matches whole words unless it ends in "*": short prefixes expand to most of the index
+SEARCH_PREFIX_MIN_CHARS = int(os.getenv('AIML_NEXUS_SEARCH_PREFIX_MIN', '3'))
+
+IS_SQLITE = DB_URL.startswith('sqlite')
+
+engine = create_engine(DB_URL, connect_args={"check_same_thread": False} if IS_SQLITE else {})
+
+if IS_SQLITE and ':memory:' not in DB_URL:
+    @event.listens_for(engine, "connect")
+    def _tune_sqlite(dbapi_conn, _record):
+        # WAL lets the history reads run alongside the background writer
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cur.execute("PRAGMA busy_timeout=5000")
+        cur.close()
 
-engine = create_engine(DB_URL, connect_args={"check_same_thread": False})
 metadata = MetaData()
 
 conversations = Table(
@@ -16,15 +51,123 @@ conversations = Table(
     Column('user_id', String(128)),
     Column('user_message', Text),
     Column('reply', Text),
+    # epoch seconds; retention.py archives turns by age
+    Column('created_at', Float, default=time.time),
+)
+
+# cold storage for turns past the retention age: each row is one partition of
+# consecutive turns as compressed JSONL (written and read by retention.py)
+conversation_archive = Table(
+    'conversation_archive',
+    metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('min_id', Integer, nullable=False),
+    Column('max_id', Integer, nullable=False),
+    Column('min_created_at', Float),
+    Column('max_created_at', Float),
+    Column('turns', Integer, nullable=False),
+    Column('codec', String(16), nullable=False),
+    Column('data', LargeBinary, nullable=False),
 )
 
+# which partitions hold a user's turns, so archive reads only decompress those
+conversation_archive_users = Table(
+    'conversation_archive_users',
+    metadata,
+    Column('user_id', String(128), primary_key=True),
+    Column('partition_id', Integer, primary_key=True),
+)
+
+# per-user history is "WHERE user_id = ? AND id < ? ORDER BY id DESC": one index range scan
+user_history_index = Index('ix_conversations_user_id_id', conversations.c.user_id, conversations.c.id)
+
+# Full-text search over both sides of a turn. An external-content FTS5 table
+# stores only the index; triggers keep it in step with every insert
+# (save_turn and the write-behind batches alike), update and delete.
+SEARCH_INDEX_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+        user_message, reply, content='conversations', content_rowid='id', tokenize='porter unicode61')""",
+    """CREATE TRIGGER IF NOT EXISTS conversations_fts_ai AFTER INSERT ON conversations BEGIN
+        INSERT INTO conversations_fts(rowid, user_message, reply) VALUES (new.id, new.user_message, new.reply);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS conversations_fts_ad AFTER DELETE ON conversations BEGIN
+        INSERT INTO conversations_fts(conversations_fts, rowid, user_message, reply)
+        VALUES ('delete', old.id, old.user_message, old.reply);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS conversations_fts_au AFTER UPDATE ON conversations BEGIN
+        INSERT INTO conversations_fts(conversations_fts, rowid, user_message, reply)
+        VALUES ('delete', old.id, old.user_message, old.reply);
+        INSERT INTO conversations_fts(rowid, user_message, reply) VALUES (new.id, new.user_message, new.reply);
+    END""",
+]
+
+def create_search_index(bind) -> bool:
+    """Create the FTS5 index and its triggers; False where FTS5 is unavailable (search falls back to LIKE)."""
+    if bind.dialect.name != 'sqlite':
+        logger.info("Full-text search needs SQLite; %s search uses LIKE.", bind.dialect.name)
+        return False
+    try:
+        with bind.begin() as conn:
+            for ddl in SEARCH_INDEX_DDL:
+                conn.exec_driver_sql(ddl)
+        return True
+    except Exception as e:
+        logger.warning("Could not create the FTS5 search index (%s); search falls back to LIKE.", e)
+        return False
+
+def _add_created_at(bind) -> None:
+    # databases from before retention: their turns count as written now, so none is archived early
+    if 'created_at' not in {c['name'] for c in inspect(bind).get_columns('conversations')}:
+        with bind.begin() as conn:
+            conn.exec_driver_sql(f"ALTER TABLE conversations ADD COLUMN created_at FLOAT DEFAULT {time.time()}")
+
 metadata.create_all(engine)
+# create_all skips tables that already exist, so add the column and index to older databases explicitly
+_add_created_at(engine)
+user_history_index.create(engine, checkfirst=True)
+HAS_SEARCH_INDEX = create_search_index(engine)
 
 def save_turn(user_id: str, user_message: str, reply: str):
-    with engine.connect() as conn:
+    with engine.begin() as conn:
         stmt = insert(conversations).values(user_id=user_id, user_message=user_message, reply=reply)
         conn.execute(stmt)
 
+_writer: Optional[WriteBehindWriter] = None
+_writer_lock = threading.Lock()
+
+def get_writer() -> WriteBehindWriter:
+    """One background writer per process, started on first use and drained at exit."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehindWriter(
+                engine, conversations,
+                batch_size=WRITE_BATCH_SIZE,
+                flush_interval=WRITE_FLUSH_INTERVAL,
+                max_buffer=WRITE_MAX_BUFFER,
+            )
+            atexit.register(_writer.close)
+        return _writer
+
+def record_turn(user_id: str, user_message: str, reply: str) -> bool:
+    """Persist a turn in the configured mode; returns False if it was dropped."""
+    if PERSIST_MODE == 'sync':
+        save_turn(user_id, user_message, reply)
+        return True
+    return get_writer().submit(user_id, user_message, reply)
+
+def flush_turns(timeout: Optional[float] = None) -> bool:
+    """Wait for queued turns to reach the database (no-op in sync mode)."""
+    if _writer is None:
+        return True
+    return _writer.flush(timeout)
+
+def flush_user_turns(user_id: str, timeout: Optional[float] = None) -> bool:
+    """Wait for one user's queued turns only; other users' backlog is not waited on."""
+    if _writer is None:
+        return True
+    return _writer.flush_user(user_id, timeout)
+
 @dataclass
 class Turn:
     id: int
@@ -32,10 +175,109 @@ class Turn:
     user_message: str
     reply: str
 
-def get_last_n_turns(n: int = 20):
+def _fetch_turns(stmt, user_id: Optional[str] = None) -> List[Turn]:
+    # read-your-writes for the user being read; turns of other users still in the
+    # write-behind queue show up within WRITE_FLUSH_INTERVAL
+    if user_id is not None:
+        flush_user_turns(user_id, timeout=2.0)
     with engine.connect() as conn:
-        stmt = select(conversations).order_by(conversations.c.id.desc()).limit(n)
         res = conn.execute(stmt).fetchall()
         # map to dataclass and reverse so oldest-first
         turns = [Turn(id=r.id, user_id=r.user_id, user_message=r.user_message, reply=r.reply) for r in res]
-        return list(reversed(turns))
\ No newline at end of file
+        return list(reversed(turns))
+
+def get_last_n_turns(n: int = 20):
+    """Last n turns across all users (admin view); use get_user_turns for a conversation."""
+    stmt = select(conversations).order_by(conversations.c.id.desc()).limit(n)
+    return _fetch_turns(stmt)
+
+def get_user_turns(user_id: str, limit: int = 20, before_id: Optional[int] = None) -> List[Turn]:
+    """
+    A page of one user's history, oldest-first. Pass the first turn's id of the
+    current page as `before_id` to get the page before it (keyset pagination:
+    the cost is the page size, not the offset or the table size).
+    """
+    stmt = select(conversations).where(conversations.c.user_id == user_id)
+    if before_id is not None:
+        stmt = stmt.where(conversations.c.id < before_id)
+    stmt = stmt.order_by(conversations.c.id.desc()).limit(limit)
+    return _fetch_turns(stmt, user_id)
+
+@dataclass
+class SearchHit(Turn):
+    rank: float = 0.0
+    # matching part of the turn with the hits in [brackets]
+    snippet: str = ''
+
+def _fts_query(query: str) -> Optional[str]:
+    """
+    Free text to an FTS5 query: every word must match. The last one also
+    matches as a prefix if it ends in "*" or has SEARCH_PREFIX_MIN_CHARS characters.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    prefix = query.rstrip().endswith("*") or len(words[-1]) >= SEARCH_PREFIX_MIN_CHARS
+    return " ".join(f'"{w}"' for w in words) + ("*" if prefix else "")
+
+def search_turns(query: str, user_id: Optional[str] = None, limit: int = 20) -> List[SearchHit]:
+    """
+    Turns matching `query` in the message or the reply, best match first.
+    Only the newest SEARCH_CANDIDATES matches (of the user's turns, with a
+    user filter) are ranked: bm25 over every turn containing a common word
+    costs seconds.
+    """
+    if user_id is not None:
+        flush_user_turns(user_id, timeout=2.0)
+    if not HAS_SEARCH_INDEX:
+        return _search_like(query, user_id, limit)
+    match = _fts_query(query)
+    if match is None:
+        return []
+    sql = """
+        SELECT c.id, c.user_id, c.user_message, c.reply,
+               bm25(conversations_fts) AS rank,
+               snippet(conversations_fts, -1, '[', ']', '…', 12) AS snippet
+        FROM conversations_fts JOIN conversations c ON c.id = conversations_fts.rowid
+        WHERE conversations_fts MATCH :match AND conversations_fts.rowid >= :cutoff {user_filter}
+        ORDER BY rank LIMIT :limit
+    """.format(user_filter="AND c.user_id = :user_id" if user_id is not None else "")
+    # walking the doclist newest-first is cheap; scoring it is not
+    cutoff_sql = """
+        SELECT conversations_fts.rowid FROM conversations_fts {user_join}
+        WHERE conversations_fts MATCH :match {user_filter}
+        ORDER BY conversations_fts.rowid DESC LIMIT 1 OFFSET :candidates
+    """.format(
+        user_join="JOIN conversations c ON c.id = conversations_fts.rowid" if user_id is not None else "",
+        user_filter="AND c.user_id = :user_id" if user_id is not None else "",
+    )
+    with engine.connect() as conn:
+        cutoff = conn.execute(text(cutoff_sql), {"match": match, "user_id": user_id,
+                                                 "candidates": SEARCH_CANDIDATES - 1}).scalar()
+        params = {"match": match, "user_id": user_id, "limit": limit, "cutoff": cutoff or 0}
+        rows = conn.execute(text(sql), params).fetchall()
+    return [SearchHit(id=r.id, user_id=r.user_id, user_message=r.user_message, reply=r.reply,
+                      rank=r.rank, snippet=r.snippet) for r in rows]
+
+def _search_like(query: str, user_id: Optional[str], limit: int) -> List[SearchHit]:
+    # no full-text index (non-SQLite database): substring scan, newest first
+    pattern = f"%{query.strip()}%"
+    stmt = select(conversations).where(
+        or_(conversations.c.user_message.ilike(pattern), conversations.c.reply.ilike(pattern))
+    )
+    if user_id is not None:
+        stmt = stmt.where(conversations.c.user_id == user_id)
+    stmt = stmt.order_by(conversations.c.id.desc()).limit(limit)
+    with engine.connect() as conn:
+        rows = conn.execute(stmt).fetchall()
+    return [SearchHit(id=r.id, user_id=r.user_id, user_message=r.user_message, reply=r.reply,
+                      snippet=r.user_message) for r in rows]
+
+def backfill_search_index() -> int:
+    """Rebuild the full-text index from the conversations table (rows written before it existed)."""
+    if not HAS_SEARCH_INDEX:
+        raise RuntimeError("Full-text search needs SQLite with FTS5")
+    flush_turns()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO conversations_fts(conversations_fts) VALUES ('rebuild')")
+        return conn.execute(select(func.count()).select_from(conversations)).scalar()
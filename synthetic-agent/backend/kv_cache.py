@@ -0,0 +1,172 @@
+# backend/kv_cache.py
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_SESSIONS = int(os.getenv('HF_KV_SESSIONS', '8'))
+# prompt + history budget; gpt2's window is 1024 tokens, leaving room for the reply
+MAX_CONTEXT_TOKENS = int(os.getenv('HF_CONTEXT_TOKENS', '768'))
+MAX_NEW_TOKENS = int(os.getenv('HF_MAX_NEW_TOKENS', '128'))
+
+HEADER = "You are AIML Nexus, an assistant for AIML research and development."
+USER_MARK = "\nUser:"
+
+
+class _Session:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids: List[int] = []
+        self.past: Any = None
+        self.turns: List[Tuple[str, str]] = []
+
+
+class SessionKVCache:
+    """
+    Multi-turn HF generation that keeps each session's token ids and the
+    model's past key/values between turns, so a follow-up only runs the
+    forward pass over the new tokens.
+
+      - At most `max_sessions` sessions keep their cache (least recently
+        used ones are dropped and start over with an empty context).
+      - When history + new turn + reply would exceed `max_context_tokens`,
+        the oldest turns are dropped and the cache is rebuilt from the rest.
+      - `use_cache=False` keeps the same context but recomputes it every turn
+        (the baseline the benchmark compares against).
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, max_context_tokens: int = MAX_CONTEXT_TOKENS,
+                 max_new_tokens: int = MAX_NEW_TOKENS, use_cache: bool = True):
+        self.max_sessions = max_sessions
+        self.max_context_tokens = max_context_tokens
+        self.max_new_tokens = max_new_tokens
+        self.use_cache = use_cache
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.evictions = 0
+        self.truncations = 0
+
+    def _checkout(self, key: str) -> _Session:
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = _Session()
+                while len(self._sessions) > max(1, self.max_sessions):
+                    self._sessions.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._sessions.move_to_end(key)
+            return session
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def _fit_budget(self, session: _Session, tokenizer, new_ids: List[int]) -> List[int]:
+        """Drop the oldest turns until history + new turn + reply fit; returns the new turn's ids."""
+        if len(session.ids) + len(new_ids) + self.max_new_tokens <= self.max_context_tokens:
+            return new_ids
+        self.truncations += 1
+        session.past = None
+        logger.debug("Session over %d tokens; dropping its oldest turns.", self.max_context_tokens)
+        while True:
+            history = HEADER + "".join(f"{USER_MARK} {u}\nAIML Nexus: {r}" for u, r in session.turns)
+            session.ids = tokenizer.encode(history)
+            if not session.turns or len(session.ids) + len(new_ids) + self.max_new_tokens <= self.max_context_tokens:
+                break
+            session.turns.pop(0)
+        # a single message longer than the budget keeps its most recent tokens
+        room = self.max_context_tokens - self.max_new_tokens - len(session.ids)
+        return new_ids[-max(1, room):]
+
+    def generate(self, pipe, key: str, message: str, streamer=None, **gen_kwargs) -> str:
+        """One turn for session `key` with `pipe`'s model and tokenizer; returns the reply text."""
+        tokenizer = pipe.tokenizer
+        session = self._checkout(key)
+        with session.lock:
+            prefix = "" if session.ids else HEADER
+            new_ids = self._fit_budget(session, tokenizer, tokenizer.encode(f"{prefix}{USER_MARK} {message}\nAIML Nexus:"))
+            input_ids = session.ids + new_ids
+            past = session.past if self.use_cache else None
+            if past is not None:
+                self.hits += 1
+            seq, past = self._decode(pipe, input_ids, past, streamer, **gen_kwargs)
+
+            reply_ids = seq[len(input_ids):]
+            reply = tokenizer.decode(reply_ids, skip_special_tokens=True)
+            if USER_MARK in reply:
+                # the model started writing the next user line: keep the tokens before it
+                cut = len(reply.split(USER_MARK, 1)[0])
+                keep = 0
+                while keep < len(reply_ids) and len(tokenizer.decode(reply_ids[:keep + 1], skip_special_tokens=True)) <= cut:
+                    keep += 1
+                reply = tokenizer.decode(reply_ids[:keep], skip_special_tokens=True)
+                seq = input_ids + reply_ids[:keep]
+                past = self._crop(past, len(seq))
+            session.ids = seq
+            session.past = past if self.use_cache else None
+            session.turns.append((message, reply.strip()))
+            return reply.strip()
+
+    @staticmethod
+    def _crop(past, length: int):
+        # DynamicCache can be cut back to a prefix; anything else is rebuilt next turn
+        if past is not None and hasattr(past, "crop"):
+            past.crop(length)
+            return past
+        return None
+
+    @staticmethod
+    def _stop_kwargs(pipe) -> Dict[str, Any]:
+        """stop_strings for generate() where supported (transformers >= 4.39)."""
+        if hasattr(getattr(pipe.model, "generation_config", None), "stop_strings"):
+            return {"stop_strings": [USER_MARK], "tokenizer": pipe.tokenizer}
+        # older versions reject the argument; they run on to max_new_tokens and generate() cuts the reply at USER_MARK
+        return {}
+
+    def _decode(self, pipe, input_ids: List[int], past, streamer=None, **gen_kwargs) -> Tuple[List[int], Any]:
+        """Run model.generate over the uncached suffix; returns all token ids and the updated cache."""
+        import torch
+
+        tokenizer = pipe.tokenizer
+        ids = torch.tensor([input_ids], device=pipe.model.device)
+        kwargs = dict(do_sample=True, top_p=0.95, top_k=50, **self._stop_kwargs(pipe))
+        kwargs.update(gen_kwargs)
+        with torch.no_grad():
+            out = pipe.model.generate(
+                ids,
+                attention_mask=torch.ones_like(ids),
+                past_key_values=past,
+                max_new_tokens=self.max_new_tokens,
+                pad_token_id=tokenizer.eos_token_id,
+                streamer=streamer,
+                use_cache=True,
+                return_dict_in_generate=True,
+                **kwargs,
+            )
+        return out.sequences[0].tolist(), out.past_key_values
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "hits": self.hits,
+                "evictions": self.evictions,
+                "truncations": self.truncations,
+            }
+
+
+_cache: Optional[SessionKVCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_session_cache() -> SessionKVCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SessionKVCache()
+        return _cache
@@ -0,0 +1,355 @@
+# backend/llm_client.py
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '30'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))
+LLM_MAX_IN_FLIGHT = int(os.getenv('LLM_MAX_IN_FLIGHT', '16'))
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '5'))
+LLM_BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', '30'))
+
+# rate limits and server-side errors are worth retrying; other 4xx are our fault
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """The remote model could not produce a reply."""
+
+
+class CircuitOpenError(LLMError):
+    """The circuit breaker is open: calls fail fast until the reset timeout passes."""
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failed calls;
+    open -> half-open after `reset_timeout` seconds, letting one trial call
+    through; the trial's outcome closes or re-opens the circuit.
+
+    allow() hands out a ticket that the call passes back to record_success,
+    record_failure and release. Only the trial's own ticket can close,
+    re-open or free the half-open slot: a call admitted while the circuit
+    was still closed may finish after it opened, and its late outcome must
+    not be taken for the trial's.
+    """
+
+    # ticket of a call admitted while the circuit was closed
+    CALL = "call"
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_timeout: float = LLM_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        # ticket of the half-open trial in flight, if any
+        self._trial: Optional[object] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> Optional[object]:
+        """A ticket for this call, or None if it must fail fast."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return self.CALL
+            if state == "half_open" and self._trial is None:
+                self._trial = object()
+                return self._trial
+            return None
+
+    def record_success(self, ticket: object = CALL) -> None:
+        with self._lock:
+            if ticket is self.CALL:
+                if self.opened_at is None:
+                    self.failures = 0
+                return
+            if ticket is not self._trial:
+                return
+            logger.info("LLM circuit closed.")
+            self.failures = 0
+            self.opened_at = None
+            self._trial = None
+
+    def release(self, ticket: object = CALL) -> None:
+        """Give back a half-open trial that ended without an outcome (e.g. cancelled)."""
+        with self._lock:
+            if ticket is self._trial:
+                self._trial = None
+
+    def record_failure(self, ticket: object = CALL) -> None:
+        with self._lock:
+            self.failures += 1
+            if ticket is self.CALL:
+                # already open: a late failure neither extends the open period nor ends the trial
+                if self.opened_at is None and self.failures >= self.failure_threshold:
+                    logger.warning("LLM circuit open after %d failures; using fallback for %.0fs.",
+                                   self.failures, self.reset_timeout)
+                    self.opened_at = time.monotonic()
+                return
+            if ticket is not self._trial:
+                return
+            logger.warning("LLM circuit re-opened: trial call failed; using fallback for %.0fs.", self.reset_timeout)
+            self.opened_at = time.monotonic()
+            self._trial = None
+
+
+class AsyncLLMClient:
+    """
+    OpenAI-compatible chat client over one pooled keep-alive httpx client.
+
+      - every attempt has `timeout` seconds; timeouts, transport errors and
+        RETRYABLE_STATUS responses are retried up to `max_retries` times with
+        full-jitter exponential backoff (honouring Retry-After)
+      - at most `max_in_flight` requests are outstanding across all callers
+      - calls that still fail feed the circuit breaker, which then fails
+        fast with CircuitOpenError until the remote recovers
+    """
+
+    def __init__(self, base_url: str = OPENAI_BASE_URL, api_key: Optional[str] = None,
+                 model: str = OPENAI_MODEL, timeout: float = LLM_TIMEOUT,
+                 max_retries: int = LLM_MAX_RETRIES, max_in_flight: int = LLM_MAX_IN_FLIGHT,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY", "")
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_in_flight = max_in_flight
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.requests = 0
+        self.retries = 0
+
+    def _http(self) -> httpx.AsyncClient:
+        # created lazily so the pool and semaphore belong to the loop that uses them
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+                limits=httpx.Limits(max_connections=self.max_in_flight,
+                                    max_keepalive_connections=self.max_in_flight,
+                                    keepalive_expiry=30.0),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _payload(self, messages: List[Dict[str, str]], stream: bool, **params) -> Dict:
+        payload = {"model": self.model, "messages": messages, "stream": stream}
+        payload.update(params)
+        return payload
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = None
+        if isinstance(error, _RetryableStatus):
+            retry_after = error.response.headers.get("retry-after")
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), self.backoff_max)
+        except ValueError:
+            pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _with_retries(self, attempt_fn):
+        ticket = self.breaker.allow()
+        if ticket is None:
+            raise CircuitOpenError("LLM circuit is open")
+        try:
+            client = self._http()
+            last_error: Optional[Exception] = None
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    self.retries += 1
+                    await asyncio.sleep(self._backoff(attempt - 1, last_error))
+                try:
+                    async with self._semaphore:
+                        self.requests += 1
+                        result = await attempt_fn(client)
+                    self.breaker.record_success(ticket)
+                    return result
+                except (httpx.TimeoutException, httpx.TransportError, _RetryableStatus) as e:
+                    last_error = e
+                    logger.debug("LLM attempt %d failed: %r", attempt + 1, e)
+                except httpx.HTTPStatusError as e:
+                    # not an outage (bad request, auth): do not retry or trip the breaker
+                    self.breaker.record_success(ticket)
+                    raise LLMError(f"LLM request rejected: HTTP {e.response.status_code}") from e
+                except (KeyError, IndexError, ValueError) as e:
+                    self.breaker.record_failure(ticket)
+                    raise LLMError(f"Malformed LLM response: {e!r}") from e
+            self.breaker.record_failure(ticket)
+            raise LLMError(f"LLM request failed after {self.max_retries + 1} attempts: {last_error!r}") from last_error
+        finally:
+            self.breaker.release(ticket)
+
+    @staticmethod
+    def _check(response: httpx.Response) -> None:
+        if response.status_code in RETRYABLE_STATUS:
+            raise _RetryableStatus(response)
+        response.raise_for_status()
+
+    async def chat(self, messages: List[Dict[str, str]], **params) -> str:
+        async def attempt(client: httpx.AsyncClient) -> str:
+            response = await client.post("/chat/completions", json=self._payload(messages, False, **params))
+            self._check(response)
+            return response.json()["choices"][0]["message"]["content"].strip()
+
+        return await self._with_retries(attempt)
+
+    async def chat_stream(self, messages: List[Dict[str, str]], **params) -> AsyncIterator[str]:
+        """Yield content deltas; retries only cover failures before the first delta."""
+        ticket = self.breaker.allow()
+        if ticket is None:
+            raise CircuitOpenError("LLM circuit is open")
+        try:
+            client = self._http()
+            started = False
+            last_error: Optional[Exception] = None
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    self.retries += 1
+                    await asyncio.sleep(self._backoff(attempt - 1, last_error))
+                try:
+                    async with self._semaphore:
+                        self.requests += 1
+                        async with client.stream("POST", "/chat/completions",
+                                                 json=self._payload(messages, True, **params)) as response:
+                            if response.status_code >= 400:
+                                await response.aread()
+                            self._check(response)
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[len("data:"):].strip()
+                                if data == "[DONE]":
+                                    # read to the end of the body so the connection goes back to the pool
+                                    continue
+                                text = json.loads(data)["choices"][0]["delta"].get("content")
+                                if text:
+                                    started = True
+                                    yield text
+                    self.breaker.record_success(ticket)
+                    return
+                except (httpx.TimeoutException, httpx.TransportError, _RetryableStatus) as e:
+                    last_error = e
+                    if started:
+                        # the reader already has part of the reply; restarting would duplicate it
+                        self.breaker.record_failure(ticket)
+                        raise LLMError(f"LLM stream broke mid-reply: {e!r}") from e
+                except httpx.HTTPStatusError as e:
+                    self.breaker.record_success(ticket)
+                    raise LLMError(f"LLM request rejected: HTTP {e.response.status_code}") from e
+                except (KeyError, IndexError, ValueError) as e:
+                    self.breaker.record_failure(ticket)
+                    raise LLMError(f"Malformed LLM stream: {e!r}") from e
+            self.breaker.record_failure(ticket)
+            raise LLMError(f"LLM stream failed after {self.max_retries + 1} attempts: {last_error!r}") from last_error
+        finally:
+            self.breaker.release(ticket)
+
+    def stats(self) -> Dict:
+        return {"requests": self.requests, "retries": self.retries,
+                "circuit": self.breaker.state, "consecutive_failures": self.breaker.failures}
+
+
+class _LoopThread:
+    """A private event loop on a daemon thread, so sync callers (Streamlit) share one connection pool."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-client-loop", daemon=True)
+        self.thread.start()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def iterate(self, agen: AsyncIterator[str]) -> Iterator[str]:
+        items: "queue.Queue" = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    items.put(item)
+            except BaseException as e:
+                items.put(e)
+            finally:
+                items.put(done)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            while True:
+                item = items.get()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+
+_client: Optional[AsyncLLMClient] = None
+_loop: Optional[_LoopThread] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> AsyncLLMClient:
+    """The process-wide client. Its pool lives on its own loop thread; use the helpers below to call it."""
+    global _client, _loop
+    with _client_lock:
+        if _client is None:
+            _client = AsyncLLMClient()
+            _loop = _LoopThread()
+        return _client
+
+
+def chat_sync(messages: List[Dict[str, str]], **params) -> str:
+    client = get_llm_client()
+    return _loop.run(client.chat(messages, **params))
+
+
+async def achat(messages: List[Dict[str, str]], **params) -> str:
+    """chat() awaitable from any event loop (the request runs on the client's loop)."""
+    client = get_llm_client()
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.chat(messages, **params), _loop.loop))
+
+
+def chat_stream_sync(messages: List[Dict[str, str]], **params) -> Iterator[str]:
+    client = get_llm_client()
+    return _loop.iterate(client.chat_stream(messages, **params))
@@ -0,0 +1,49 @@
+# backend/manage.py
+"""
+Maintenance commands for the conversation database (AIML_NEXUS_DB).
+
+    python backend/manage.py backfill-search    # index turns written before full-text search existed
+    python backend/manage.py compact            # archive turns past the retention age, vacuum if worthwhile
+"""
+import argparse
+import time
+
+import database
+import retention
+
+
+def backfill_search(args) -> None:
+    start = time.perf_counter()
+    rows = database.backfill_search_index()
+    print(f"Indexed {rows} turns in {time.perf_counter() - start:.1f}s")
+
+
+def compact(args) -> None:
+    before = retention.archive_stats()
+    result = retention.compact(args.days, partial=args.all)
+    if args.vacuum and not result["vacuumed"]:
+        result["vacuumed"] = retention.vacuum(force=True)
+    after = retention.archive_stats()
+    print(f"Archived {result['archived']} turns in {after['partitions'] - before['partitions']} partitions "
+          f"({result['seconds']:.1f}s, vacuum: {result['vacuumed']}); "
+          f"archive holds {after['turns']} turns in {after['compressed_bytes'] / 2**20:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("backfill-search", help="rebuild the full-text index from all stored turns").set_defaults(
+        func=backfill_search
+    )
+    compact_parser = commands.add_parser("compact", help="move old turns into compressed archive partitions")
+    compact_parser.add_argument("--days", type=float, default=retention.RETENTION_DAYS,
+                                help="archive turns older than this (default: AIML_NEXUS_RETENTION_DAYS)")
+    compact_parser.add_argument("--all", action="store_true", help="also write a final partial partition")
+    compact_parser.add_argument("--vacuum", action="store_true", help="vacuum even if little space was freed")
+    compact_parser.set_defaults(func=compact)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# backend/model_registry.py
+import gc
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 0 means no limit; the most recently used model is always kept, even if it alone exceeds the cap
+MODEL_MEMORY_MB = float(os.getenv('HF_MODEL_MEMORY_MB', '0'))
+MAX_MODELS = int(os.getenv('HF_MAX_MODELS', '0'))
+
+
+def load_text_generation(model_name: str):
+    from transformers import pipeline
+    return pipeline("text-generation", model=model_name, device=-1)
+
+
+def model_bytes(pipe) -> int:
+    """Parameter + buffer bytes of a transformers pipeline's model (0 if unknown)."""
+    model = getattr(pipe, "model", None)
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+    except Exception:
+        return 0
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class _Entry:
+    def __init__(self, model: Any, nbytes: int, load_seconds: float):
+        self.model = model
+        self.nbytes = nbytes
+        self.load_seconds = load_seconds
+        self.hits = 0
+        self.last_used = time.time()
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded generation pipelines, keyed by model name.
+
+      - Each model is loaded once and shared by every session and agent.
+      - Concurrent first requests for the same model wait for one load;
+        different models load in parallel.
+      - When `max_bytes` or `max_models` is exceeded, least recently used
+        models are unloaded. A caller still generating with an unloaded
+        model keeps its reference until it finishes.
+    """
+
+    def __init__(self, loader: Callable[[str], Any] = load_text_generation,
+                 max_bytes: int = 0, max_models: int = 0,
+                 sizer: Callable[[Any], int] = model_bytes):
+        self.loader = loader
+        self.sizer = sizer
+        self.max_bytes = max_bytes
+        self.max_models = max_models
+        self._models: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, model_name: str):
+        entry = self._lookup(model_name)
+        if entry is not None:
+            return entry.model
+        with self._lock:
+            load_lock = self._loading.setdefault(model_name, threading.Lock())
+        with load_lock:
+            # another session may have finished loading while we waited
+            entry = self._lookup(model_name)
+            if entry is not None:
+                return entry.model
+            start = time.perf_counter()
+            model = self.loader(model_name)
+            entry = _Entry(model, self.sizer(model), time.perf_counter() - start)
+            entry.hits = 1
+            with self._lock:
+                self._models[model_name] = entry
+                self.loads += 1
+                self._evict()
+                self._loading.pop(model_name, None)
+            logger.info("Loaded model %s in %.1fs (%.0f MB); registry holds %.0f MB in %d model(s).",
+                        model_name, entry.load_seconds, entry.nbytes / 2**20,
+                        self.total_bytes() / 2**20, len(self._models))
+            return model
+
+    def _lookup(self, model_name: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._models.get(model_name)
+            if entry is not None:
+                self._models.move_to_end(model_name)
+                entry.hits += 1
+                entry.last_used = time.time()
+            return entry
+
+    def _over_limit(self) -> bool:
+        if self.max_models and len(self._models) > self.max_models:
+            return True
+        return bool(self.max_bytes) and sum(e.nbytes for e in self._models.values()) > self.max_bytes
+
+    def _evict(self) -> None:
+        # caller holds self._lock
+        evicted = False
+        while len(self._models) > 1 and self._over_limit():
+            name, entry = self._models.popitem(last=False)
+            self.evictions += 1
+            evicted = True
+            logger.info("Unloaded model %s (%.0f MB, %d uses).", name, entry.nbytes / 2**20, entry.hits)
+        if evicted:
+            gc.collect()
+
+    def unload(self, model_name: str) -> bool:
+        with self._lock:
+            entry = self._models.pop(model_name, None)
+        if entry is None:
+            return False
+        gc.collect()
+        return True
+
+    def total_bytes(self) -> int:
+        return sum(e.nbytes for e in list(self._models.values()))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = [
+                {"name": name, "mb": e.nbytes / 2**20, "hits": e.hits, "load_seconds": e.load_seconds}
+                for name, e in reversed(self._models.items())
+            ]
+        return {
+            "models": models,
+            "total_mb": sum(m["mb"] for m in models),
+            "cap_mb": self.max_bytes / 2**20 if self.max_bytes else None,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """The process-wide registry, configured from HF_MODEL_MEMORY_MB / HF_MAX_MODELS."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry(max_bytes=int(MODEL_MEMORY_MB * 2**20), max_models=MAX_MODELS)
+        return _registry
@@ -0,0 +1,215 @@
+# backend/retention.py
+"""
+Retention for the conversations table. Turns older than AIML_NEXUS_RETENTION_DAYS
+move into compressed archive partitions, so the hot table (and its search
+index) only holds recent history.
+
+  - A partition is one `conversation_archive` row: up to
+    AIML_NEXUS_ARCHIVE_PARTITION consecutive turns as zstd-compressed JSONL
+    (zlib when zstandard is not installed). It is written and its turns are
+    deleted from the hot table in the same transaction.
+  - compact() archives, then VACUUMs once enough of the file is free pages;
+    start_compactor() runs it periodically.
+  - get_archived_turns() is the slower read path: it decompresses the user's
+    partitions newest-first until it has a page.
+"""
+from functools import lru_cache
+from itertools import takewhile
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+
+import database
+from database import Turn, conversation_archive, conversation_archive_users, conversations
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+RETENTION_DAYS = float(os.getenv('AIML_NEXUS_RETENTION_DAYS', '90'))
+PARTITION_TURNS = int(os.getenv('AIML_NEXUS_ARCHIVE_PARTITION', '10000'))
+# seconds between background compactions; 0 disables the compactor
+COMPACT_INTERVAL = float(os.getenv('AIML_NEXUS_COMPACT_INTERVAL', '3600'))
+# VACUUM rewrites the whole file, so only run it once this share of pages is free
+VACUUM_FREE_RATIO = float(os.getenv('AIML_NEXUS_VACUUM_FREE_RATIO', '0.25'))
+
+CODEC = 'zstd' if zstandard is not None else 'zlib'
+# archives are written once and read rarely: spend CPU on the ratio
+ZSTD_LEVEL = 10
+
+
+def _compress(data: bytes) -> bytes:
+    if CODEC == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, 9)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Archive partition is zstd-compressed; install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def archive_old_turns(older_than_days: float = RETENTION_DAYS, partition_turns: int = PARTITION_TURNS,
+                      partial: bool = False, now: Optional[float] = None) -> int:
+    """
+    Move turns older than `older_than_days` into archive partitions; returns
+    how many turns were archived. Only full partitions are written unless
+    `partial` is set, so frequent runs do not leave many tiny partitions.
+    """
+    cutoff = (now if now is not None else time.time()) - older_than_days * 86400
+    database.flush_turns()
+    archived = 0
+    while True:
+        with database.engine.connect() as conn:
+            rows = conn.execute(select(conversations).order_by(conversations.c.id).limit(partition_turns)).fetchall()
+        # ids grow with time, so the turns to archive are a prefix of the table
+        old = list(takewhile(lambda r: r.created_at is not None and r.created_at < cutoff, rows))
+        if not old or (len(old) < partition_turns and not partial):
+            break
+        payload = "\n".join(json.dumps({
+            "id": r.id, "user_id": r.user_id, "user_message": r.user_message,
+            "reply": r.reply, "created_at": r.created_at,
+        }) for r in old).encode()
+        # the delete goes first so the transaction starts by taking the write lock
+        # (in WAL mode a read-then-write transaction fails if the writer committed meanwhile)
+        with database.engine.begin() as conn:
+            deleted = conn.execute(delete(conversations).where(conversations.c.id.between(old[0].id, old[-1].id)))
+            if deleted.rowcount != len(old):
+                # another compactor archived some of these turns first
+                raise RuntimeError(f"Expected to archive {len(old)} turns, found {deleted.rowcount}; rolled back")
+            partition_id = conn.execute(insert(conversation_archive).values(
+                min_id=old[0].id, max_id=old[-1].id,
+                min_created_at=old[0].created_at, max_created_at=old[-1].created_at,
+                turns=len(old), codec=CODEC, data=_compress(payload),
+            )).inserted_primary_key[0]
+            conn.execute(insert(conversation_archive_users), [
+                {"user_id": user_id, "partition_id": partition_id} for user_id in {r.user_id for r in old}
+            ])
+        archived += len(old)
+        if len(old) < partition_turns:
+            break
+    return archived
+
+
+def _free_ratio(conn) -> float:
+    pages = conn.exec_driver_sql("PRAGMA page_count").scalar()
+    free = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+    return free / pages if pages else 0.0
+
+
+def vacuum(force: bool = False) -> bool:
+    """
+    Give free pages back to the filesystem (SQLite only); True if it ran.
+    Also merges the search index, whose deleted entries otherwise linger
+    as tombstones.
+    """
+    if database.engine.dialect.name != 'sqlite':
+        return False
+    with database.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not force and _free_ratio(conn) < VACUUM_FREE_RATIO:
+            return False
+        if database.HAS_SEARCH_INDEX:
+            conn.exec_driver_sql("INSERT INTO conversations_fts(conversations_fts) VALUES ('optimize')")
+        conn.exec_driver_sql("VACUUM")
+        # in WAL mode VACUUM writes the whole database to the log first
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    return True
+
+
+def compact(older_than_days: float = RETENTION_DAYS, partial: bool = False) -> Dict[str, float]:
+    """Archive old turns, then vacuum if that freed enough space."""
+    start = time.perf_counter()
+    archived = archive_old_turns(older_than_days, partial=partial)
+    vacuumed = vacuum() if archived else False
+    seconds = time.perf_counter() - start
+    if archived:
+        logger.info("Archived %d turns in %.1fs (vacuum: %s)", archived, seconds, vacuumed)
+    return {"archived": archived, "vacuumed": vacuumed, "seconds": seconds}
+
+
+@lru_cache(maxsize=8)
+def _partition_turns(db_url: str, partition_id: int) -> Tuple[Turn, ...]:
+    # partitions never change once written, so decoded ones can be reused across pages
+    with database.engine.connect() as conn:
+        codec, data = conn.execute(
+            select(conversation_archive.c.codec, conversation_archive.c.data)
+            .where(conversation_archive.c.id == partition_id)
+        ).one()
+    records = (json.loads(line) for line in _decompress(codec, data).splitlines())
+    return tuple(Turn(id=r["id"], user_id=r["user_id"], user_message=r["user_message"], reply=r["reply"])
+                 for r in records)
+
+
+def get_archived_turns(user_id: str, limit: int = 20, before_id: Optional[int] = None) -> List[Turn]:
+    """
+    A page of one user's archived history, oldest-first, with the same
+    `before_id` paging as database.get_user_turns. Every id in the archive
+    is older than every id still in the hot table.
+    """
+    stmt = (
+        select(conversation_archive.c.id)
+        .join(conversation_archive_users, conversation_archive_users.c.partition_id == conversation_archive.c.id)
+        .where(conversation_archive_users.c.user_id == user_id)
+        .order_by(conversation_archive.c.max_id.desc())
+    )
+    if before_id is not None:
+        stmt = stmt.where(conversation_archive.c.min_id < before_id)
+    with database.engine.connect() as conn:
+        partition_ids = conn.execute(stmt).scalars().all()
+    page: List[Turn] = []
+    for partition_id in partition_ids:
+        for turn in reversed(_partition_turns(str(database.engine.url), partition_id)):
+            if turn.user_id == user_id and (before_id is None or turn.id < before_id):
+                page.append(turn)
+                if len(page) == limit:
+                    return list(reversed(page))
+    return list(reversed(page))
+
+
+def archive_stats() -> Dict[str, int]:
+    with database.engine.connect() as conn:
+        row = conn.execute(select(
+            func.count(), func.coalesce(func.sum(conversation_archive.c.turns), 0),
+            func.coalesce(func.sum(func.length(conversation_archive.c.data)), 0),
+        )).one()
+    return {"partitions": row[0], "turns": row[1], "compressed_bytes": row[2]}
+
+
+_compactor_stop: Optional[threading.Event] = None
+_compactor_lock = threading.Lock()
+
+
+def _compact_forever(interval: float, stop: threading.Event) -> None:
+    while not stop.wait(interval):
+        try:
+            compact()
+        except Exception:
+            logger.exception("Compaction failed; retrying in %.0fs", interval)
+
+
+def start_compactor(interval: float = COMPACT_INTERVAL) -> Optional[threading.Event]:
+    """
+    Run compact() every `interval` seconds on a daemon thread, once per
+    process. Returns an event that stops it, or None when disabled.
+    """
+    global _compactor_stop
+    if interval <= 0:
+        return None
+    with _compactor_lock:
+        if _compactor_stop is None:
+            _compactor_stop = threading.Event()
+            threading.Thread(target=_compact_forever, args=(interval, _compactor_stop),
+                             name="conversation-compactor", daemon=True).start()
+        return _compactor_stop
@@ -0,0 +1,251 @@
+# backend/service.py
+"""
+Async HTTP chat API around AIMLAgent, so chat can run behind a load
+balancer and be called from the React frontend or the Streamlit client.
+
+    cd backend && uvicorn service:app --host 0.0.0.0 --port 8000
+
+Generation runs on a bounded worker pool (CHAT_WORKERS threads) so the event
+loop stays free for other sessions; requests beyond the pool plus
+CHAT_MAX_QUEUE waiting ones get 503 instead of piling up.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+
+from agent import AIMLAgent
+from database import get_user_turns, search_turns
+from model_registry import get_registry
+from retention import archive_stats, get_archived_turns, start_compactor
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHAT_WORKERS = int(os.getenv('CHAT_WORKERS', '8'))
+CHAT_MAX_QUEUE = int(os.getenv('CHAT_MAX_QUEUE', '64'))
+CORS_ORIGINS = os.getenv('CHAT_CORS_ORIGINS', '*').split(',')
+
+app = FastAPI(
+    title="AIML Nexus Chat API",
+    description="Chat with the AIML Nexus agent and read conversation history",
+    version="1.0.0",
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=CORS_ORIGINS,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# one agent per process: models and the LLM connection pool are shared anyway
+agent = AIMLAgent()
+pool = ThreadPoolExecutor(max_workers=CHAT_WORKERS, thread_name_prefix="chat-worker")
+# moves turns past the retention age out of the hot table (AIML_NEXUS_COMPACT_INTERVAL)
+start_compactor()
+_active = 0
+_served = 0
+_rejected = 0
+
+
+class ChatRequest(BaseModel):
+    model_config = ConfigDict(
+        json_schema_extra={"example": {"message": "How do I tune a learning rate?", "user_id": "student-42"}},
+    )
+
+    message: str = Field(min_length=1)
+    user_id: str = "anonymous"
+
+
+class ChatResponse(BaseModel):
+    reply: str
+    user_id: str
+    backend: str
+    elapsed_ms: float
+
+
+class TurnOut(BaseModel):
+    id: int
+    user_id: str
+    user_message: str
+    reply: str
+
+
+class SearchHitOut(TurnOut):
+    rank: float
+    snippet: str
+
+
+class HistoryResponse(BaseModel):
+    turns: List[TurnOut]
+    # pass as before_id to get the previous page; None when there is no more history
+    next_before_id: Optional[int]
+
+
+def _admit() -> None:
+    global _active, _rejected
+    if _active >= CHAT_WORKERS + CHAT_MAX_QUEUE:
+        _rejected += 1
+        raise HTTPException(status_code=503, detail="Chat workers are busy, retry shortly",
+                            headers={"Retry-After": "1"})
+    _active += 1
+
+
+def _release() -> None:
+    global _active, _served
+    _active -= 1
+    _served += 1
+
+
+class _AdmittedStream(StreamingResponse):
+    """
+    Releases the request's worker slot however the response ends, including
+    when the client is gone before the body generator ever starts (its
+    finally block would then never run).
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _release()
+
+
+@app.get("/")
+async def root():
+    return {
+        "message": "AIML Nexus Chat API",
+        "endpoints": {
+            "/chat": "POST",
+            "/chat/stream": "POST (text/event-stream)",
+            "/history/{user_id}": "GET",
+            "/history/{user_id}/archive": "GET",
+            "/search": "GET",
+            "/health": "GET",
+            "/stats": "GET",
+        },
+    }
+
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "service": "synthetic-agent", "backend": agent.backend}
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "workers": CHAT_WORKERS,
+        "active": _active,
+        "served": _served,
+        "rejected": _rejected,
+        "backend": agent.backend,
+        "models": get_registry().stats(),
+        "archive": archive_stats(),
+    }
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest):
+    _admit()
+    try:
+        start = time.perf_counter()
+        reply = await asyncio.get_running_loop().run_in_executor(pool, agent.respond, request.message, request.user_id)
+        return ChatResponse(reply=reply, user_id=request.user_id, backend=agent.backend,
+                            elapsed_ms=(time.perf_counter() - start) * 1000)
+    finally:
+        _release()
+
+
+def _event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Server-sent events: one `data: {"delta": ...}` per chunk, then
+    `event: done` with the full reply and its timing.
+    """
+    _admit()
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue()
+    finished = object()
+    cancelled = False
+
+    def produce():
+        # runs on a worker thread; hands chunks to the event loop as they are generated
+        try:
+            for chunk in agent.respond_stream(request.message, request.user_id):
+                if cancelled:
+                    break
+                loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+        except Exception as e:
+            loop.call_soon_threadsafe(chunks.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(chunks.put_nowait, finished)
+
+    async def events():
+        nonlocal cancelled
+        start = time.perf_counter()
+        ttft_ms = None
+        parts = []
+        worker = loop.run_in_executor(pool, produce)
+        try:
+            while True:
+                item = await chunks.get()
+                if item is finished:
+                    break
+                if isinstance(item, Exception):
+                    yield _event({"error": str(item)}, "error")
+                    break
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - start) * 1000
+                parts.append(item)
+                yield _event({"delta": item})
+            yield _event({"reply": "".join(parts), "ttft_ms": ttft_ms,
+                          "total_ms": (time.perf_counter() - start) * 1000}, "done")
+        finally:
+            # client went away: stop generating (the partial turn is still persisted)
+            cancelled = True
+            await worker
+
+    return _AdmittedStream(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# user ids may contain "/" (sent as %2F, decoded before routing), hence :path; the
+# archive route comes first so "/archive" is not read as the end of an id
+@app.get("/history/{user_id:path}/archive", response_model=HistoryResponse)
+async def archived_history(user_id: str, limit: int = Query(20, ge=1, le=200), before_id: Optional[int] = None):
+    """History older than the retention age; slower, it decompresses archive partitions."""
+    turns = await asyncio.get_running_loop().run_in_executor(None, get_archived_turns, user_id, limit, before_id)
+    return HistoryResponse(
+        turns=[TurnOut(**t.__dict__) for t in turns],
+        next_before_id=turns[0].id if len(turns) == limit else None,
+    )
+
+
+@app.get("/history/{user_id:path}", response_model=HistoryResponse)
+async def history(user_id: str, limit: int = Query(20, ge=1, le=200), before_id: Optional[int] = None):
+    turns = await asyncio.get_running_loop().run_in_executor(None, get_user_turns, user_id, limit, before_id)
+    return HistoryResponse(
+        turns=[TurnOut(**t.__dict__) for t in turns],
+        next_before_id=turns[0].id if len(turns) == limit else None,
+    )
+
+
+@app.get("/search", response_model=List[SearchHitOut])
+async def search(q: str = Query(min_length=1), user_id: Optional[str] = None, limit: int = Query(20, ge=1, le=200)):
+    hits = await asyncio.get_running_loop().run_in_executor(None, search_turns, q, user_id, limit)
+    return [SearchHitOut(**h.__dict__) for h in hits]
@@ -0,0 +1,9 @@
+# backend/tests/conftest.py
+import os
+import tempfile
+from pathlib import Path
+
+# database.py creates its engine at import time, so point it at a scratch file
+# before any test module imports it (otherwise tests write ./aiml_nexus.db)
+_tmp = tempfile.TemporaryDirectory()
+os.environ["AIML_NEXUS_DB"] = f"sqlite:///{Path(_tmp.name) / 'test.db'}"
@@ -7,4 +7,4 @@ def test_agent_basic(msg):
     agent = AIMLAgent()
     resp = agent.respond(msg, user_id="test-user")
     assert isinstance(resp, str)
-    assert len(resp) > 0\n
\ No newline at end of file
+    assert len(resp) > 0
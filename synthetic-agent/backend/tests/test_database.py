@@ -0,0 +1,117 @@
+# backend/tests/test_database.py
+import pytest
+from sqlalchemy import create_engine, text
+
+import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    database.metadata.create_all(engine)
+    monkeypatch.setattr(database, "engine", engine)
+    for i in range(30):
+        database.save_turn("alice" if i % 3 else "bob", f"msg {i}", f"reply {i}")
+    return engine
+
+
+def test_user_turns_are_per_user_and_oldest_first(db):
+    turns = database.get_user_turns("bob", limit=5)
+    assert [t.user_message for t in turns] == ["msg 15", "msg 18", "msg 21", "msg 24", "msg 27"]
+    assert all(t.user_id == "bob" for t in turns)
+
+
+def test_keyset_pages_walk_back_without_gaps(db):
+    seen = []
+    before = None
+    while True:
+        page = database.get_user_turns("alice", limit=7, before_id=before)
+        if not page:
+            break
+        seen = page + seen
+        before = page[0].id
+    assert [t.user_message for t in seen] == [f"msg {i}" for i in range(30) if i % 3]
+
+
+def test_history_query_uses_user_index(db):
+    with db.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM conversations "
+            "WHERE user_id = 'alice' AND id < 20 ORDER BY id DESC LIMIT 20"
+        )).fetchall()
+    detail = " ".join(row[-1] for row in plan)
+    assert "ix_conversations_user_id_id" in detail
+    assert "TEMP B-TREE" not in detail
+
+
+def test_default_sqlite_engine_uses_wal():
+    if not database.IS_SQLITE or ":memory:" in database.DB_URL:
+        pytest.skip("WAL tuning only applies to file-backed SQLite")
+    with database.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+
+@pytest.fixture
+def search_db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    database.metadata.create_all(engine)
+    assert database.create_search_index(engine)
+    monkeypatch.setattr(database, "engine", engine)
+    database.save_turn("alice", "How do I train a CNN on small images?", "Use data augmentation and transfer learning.")
+    database.save_turn("bob", "What is dropout?", "A regularizer that randomly zeroes activations while training.")
+    database.save_turn("alice", "Best optimizer for transformers?", "AdamW with warmup.")
+    return engine
+
+
+def test_search_matches_message_and_reply_ranked(search_db):
+    hits = database.search_turns("training")
+    # porter stemming: "training" also finds "train"
+    assert {h.user_id for h in hits} == {"alice", "bob"}
+    assert all("[" in h.snippet for h in hits)
+    assert [h.rank for h in hits] == sorted(h.rank for h in hits)
+
+
+def test_search_filters_by_user_and_prefix(search_db):
+    # "transf" is a prefix of "transfer" (a reply) and "transformers" (a message)
+    assert {h.user_message for h in database.search_turns("transf", user_id="alice")} == {
+        "How do I train a CNN on small images?",
+        "Best optimizer for transformers?",
+    }
+    assert database.search_turns("dropout", user_id="alice") == []
+
+
+def test_short_last_word_is_a_prefix_only_with_star(search_db):
+    assert database.search_turns("ad") == []
+    assert [h.user_message for h in database.search_turns("ad*")] == ["Best optimizer for transformers?"]
+
+
+def test_search_tolerates_query_syntax(search_db):
+    assert database.search_turns('"-*()') == []
+    assert len(database.search_turns('dropout"?')) == 1
+
+
+def test_index_follows_deletes(search_db):
+    with search_db.begin() as conn:
+        conn.execute(database.conversations.delete().where(database.conversations.c.user_id == "bob"))
+    assert database.search_turns("dropout") == []
+
+
+def test_backfill_indexes_existing_rows(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    database.metadata.create_all(engine)
+    monkeypatch.setattr(database, "engine", engine)
+    database.save_turn("carol", "gradient clipping?", "Clip the global norm to 1.0.")
+    database.create_search_index(engine)
+    assert database.search_turns("clipping") == []
+    assert database.backfill_search_index() == 1
+    assert [h.user_id for h in database.search_turns("clipping")] == ["carol"]
+
+
+def test_unfiltered_search_ranks_newest_candidates(search_db, monkeypatch):
+    monkeypatch.setattr(database, "SEARCH_CANDIDATES", 1)
+    # both alice turns match "transf"; only the newest one is ranked
+    assert [h.user_message for h in database.search_turns("transf")] == ["Best optimizer for transformers?"]
+    # with a user filter the candidates are that user's newest matches
+    assert [h.user_message for h in database.search_turns("transf", user_id="alice")] == [
+        "Best optimizer for transformers?"]
+    assert [h.user_id for h in database.search_turns("training", user_id="alice")] == ["alice"]
@@ -0,0 +1,130 @@
+# backend/tests/test_kv_cache.py
+from types import SimpleNamespace
+
+import kv_cache
+import model_registry
+from agent import AIMLAgent
+from kv_cache import HEADER, USER_MARK, SessionKVCache
+from model_registry import ModelRegistry
+
+
+class CharTokenizer:
+    eos_token_id = 0
+
+    def encode(self, text):
+        return [ord(c) for c in text]
+
+    def decode(self, ids, skip_special_tokens=False):
+        return "".join(chr(i) for i in ids)
+
+
+class FakeCache:
+    def __init__(self, length):
+        self.length = length
+
+    def crop(self, length):
+        self.length = min(self.length, length)
+
+
+class ScriptedCache(SessionKVCache):
+    """Replaces model.generate: replies from a script and records how many tokens each turn encoded."""
+
+    def __init__(self, replies, **kwargs):
+        super().__init__(**kwargs)
+        self.replies = list(replies)
+        self.calls = []
+
+    def _decode(self, pipe, input_ids, past, streamer=None, **gen_kwargs):
+        cached = past.length if past is not None else 0
+        self.calls.append({"input": list(input_ids), "encoded": len(input_ids) - cached})
+        seq = input_ids + pipe.tokenizer.encode(self.replies.pop(0))
+        # like HF, the last generated token has no key/values yet
+        return seq, FakeCache(len(seq) - 1)
+
+
+PIPE = SimpleNamespace(tokenizer=CharTokenizer(), model=object())
+
+
+def text(ids):
+    return CharTokenizer().decode(ids)
+
+
+def test_follow_up_turn_only_encodes_new_tokens():
+    cache = ScriptedCache([" Use a CNN.", " About 10 epochs."], max_context_tokens=10_000)
+    assert cache.generate(PIPE, "u1", "image model?") == "Use a CNN."
+    assert cache.generate(PIPE, "u1", "how long to train?") == "About 10 epochs."
+    first, second = cache.calls
+    assert text(second["input"]).startswith(text(first["input"]) + " Use a CNN.")
+    new_turn = f"{USER_MARK} how long to train?\nAIML Nexus:"
+    # new turn plus the last reply token, not the whole history again
+    assert second["encoded"] == len(new_turn) + 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_without_cache_recomputes_whole_context():
+    cache = ScriptedCache([" a", " b", " c"], max_context_tokens=10_000, use_cache=False)
+    for q in ["one", "two", "three"]:
+        cache.generate(PIPE, "u1", q)
+    assert [c["encoded"] for c in cache.calls] == [len(c["input"]) for c in cache.calls]
+    assert "two" in text(cache.calls[2]["input"])
+    assert cache.stats()["hits"] == 0
+
+
+def test_sessions_are_separate_and_lru_capped():
+    cache = ScriptedCache([" r"] * 5, max_sessions=2, max_context_tokens=10_000)
+    cache.generate(PIPE, "alice", "hi")
+    cache.generate(PIPE, "bob", "hi")
+    cache.generate(PIPE, "carol", "hi")  # alice is evicted
+    assert "bob" not in text(cache.calls[2]["input"])
+    cache.generate(PIPE, "alice", "again")
+    assert text(cache.calls[3]["input"]).startswith(HEADER + USER_MARK + " again")
+    assert cache.stats() == {"sessions": 2, "hits": 0, "evictions": 2, "truncations": 0}
+
+
+def test_token_budget_drops_oldest_turns():
+    budget, reply_room = 260, 20
+    cache = ScriptedCache([f" reply {i}" for i in range(8)], max_context_tokens=budget, max_new_tokens=reply_room)
+    for i in range(8):
+        cache.generate(PIPE, "u1", f"question number {i}")
+    for call in cache.calls:
+        assert len(call["input"]) + reply_room <= budget
+    last = text(cache.calls[-1]["input"])
+    assert last.startswith(HEADER)
+    assert "question number 0" not in last and "question number 7" in last
+    assert cache.stats()["truncations"] >= 1
+
+
+def test_reply_is_cut_where_model_starts_next_user_line():
+    cache = ScriptedCache([f" Try dropout.{USER_MARK} ok", " Yes."], max_context_tokens=10_000)
+    assert cache.generate(PIPE, "u1", "overfitting?") == "Try dropout."
+    cache.generate(PIPE, "u1", "more?")
+    second = text(cache.calls[1]["input"])
+    assert "ok" not in second
+    assert second.count(USER_MARK) == 2
+
+
+def test_agent_keeps_context_per_user(monkeypatch):
+    cache = ScriptedCache([" first", " second", " other"], max_context_tokens=10_000)
+    monkeypatch.setattr(kv_cache, "_cache", cache)
+    monkeypatch.setattr(model_registry, "_registry", ModelRegistry(loader=lambda name: PIPE, sizer=lambda p: 0))
+    agent = AIMLAgent(hf_model="tiny")
+    agent.backend = "hf"
+    assert agent.respond("q1", user_id="alice") == "first"
+    assert agent.respond("q2", user_id="alice") == "second"
+    assert agent.respond("q1", user_id="bob") == "other"
+    assert "q1" in text(cache.calls[1]["input"])
+    assert "q2" not in text(cache.calls[2]["input"])
+
+
+def test_stream_hides_next_user_line():
+    chunks = ["Use", " dropout", ".\nUs", "er: thanks"]
+    assert "".join(AIMLAgent._until_user_mark(iter(chunks))) == "Use dropout."
+    assert "".join(AIMLAgent._until_user_mark(iter(["a\n", "b"]))) == "a\nb"
+
+
+def test_stop_strings_only_where_generate_supports_them():
+    old = SimpleNamespace(tokenizer=PIPE.tokenizer, model=SimpleNamespace(generation_config=SimpleNamespace()))
+    assert SessionKVCache._stop_kwargs(old) == {}
+    new = SimpleNamespace(tokenizer=PIPE.tokenizer,
+                          model=SimpleNamespace(generation_config=SimpleNamespace(stop_strings=None)))
+    assert SessionKVCache._stop_kwargs(new) == {"stop_strings": [USER_MARK], "tokenizer": PIPE.tokenizer}
@@ -0,0 +1,239 @@
+# backend/tests/test_llm_client.py
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import agent as agent_module
+from agent import AIMLAgent
+from llm_client import AsyncLLMClient, CircuitBreaker, CircuitOpenError, LLMError
+
+
+class MockOpenAI(BaseHTTPRequestHandler):
+    """OpenAI-style /chat/completions that plays `server.script` (latency, error codes) one request at a time."""
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+            step = self.server.script.pop(0) if self.server.script else {}
+        try:
+            time.sleep(step.get("delay", 0))
+            status = step.get("status", 200)
+            if status != 200:
+                self._send(status, b'{"error": {"message": "injected"}}', {"Retry-After": step.get("retry_after")})
+            elif body.get("stream"):
+                events = [{"choices": [{"delta": {"content": t}}]} for t in step.get("tokens", ["Hi", " there"])]
+                data = "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+                self._send(200, data.encode(), {"Content-Type": "text/event-stream"})
+            else:
+                reply = {"choices": [{"message": {"role": "assistant", "content": step.get("text", "Hi there")}}]}
+                self._send(200, json.dumps(reply).encode(), {"Content-Type": "application/json"})
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def _send(self, status, payload, headers):
+        self.send_response(status)
+        for key, value in headers.items():
+            if value is not None:
+                self.send_header(key, str(value))
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), MockOpenAI)
+    srv.daemon_threads = True
+    srv.lock = threading.Lock()
+    srv.script = []
+    srv.requests = srv.connections = srv.in_flight = srv.max_in_flight = 0
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}/v1"
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def make_client(server, **kwargs):
+    kwargs.setdefault("backoff_base", 0.01)
+    return AsyncLLMClient(base_url=server.url, api_key="test", **kwargs)
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def run(coro_fn):
+    return asyncio.run(coro_fn())
+
+
+def test_requests_reuse_pooled_connections(server):
+    client = make_client(server)
+
+    async def go():
+        replies = [await client.chat(MESSAGES) for _ in range(10)]
+        await client.aclose()
+        return replies
+
+    assert run(go) == ["Hi there"] * 10
+    assert server.requests == 10
+    assert server.connections == 1
+
+
+def test_retries_errors_then_succeeds(server):
+    server.script = [{"status": 503}, {"status": 429, "retry_after": 0}, {"text": "ok"}]
+    client = make_client(server)
+    assert run(lambda: client.chat(MESSAGES)) == "ok"
+    assert client.stats()["retries"] == 2
+    assert client.breaker.state == "closed"
+
+
+def test_timeout_is_retried(server):
+    server.script = [{"delay": 1.0}, {"text": "fast"}]
+    client = make_client(server, timeout=0.2)
+    start = time.perf_counter()
+    assert run(lambda: client.chat(MESSAGES)) == "fast"
+    assert time.perf_counter() - start < 1.0
+
+
+def test_client_errors_are_not_retried(server):
+    server.script = [{"status": 400}]
+    client = make_client(server)
+    with pytest.raises(LLMError, match="400"):
+        run(lambda: client.chat(MESSAGES))
+    assert server.requests == 1
+    assert client.breaker.failures == 0
+
+
+def test_in_flight_limit(server):
+    server.script = [{"delay": 0.1} for _ in range(12)]
+    client = make_client(server, max_in_flight=3)
+
+    async def go():
+        return await asyncio.gather(*(client.chat(MESSAGES) for _ in range(12)))
+
+    assert len(run(go)) == 12
+    assert server.max_in_flight <= 3
+
+
+def test_circuit_opens_during_outage_and_recovers(server):
+    server.script = [{"status": 500}] * 4
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.3)
+    client = make_client(server, max_retries=1, breaker=breaker)
+
+    async def go():
+        for _ in range(2):
+            with pytest.raises(LLMError):
+                await client.chat(MESSAGES)
+        assert breaker.state == "open"
+        seen = server.requests
+        with pytest.raises(CircuitOpenError):
+            await client.chat(MESSAGES)
+        # failing fast: the outage is not hit again
+        assert server.requests == seen
+        await asyncio.sleep(0.35)
+        assert breaker.state == "half_open"
+        return await client.chat(MESSAGES)
+
+    assert run(go) == "Hi there"
+    assert breaker.state == "closed"
+
+
+def test_late_outcome_of_a_closed_call_does_not_touch_the_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    early = breaker.allow()
+    failing = breaker.allow()
+    breaker.record_failure(failing)
+    breaker.release(failing)
+    assert breaker.state == "open" and breaker.allow() is None
+    time.sleep(0.06)
+    trial = breaker.allow()
+    assert trial is not None and breaker.allow() is None
+    # the call admitted before the circuit opened finishes now
+    breaker.release(early)
+    assert breaker.allow() is None
+    breaker.record_failure(early)
+    assert breaker.state == "half_open" and breaker.allow() is None
+    breaker.record_success(early)
+    assert breaker.state == "half_open"
+    breaker.record_success(trial)
+    breaker.release(trial)
+    assert breaker.state == "closed"
+
+
+def test_overlapping_calls_around_half_open_let_one_trial_through(server):
+    # a slow call admitted while closed, a fast failure that opens the circuit, then the trial
+    server.script = [{"delay": 0.4, "status": 500}, {"status": 500}, {"delay": 0.4}]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+    client = make_client(server, max_retries=0, breaker=breaker)
+
+    async def go():
+        slow = asyncio.ensure_future(client.chat(MESSAGES))
+        await asyncio.sleep(0.05)
+        with pytest.raises(LLMError):
+            await client.chat(MESSAGES)
+        await asyncio.sleep(0.12)
+        trial = asyncio.ensure_future(client.chat(MESSAGES))
+        await asyncio.sleep(0.05)
+        with pytest.raises(LLMError):
+            await slow
+        # the slow call's failure neither re-opened the circuit nor freed the trial slot
+        assert breaker.state == "half_open"
+        with pytest.raises(CircuitOpenError):
+            await client.chat(MESSAGES)
+        return await trial
+
+    assert run(go) == "Hi there"
+    assert breaker.state == "closed"
+    assert server.requests == 3
+
+
+def test_stream_retries_before_first_token(server):
+    server.script = [{"status": 502}, {"tokens": ["Use", " dropout"]}]
+    client = make_client(server)
+
+    async def go():
+        return [t async for t in client.chat_stream(MESSAGES)]
+
+    assert run(go) == ["Use", " dropout"]
+
+
+def test_agent_uses_fallback_when_circuit_open(server, monkeypatch):
+    server.script = [{"status": 503}] * 10
+    client = make_client(server, max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    monkeypatch.setattr(agent_module, "chat_sync", lambda messages, **p: asyncio.run(client.chat(messages, **p)))
+    monkeypatch.setattr(agent_module, "record_turn", lambda *turn: None)
+    agent = AIMLAgent()
+    agent.backend = "openai"
+    expected = AIMLAgent._fallback_reply("hello")
+    assert agent.respond("hello") == expected
+    assert agent.respond("hello") == expected
+    assert server.requests == 1
+
+
+def test_sync_helpers_share_the_loop_thread_pool(server, monkeypatch):
+    import llm_client
+
+    monkeypatch.setattr(llm_client, "_client", make_client(server))
+    monkeypatch.setattr(llm_client, "_loop", llm_client._LoopThread())
+    assert llm_client.chat_sync(MESSAGES) == "Hi there"
+    assert list(llm_client.chat_stream_sync(MESSAGES)) == ["Hi", " there"]
+    assert asyncio.run(llm_client.achat(MESSAGES)) == "Hi there"
+    assert server.connections == 1
@@ -0,0 +1,80 @@
+# backend/tests/test_model_registry.py
+import threading
+import time
+
+import model_registry
+from agent import AIMLAgent
+from model_registry import ModelRegistry
+
+
+class FakePipeline:
+    def __init__(self, name, nbytes):
+        self.name = name
+        self.nbytes = nbytes
+
+    def __call__(self, prompt, **kwargs):
+        return [{"generated_text": prompt + f" reply from {self.name}"}]
+
+
+def make_registry(sizes, **kwargs):
+    loads = []
+
+    def loader(name):
+        loads.append(name)
+        time.sleep(0.05)
+        return FakePipeline(name, sizes.get(name, 10))
+
+    return ModelRegistry(loader=loader, sizer=lambda p: p.nbytes, **kwargs), loads
+
+
+def test_concurrent_sessions_share_one_load():
+    registry, loads = make_registry({})
+    got = []
+    threads = [threading.Thread(target=lambda: got.append(registry.get("gpt2"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert loads == ["gpt2"]
+    assert all(p is got[0] for p in got)
+    assert registry.stats()["models"][0]["hits"] == 8
+
+
+def test_memory_cap_unloads_least_recently_used():
+    registry, loads = make_registry({"a": 40, "b": 40, "c": 40}, max_bytes=100)
+    registry.get("a")
+    registry.get("b")
+    registry.get("a")  # b is now least recently used
+    registry.get("c")
+    stats = registry.stats()
+    assert [m["name"] for m in stats["models"]] == ["c", "a"]
+    assert stats["evictions"] == 1
+    registry.get("b")
+    assert loads == ["a", "b", "c", "b"]
+
+
+def test_model_larger_than_cap_still_loads():
+    registry, _ = make_registry({"big": 500, "small": 10}, max_bytes=100)
+    registry.get("small")
+    assert registry.get("big").name == "big"
+    assert [m["name"] for m in registry.stats()["models"]] == ["big"]
+
+
+def test_max_models():
+    registry, _ = make_registry({}, max_models=2)
+    for name in ["a", "b", "c"]:
+        registry.get(name)
+    assert registry.stats()["loads"] == 3
+    assert len(registry.stats()["models"]) == 2
+
+
+def test_agents_share_registry_model(monkeypatch):
+    registry, loads = make_registry({})
+    monkeypatch.setattr(model_registry, "_registry", registry)
+    replies = []
+    for _ in range(3):
+        agent = AIMLAgent(hf_model="tiny")
+        agent.backend = "hf"
+        replies.append(agent.respond("hello", user_id="test-user"))
+    assert loads == ["tiny"]
+    assert replies == ["reply from tiny"] * 3
@@ -0,0 +1,95 @@
+# backend/tests/test_retention.py
+import time
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select, text
+
+import database
+import retention
+
+DAY = 86400
+NOW = time.time()
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'retention.db'}")
+    database.metadata.create_all(engine)
+    database.create_search_index(engine)
+    monkeypatch.setattr(database, "engine", engine)
+    # 25 turns, one a day, the newest today
+    with engine.begin() as conn:
+        conn.execute(insert(database.conversations), [
+            {"user_id": "alice" if i % 2 else "bob", "user_message": f"msg {i}", "reply": f"reply {i} about dropout",
+             "created_at": NOW - (24 - i) * DAY}
+            for i in range(25)
+        ])
+    return engine
+
+
+def hot_count(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(database.conversations)).scalar()
+
+
+def test_archives_only_full_partitions_of_old_turns(db):
+    # turns 0..14 are older than 9.5 days: one full partition of 10, 5 left over
+    assert retention.archive_old_turns(older_than_days=9.5, partition_turns=10, now=NOW) == 10
+    assert hot_count(db) == 15
+    assert retention.archive_old_turns(older_than_days=9.5, partition_turns=10, partial=True, now=NOW) == 5
+    assert hot_count(db) == 10
+    assert retention.archive_stats()["partitions"] == 2
+    assert retention.archive_stats()["turns"] == 15
+    # archived turns leave the search index with the hot table
+    assert {h.user_message for h in database.search_turns("dropout", limit=50)} == {f"msg {i}" for i in range(15, 25)}
+
+
+def test_archived_history_continues_hot_pages(db):
+    retention.archive_old_turns(older_than_days=9.5, partition_turns=4, partial=True, now=NOW)
+    hot = database.get_user_turns("alice", limit=20)
+    assert [t.user_message for t in hot] == [f"msg {i}" for i in range(15, 25, 2)]
+
+    seen = []
+    before = hot[0].id
+    while True:
+        page = retention.get_archived_turns("alice", limit=3, before_id=before)
+        if not page:
+            break
+        seen = page + seen
+        before = page[0].id
+    assert [t.user_message for t in seen] == [f"msg {i}" for i in range(1, 15, 2)]
+    assert [t.user_message for t in retention.get_archived_turns("bob", limit=2)] == ["msg 12", "msg 14"]
+    assert retention.get_archived_turns("carol") == []
+
+
+def test_nothing_to_archive_is_a_no_op(db):
+    assert retention.archive_old_turns(older_than_days=100, now=NOW) == 0
+    assert hot_count(db) == 25
+    assert retention.get_archived_turns("alice") == []
+
+
+def test_compact_vacuums_freed_pages(db):
+    with db.begin() as conn:
+        conn.execute(insert(database.conversations), [
+            {"user_id": "carol", "user_message": "x" * 2000, "reply": "y" * 2000, "created_at": NOW}
+            for _ in range(500)
+        ])
+    size = lambda: db.connect().execute(text("PRAGMA page_count")).scalar()  # noqa: E731
+    before = size()
+    result = retention.compact(older_than_days=0, partial=True)
+    assert result["archived"] == 525
+    assert result["vacuumed"]
+    assert size() < before / 4
+
+
+def test_old_database_gets_created_at(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE conversations (id INTEGER PRIMARY KEY, user_id VARCHAR(128), "
+                             "user_message TEXT, reply TEXT)")
+        conn.exec_driver_sql("INSERT INTO conversations (user_id, user_message, reply) VALUES ('dan', 'hi', 'hello')")
+    database._add_created_at(engine)
+    with engine.connect() as conn:
+        created_at = conn.execute(text("SELECT created_at FROM conversations")).scalar()
+    # counted as written at upgrade time, so it is not archived straight away
+    assert abs(created_at - time.time()) < 60
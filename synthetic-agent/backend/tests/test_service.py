@@ -0,0 +1,121 @@
+# backend/tests/test_service.py
+import asyncio
+import json
+import time
+import uuid
+from urllib.parse import quote
+
+import httpx
+from fastapi.testclient import TestClient
+
+import service
+from agent import AIMLAgent
+from chat_client import ChatAPIClient, _sse
+
+client = TestClient(service.app)
+
+
+def new_user():
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def test_chat_returns_reply():
+    r = client.post("/chat", json={"message": "hello", "user_id": new_user()})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["reply"] == AIMLAgent._fallback_reply("hello")
+    assert body["backend"] == service.agent.backend
+
+
+def test_stream_sends_deltas_then_done():
+    with client.stream("POST", "/chat/stream", json={"message": "how to train a model", "user_id": new_user()}) as r:
+        assert r.headers["content-type"].startswith("text/event-stream")
+        events = list(_sse(r.iter_lines()))
+    deltas = [data["delta"] for event, data in events if event is None]
+    event, done = events[-1]
+    assert event == "done"
+    assert len(deltas) > 1
+    assert "".join(deltas) == done["reply"] == AIMLAgent._fallback_reply("how to train a model")
+    assert done["ttft_ms"] <= done["total_ms"]
+
+
+def test_history_is_paged_per_user():
+    user = new_user()
+    for i in range(5):
+        client.post("/chat", json={"message": f"question {i}", "user_id": user})
+    client.post("/chat", json={"message": "someone else", "user_id": new_user()})
+
+    page = client.get(f"/history/{user}", params={"limit": 3}).json()
+    assert [t["user_message"] for t in page["turns"]] == ["question 2", "question 3", "question 4"]
+    older = client.get(f"/history/{user}", params={"limit": 3, "before_id": page["next_before_id"]}).json()
+    assert [t["user_message"] for t in older["turns"]] == ["question 0", "question 1"]
+    assert older["next_before_id"] is None
+
+
+def test_history_of_user_ids_with_url_characters():
+    user = f"{new_user()}/b?c#d"
+    api = ChatAPIClient("http://testserver")
+    api.http = client
+    api.respond("question with odd id", user_id=user)
+    api.respond("question for the plain prefix", user_id=user.split("/")[0])
+    assert [t.user_message for t in api.history(user)] == ["question with odd id"]
+    assert [t.user_id for t in api.history(user)] == [user]
+    archive = client.get(f"/history/{quote(user, safe='')}/archive")
+    assert archive.status_code == 200 and archive.json()["turns"] == []
+
+
+def test_busy_service_rejects_with_503(monkeypatch):
+    monkeypatch.setattr(service, "_active", service.CHAT_WORKERS + service.CHAT_MAX_QUEUE)
+    r = client.post("/chat", json={"message": "hello"})
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "1"
+
+
+def test_generation_runs_on_worker_pool(monkeypatch):
+    def slow_respond(message, user_id):
+        time.sleep(0.2)
+        return "done"
+
+    monkeypatch.setattr(service.agent, "respond", slow_respond)
+
+    async def go():
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            start = time.perf_counter()
+            replies = await asyncio.gather(*(http.post("/chat", json={"message": "hi"}) for _ in range(8)))
+            return time.perf_counter() - start, replies
+
+    elapsed, replies = asyncio.run(go())
+    assert all(r.json()["reply"] == "done" for r in replies)
+    # 8 blocking generations overlap instead of running back to back (1.6s)
+    assert elapsed < 1.0
+    assert json.loads(client.get("/stats").text)["active"] == 0
+
+
+def test_stream_slot_is_released_when_client_leaves_before_the_body():
+    async def go():
+        response = await service.chat_stream(service.ChatRequest(message="hi", user_id=new_user()))
+        active = service._active
+
+        async def send(message):
+            raise OSError("client went away")
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        try:
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+        except Exception:
+            pass
+        return active
+
+    assert asyncio.run(go()) == 1
+    assert service._active == 0
+
+
+def test_search_endpoint():
+    user = new_user()
+    client.post("/chat", json={"message": "explain gradient checkpointing", "user_id": user})
+    hits = client.get("/search", params={"q": "checkpointing", "user_id": user}).json()
+    assert [h["user_id"] for h in hits] == [user]
+    assert "[checkpointing]" in hits[0]["snippet"]
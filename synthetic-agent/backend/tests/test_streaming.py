@@ -0,0 +1,151 @@
+# backend/tests/test_streaming.py
+import queue
+import time
+
+import agent as agent_module
+import model_registry
+from agent import AIMLAgent
+from model_registry import ModelRegistry
+
+
+class FakeStreamer:
+    """Stands in for transformers.TextIteratorStreamer."""
+
+    def __init__(self, tokenizer, skip_prompt=False, skip_special_tokens=False):
+        self.queue = queue.Queue()
+
+    def put(self, text):
+        self.queue.put(text)
+
+    def end(self):
+        self.queue.put(None)
+
+    def __iter__(self):
+        while True:
+            text = self.queue.get(timeout=5)
+            if text is None:
+                return
+            yield text
+
+
+class FakeGenerator:
+    """Emits one token every `delay` seconds into the streamer, like incremental decoding."""
+    tokenizer = object()
+
+    def __init__(self, tokens, delay=0.02, fail_after=None):
+        self.tokens = tokens
+        self.delay = delay
+        self.fail_after = fail_after
+        self.emitted = 0
+        self.finished = False
+
+    def __call__(self, prompt, streamer=None, stopping_criteria=(), **kwargs):
+        for i, token in enumerate(self.tokens):
+            if self.fail_after is not None and i == self.fail_after:
+                raise RuntimeError("generation crashed")
+            if any(stop(None, None) for stop in stopping_criteria):
+                break
+            time.sleep(self.delay)
+            streamer.put(token)
+            self.emitted += 1
+        streamer.end()
+        self.finished = True
+        return [{"generated_text": prompt + "".join(self.tokens)}]
+
+
+def hf_agent(monkeypatch, generator):
+    registry = ModelRegistry(loader=lambda name: generator, sizer=lambda p: 0)
+    monkeypatch.setattr(model_registry, "_registry", registry)
+    monkeypatch.setattr(agent_module, "TextIteratorStreamer", FakeStreamer)
+    saved = []
+    monkeypatch.setattr(agent_module, "record_turn", lambda *turn: saved.append(turn))
+    agent = AIMLAgent(hf_model="tiny")
+    agent.backend = "hf"
+    return agent, saved
+
+
+def test_hf_stream_yields_tokens_before_generation_finishes(monkeypatch):
+    tokens = ["Use", " a", " small", " learning", " rate", "."] * 5
+    agent, saved = hf_agent(monkeypatch, FakeGenerator(tokens, delay=0.02))
+    start = time.perf_counter()
+    first_at = None
+    chunks = []
+    for chunk in agent.respond_stream("how to fine-tune?", user_id="u1"):
+        if first_at is None:
+            first_at = time.perf_counter() - start
+        chunks.append(chunk)
+    total = time.perf_counter() - start
+
+    assert chunks == tokens
+    # first token after roughly one decoding step, not after the whole reply
+    assert first_at < total / 3
+    stats = agent.last_stream_stats
+    assert stats["chunks"] == len(tokens)
+    assert stats["ttft_ms"] < stats["total_ms"]
+    assert saved == [("u1", "how to fine-tune?", "".join(tokens))]
+
+
+def test_hf_failure_before_first_token_falls_back(monkeypatch):
+    agent, saved = hf_agent(monkeypatch, FakeGenerator(["x"], fail_after=0))
+    reply = "".join(agent.respond_stream("hello", user_id="u1"))
+    assert reply == AIMLAgent._fallback_reply("hello")
+    assert len(saved) == 1
+
+
+def test_hf_failure_mid_stream_keeps_partial_reply(monkeypatch):
+    agent, saved = hf_agent(monkeypatch, FakeGenerator(["Partial", " answer", " lost"], fail_after=2))
+    assert "".join(agent.respond_stream("hello", user_id="u1")) == "Partial answer"
+    assert saved == [("u1", "hello", "Partial answer")]
+
+
+def test_openai_stream(monkeypatch):
+    def chat_stream_sync(messages, **params):
+        assert messages[-1] == {"role": "user", "content": "tabular model?"}
+        return iter(["Try", " XGBoost"])
+
+    monkeypatch.setattr(agent_module, "chat_stream_sync", chat_stream_sync)
+    saved = []
+    monkeypatch.setattr(agent_module, "record_turn", lambda *turn: saved.append(turn))
+    agent = AIMLAgent()
+    agent.backend = "openai"
+    assert list(agent.respond_stream("tabular model?", user_id="u1")) == ["Try", " XGBoost"]
+    assert saved == [("u1", "tabular model?", "Try XGBoost")]
+
+
+def test_fallback_stream_matches_respond(monkeypatch):
+    saved = []
+    monkeypatch.setattr(agent_module, "record_turn", lambda *turn: saved.append(turn))
+    agent = AIMLAgent()
+    agent.backend = "fallback"
+    chunks = list(agent.respond_stream("thanks", user_id="u1"))
+    assert len(chunks) > 1
+    assert "".join(chunks) == agent.respond("thanks", user_id="u1")
+    # one turn per reply: the stream persisted once, respond() once
+    assert len(saved) == 2
+
+
+def test_stopping_early_persists_once(monkeypatch):
+    agent, saved = hf_agent(monkeypatch, FakeGenerator(["a", "b", "c", "d"], delay=0.0))
+    stream = agent.respond_stream("hello", user_id="u1")
+    next(stream)
+    stream.close()
+    assert saved == [("u1", "hello", "a")]
+
+
+def test_closing_the_stream_stops_generation(monkeypatch):
+    generator = FakeGenerator(["token"] * 500, delay=0.01)
+    agent, _ = hf_agent(monkeypatch, generator)
+    stream = agent.respond_stream("hello", user_id="u1")
+    next(stream)
+    stream.close()
+    deadline = time.monotonic() + 2
+    while not generator.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert generator.finished and generator.emitted < 20
+
+
+def test_user_mark_stops_generation(monkeypatch):
+    generator = FakeGenerator(["Hi", ".", "\nUser:", " more"] + ["x"] * 500, delay=0.005)
+    agent, _ = hf_agent(monkeypatch, generator)
+    assert "".join(agent.respond_stream("hello", user_id="u1")) == "Hi."
+    assert generator.finished and generator.emitted < 20
@@ -0,0 +1,139 @@
+# backend/tests/test_write_behind.py
+import threading
+import time
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, Text, create_engine, func, select
+
+from write_behind import WriteBehindWriter
+
+
+def make_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'turns.db'}", connect_args={"check_same_thread": False})
+    metadata = MetaData()
+    table = Table(
+        'conversations',
+        metadata,
+        Column('id', Integer, primary_key=True, autoincrement=True),
+        Column('user_id', String(128)),
+        Column('user_message', Text),
+        Column('reply', Text),
+    )
+    metadata.create_all(engine)
+    return engine, table
+
+
+def count_rows(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(table)).scalar()
+
+
+def test_turns_are_written_in_batches(tmp_path):
+    engine, table = make_table(tmp_path)
+    writer = WriteBehindWriter(engine, table, batch_size=50, flush_interval=5.0)
+    for i in range(200):
+        assert writer.submit("u1", f"msg {i}", f"reply {i}")
+    assert writer.flush(timeout=10)
+    assert count_rows(engine, table) == 200
+    # size threshold: 200 turns in 50-row inserts, not 200 single-row ones
+    assert writer.stats()["batches"] <= 5
+    writer.close()
+
+
+def test_partial_batch_flushes_on_interval(tmp_path):
+    engine, table = make_table(tmp_path)
+    writer = WriteBehindWriter(engine, table, batch_size=100, flush_interval=0.05)
+    writer.submit("u1", "hello", "hi")
+    assert writer.flush(timeout=5)
+    assert count_rows(engine, table) == 1
+    writer.close()
+
+
+def test_close_drains_queue_and_preserves_order(tmp_path):
+    engine, table = make_table(tmp_path)
+    writer = WriteBehindWriter(engine, table, batch_size=7, flush_interval=10.0)
+    for i in range(30):
+        writer.submit("u1", f"msg {i}", "r")
+    writer.close()
+    with engine.connect() as conn:
+        messages = [r.user_message for r in conn.execute(select(table).order_by(table.c.id))]
+    assert messages == [f"msg {i}" for i in range(30)]
+    # turns after shutdown are refused, not silently lost
+    assert not writer.submit("u1", "late", "r")
+    assert writer.stats()["dropped"] == 1
+
+
+def test_full_buffer_drops_new_turns(tmp_path):
+    engine, table = make_table(tmp_path)
+    gate = threading.Event()
+    real_begin = engine.begin
+
+    class BlockedEngine:
+        def begin(self):
+            gate.wait()
+            return real_begin()
+
+    writer = WriteBehindWriter(BlockedEngine(), table, batch_size=1, flush_interval=0.0, max_buffer=3)
+    accepted = [writer.submit("u1", f"msg {i}", "r") for i in range(10)]
+    assert not all(accepted)
+    assert writer.stats()["dropped"] == accepted.count(False)
+    gate.set()
+    writer.close()
+    assert count_rows(engine, table) == accepted.count(True)
+
+
+def test_failed_batch_is_retried(tmp_path):
+    engine, table = make_table(tmp_path)
+    failures = {"left": 2}
+    real_begin = engine.begin
+
+    class FlakyEngine:
+        def begin(self):
+            if failures["left"]:
+                failures["left"] -= 1
+                raise RuntimeError("database is locked")
+            return real_begin()
+
+    writer = WriteBehindWriter(FlakyEngine(), table, flush_interval=0.0, retry_backoff=0.001)
+    writer.submit("u1", "hello", "hi")
+    writer.close()
+    assert count_rows(engine, table) == 1
+    assert writer.stats()["failures"] == 2
+
+
+def test_batch_dropped_after_max_retries(tmp_path):
+    engine, table = make_table(tmp_path)
+
+    class DownEngine:
+        def begin(self):
+            raise RuntimeError("database is down")
+
+    writer = WriteBehindWriter(DownEngine(), table, flush_interval=0.0, max_retries=1, retry_backoff=0.001)
+    writer.submit("u1", "hello", "hi")
+    writer.close()
+    stats = writer.stats()
+    assert stats["written"] == 0 and stats["dropped"] == 1 and stats["pending"] == 0
+
+
+def test_flush_user_does_not_wait_for_other_users(tmp_path):
+    engine, table = make_table(tmp_path)
+
+    class SlowEngine:
+        def begin(self):
+            time.sleep(0.02)
+            return engine.begin()
+
+    writer = WriteBehindWriter(SlowEngine(), table, batch_size=1, flush_interval=0.0)
+    writer.submit("me", "mine", "reply")
+    for i in range(50):
+        writer.submit("others", f"msg {i}", "reply")
+    start = time.perf_counter()
+    assert writer.flush_user("me", timeout=5)
+    assert time.perf_counter() - start < 0.5
+    assert writer.stats()["pending"] > 0
+    with engine.connect() as conn:
+        assert conn.execute(select(table.c.user_message).where(table.c.user_id == "me")).scalar() == "mine"
+    # a user with nothing queued returns at once; one behind the backlog still waits
+    assert writer.flush_user("nobody", timeout=0)
+    assert not writer.flush_user("others", timeout=0)
+    writer.close()
+    assert writer.flush_user("others", timeout=0)
@@ -0,0 +1,161 @@
+# backend/write_behind.py
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+logger = logging.getLogger(__name__)
+
+# 3 bound parameters per row; keeps one INSERT well under SQLite's variable limit
+MAX_BATCH_ROWS = 300
+
+
+class WriteBehindWriter:
+    """
+    Buffers conversation turns in memory and writes them from a background
+    thread as multi-row INSERTs, so replies never wait on the database.
+
+      - A batch is flushed when it reaches `batch_size` rows or when its
+        oldest row has waited `flush_interval` seconds.
+      - The buffer is bounded (`max_buffer`): when the database cannot keep
+        up, new turns are dropped and counted instead of growing memory.
+      - A failed batch is retried with backoff (`max_retries`), then dropped.
+      - `close()` drains everything still queued before returning.
+      - `flush_user()` waits only for one user's queued turns, so a read of
+        that user's history does not wait behind everyone else's backlog.
+    """
+
+    def __init__(self, engine, table, batch_size: int = 100, flush_interval: float = 0.2,
+                 max_buffer: int = 10000, max_retries: int = 3, retry_backoff: float = 0.1):
+        self.engine = engine
+        self.table = table
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_ROWS))
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue(maxsize=max_buffer)
+        # guards _closed and the counters, which submitters and the writer thread both update
+        self._lock = threading.Lock()
+        # notified whenever a batch is settled (written or dropped)
+        self._settled = threading.Condition(self._lock)
+        # queued-but-unsettled turns per user_id
+        self._pending_users: Dict[str, int] = {}
+        self._closed = False
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failures = 0
+        self._thread = threading.Thread(target=self._run, name="turn-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, user_id: str, user_message: str, reply: str) -> bool:
+        """Queue one turn; False if it was dropped (writer closed or buffer full)."""
+        row = {"user_id": user_id, "user_message": user_message, "reply": reply}
+        with self._lock:
+            if self._closed:
+                self.dropped += 1
+                return False
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                self.dropped += 1
+                logger.warning("Turn buffer full (%d); dropping turn.", self._queue.maxsize)
+                return False
+            self.submitted += 1
+            self._pending_users[user_id] = self._pending_users.get(user_id, 0) + 1
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every turn queued so far has been written or dropped."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def flush_user(self, user_id: str, timeout: Optional[float] = None) -> bool:
+        """Block until `user_id`'s queued turns have been written or dropped; False on timeout."""
+        with self._settled:
+            return self._settled.wait_for(lambda: user_id not in self._pending_users, timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        # The sentinel may wait for space if the buffer is full
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "written": self.written,
+                "dropped": self.dropped,
+                "pending": self._queue.qsize(),
+                "batches": self.batches,
+                "failures": self.failures,
+            }
+
+    def _next_batch(self) -> Tuple[List[Dict], bool]:
+        """Collect up to batch_size rows, waiting at most flush_interval after the first."""
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                row = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is None:
+                return batch, True
+            batch.append(row)
+        return batch, False
+
+    def _write(self, batch: List[Dict]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(insert(self.table).values(batch))
+                with self._lock:
+                    self.written += len(batch)
+                    self.batches += 1
+                return
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                if attempt == self.max_retries:
+                    with self._lock:
+                        self.dropped += len(batch)
+                    logger.error("Dropping %d turns after %d failed writes: %s", len(batch), attempt + 1, e)
+                    return
+                time.sleep(self.retry_backoff * (2 ** attempt))
+
+    def _settle(self, batch: List[Dict]) -> None:
+        with self._settled:
+            for row in batch:
+                left = self._pending_users[row["user_id"]] - 1
+                if left:
+                    self._pending_users[row["user_id"]] = left
+                else:
+                    del self._pending_users[row["user_id"]]
+            self._settled.notify_all()
+
+    def _run(self) -> None:
+        done = False
+        while not done:
+            batch, done = self._next_batch()
+            if batch:
+                self._write(batch)
+                self._settle(batch)
+            for _ in range(len(batch) + (1 if done else 0)):
+                self._queue.task_done()